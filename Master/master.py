@@ -9,8 +9,21 @@ from adafruit_ble import BLEConnection
 import adafruit_ble
 import json
 import os
+import uuid
+import zlib
 from iterators import TimeoutIterator
 
+#preset dictionary of compressed uploads (typical measurement as sent by a master, most frequent strings at the end)
+#changing it requires a new compression name, master and server must use identical dictionaries
+ZLIB_DICTIONARY_NAME = "zlib1"
+ZLIB_DICTIONARY = rb'"{\"master\": \"\", \"timeStamp\": \"/04/2022 10:\", \"data\": {\"Device1\": \"BLE_error\", \"Device2\": {\"scd_30_sensor\": {\"SCD_30_CO2\": \"read_failed\", \"SCD_30_HUM\": \"read_failed\", \"SCD_30_TEMP\": \"read_failed\"}, \"light_sensor\": \"physical_connection_error\", \"battery_voltage\": {\"bat_voltage\": \"read_failed\"}}, \"Device3\": {\"scd_30_sensor\": {\"SCD_30_CO2\": 812.0, \"SCD_30_HUM\": 41.0, \"SCD_30_TEMP\": 22.0}, \"magnetic_sensors\": {\"MS_S1\": false, \"MS_S2\": true, \"MS_S3\": false, \"MS_S4\": true, \"MS_S5\": false}, \"light_sensor\": {\"LS_lightStrength\": 512.0}, \"battery_voltage\": {\"bat_voltage\": 3.9}}}}";'
+
+#records are sent as json objects instead of json objects encoded as json string (if the server supports it)
+JSON_RECORDS_NAME = "json1"
+
+#preset dictionary of compressed uploads with json records (same measurement, not encoded as string)
+ZLIB_DICTIONARY_JSON = str.encode(json.loads(ZLIB_DICTIONARY[:-1])) + b";"
+
 #log file appender
 log_fileName = str(os.path.dirname(os.path.realpath(__file__))) + "/log.txt" #full path to cache script
 def Write_To_Log_File(clssName:str, text:str):
@@ -24,14 +37,171 @@ def Write_To_Log_File(clssName:str, text:str):
         fd.write(str(timestamp) + ": " + clssName + ": " + text + "\n")
         fd.flush()
 
+class FrameReader:
+    def __init__(self, conn:socket.socket, delimiter:bytes = b"\n", max_frame_size:int = 64 * 1024 * 1024, initial_size:int = 64 * 1024) -> None:
+        """
+        Init frame reader (reads delimiter separated frames from a socket)
+
+        Data is received with recv_into into one growing bytearray, the delimiter is
+        searched with find (already searched bytes are not searched again) and every
+        frame is decoded exactly once. Bytes received after a delimiter are kept for the next frame.
+
+        params:
+        conn: connected socket (or ssl socket)
+        delimiter: end of frame
+        max_frame_size: maximum length of a frame in bytes (without delimiter)
+        initial_size: initial size of receive buffer in bytes
+        """
+
+        self.__conn = conn
+        self.__delimiter = delimiter
+        self.__max_frame_size = max_frame_size
+
+        self.__buffer = bytearray(max(initial_size, len(delimiter) + 1)) #receive buffer
+        self.__length = 0 #number of valid bytes in buffer
+        self.__searched = 0 #bytes before this index do not contain the start of a delimiter
+
+    def __grow(self):
+        """
+        Double size of receive buffer (limited to max frame size)
+        """
+
+        new_size = min(len(self.__buffer) * 2, self.__max_frame_size + len(self.__delimiter))
+
+        if new_size <= len(self.__buffer):
+            raise Exception(f"Frame exceeds maximum frame size of {self.__max_frame_size} bytes")
+
+        self.__buffer.extend(bytes(new_size - len(self.__buffer)))
+
+    def Read_Frame_Bytes(self, deadline:float = None) -> bytearray:
+        """
+        Read next frame from connection
+
+        this method can raise an error
+
+        params:
+        deadline: monotonic time until the frame has to be read completely (None -> no deadline)
+
+        returns:
+        frame without delimiter as bytearray
+        """
+
+        while True:
+            #search delimiter in not yet searched bytes
+            position = self.__buffer.find(self.__delimiter, self.__searched, self.__length)
+
+            if position >= 0:
+                frame = self.__buffer[:position]
+
+                #move remaining bytes to start of buffer
+                remaining_start = position + len(self.__delimiter)
+                remaining = self.__length - remaining_start
+                self.__buffer[:remaining] = self.__buffer[remaining_start:self.__length]
+                self.__length = remaining
+                self.__searched = 0
+
+                return frame
+
+            self.__searched = max(0, self.__length - len(self.__delimiter) + 1) #delimiter could be split over two chunks
+
+            if self.__length > self.__max_frame_size:
+                raise Exception(f"Frame exceeds maximum frame size of {self.__max_frame_size} bytes")
+
+            if self.__length == len(self.__buffer): #buffer full
+                self.__grow()
+
+            #limit read timeout to remaining time of deadline
+            if deadline != None:
+                remaining_time = deadline - monotonic()
+
+                if remaining_time <= 0:
+                    raise Exception(f"Connection deadline exceeded.\nAlready read {self.__length} bytes.")
+
+                self.__conn.settimeout(min(5, remaining_time))
+
+            with memoryview(self.__buffer) as view:
+                received = self.__conn.recv_into(view[self.__length:]) #read directly into buffer
+
+            #if no data received
+            if received == 0:
+                raise Exception(f"No data received.\nAlready read {self.__length} bytes.")
+
+            self.__length += received
+
+    def Read_Frame(self, deadline:float = None) -> str:
+        """
+        Read next frame from connection and decode it
+
+        this method can raise an error
+
+        params:
+        deadline: monotonic time until the frame has to be read completely (None -> no deadline)
+
+        returns:
+        frame without delimiter as string
+        """
+
+        return str(self.Read_Frame_Bytes(deadline), "utf-8")
+
+def Decode_Index_Ranges(text:str) -> set:
+    """
+    Decode record indices sent as ranges by the server (e.g. "0-2,5,7-8" -> {0, 1, 2, 5, 7, 8})
+    """
+
+    indices = set()
+    for part in text.split(","):
+        if len(part) == 0:
+            continue
+
+        if "-" in part:
+            start, stop = part.split("-")
+            indices.update(range(int(start), int(stop) + 1))
+
+        else:
+            indices.add(int(part))
+
+    return indices
+
 class SSL:
-    def __init__(self, host= 'solarbroom.com', port= 443) -> None:
+    def __init__(self, host= 'solarbroom.com', port= 443, persistent= True, compression= True, json_records= True, legacy_retry_s= 3600) -> None:
+        """
+        Init ssl
+
+        params:
+        host: server address
+        port: port
+        persistent: true -> keep connection open between messages (and resume tls session on reconnect)
+                    false -> open a new connection for every message
+        compression: true -> uploads are compressed with zlib (preset dictionary) if the server supports it
+        json_records: true -> measurements are sent as json objects (not encoded a second time) if the server supports it
+        legacy_retry_s: an older server (without "hello~"/"records~") is asked again after this time (server may have been updated)
+        """
+
         self.HOST = host
         self.PORT = port
+
+        self.__persistent = persistent
+        self.__compression = compression
+        self.__json_records = json_records
+        self.__use_zlib = False #server supports compression (negotiated per connection)
+        self.__use_json_records = False #server supports json records (negotiated per connection)
+
+        #older servers answer unknown commands with "failed" and close the connection
+        self.__legacy_retry_s = legacy_retry_s
+        self.__negotiation = True #server knows "hello~"
+        self.__acknowledged_records = True #server knows "records~"
+        self.__legacy_since = None #time an older server was recognized
+        self.__hello_accepted = False #server answered "hello~" (new server -> "failed" is a transient failure, not an unknown command)
+
+        self.__context = ssl._create_unverified_context() #default context had a problem with certificate (no idea why... tried to fix it but failed) -> unverified_context: no server certificate check          
+        self.__session = None #tls session of last connection (used for session resumption)
+
+        self.__conn = None #open connection (only kept if persistent)
+        self.__reader = None #frame reader of open connection
     
-    def __read_from_conn(self, conn:ssl.SSLSocket):
+    def __read_from_conn(self):
         """
-        read message from connection
+        read message from open connection
         returns: received string 
         
         this method can raise an error
@@ -39,30 +209,26 @@ class SSL:
 
         Write_To_Log_File("SSL", "start reading from connection")
 
-        message = "" #message stored here
-        while True:
-            data = conn.recv(buflen=1024) #read 1024 bytes
-
-            #if no data received
-            if data == b"":
-                raise Exception(f"No data received.\nAlready read data.\n{message}")
-
-            #decode received bytes and store characters in message (check if endchar received)
-            for chr in bytes.decode(data):
-                #if endchar received -> return message
-                if chr == "\n":
-                    Write_To_Log_File("SSL", "sucessfully read from connection")
+        message = self.__reader.Read_Frame() #read until endchar received
 
-                    return message
+        Write_To_Log_File("SSL", "sucessfully read from connection")
 
-                else: #otherwise add char to message
-                    message += chr
+        return message
 
-    def __Send_Read(self, message:str) -> str:
+    def __Connect(self) -> bool:
         """
-        Sends message and reives answer -> if a failure occures: None is returned
+        Open a new connection to server (resumes last tls session if possible)
+
+        returns:
+        true if connection was established
         """
 
+        #server may have been updated since it was recognized as older server
+        if self.__legacy_since != None and monotonic() >= self.__legacy_since + self.__legacy_retry_s:
+            self.__negotiation = True
+            self.__acknowledged_records = True
+            self.__legacy_since = None
+
         #try creating socket
         try:
             Write_To_Log_File("SSL", "start creating binding socket")
@@ -84,23 +250,24 @@ class SSL:
             Write_To_Log_File("SSL", f"exception occured in create binding socket: {ex}")
 
             print(f"Exception occured during creating bindingSocket: {ex}")
-            return None
+            return False
 
         #try create sslcontext
         try:
             Write_To_Log_File("SSL", "start wrapping socket")
 
-            context = ssl._create_unverified_context() #default context had a problem with certificate (no idea why... tried to fix it but failed) -> unverified_context: no server certificate check          
-            conn = context.wrap_socket(bindsocket, server_hostname=self.HOST)
+            conn = self.__context.wrap_socket(bindsocket, server_hostname=self.HOST, session=self.__session)
             bindsocket.close() #close original socket
 
             conn.settimeout(5) #set read/write timeout to 5 seconds
 
-            Write_To_Log_File("SSL", "socket successfully wrapped")
+            Write_To_Log_File("SSL", f"socket successfully wrapped (session reused: {conn.session_reused})")
 
             print("SSLSocket successfully created")
 
         except Exception as ex:
+            self.__session = None #do not try to resume this session again
+
             #close eventual open bindsocket
             try:
                 bindsocket.close()
@@ -116,73 +283,174 @@ class SSL:
             Write_To_Log_File("SSL", f"wrapping socket failed: {ex}")
 
             print(f"Building ssl connection failed: {ex}")    
-            return None
+            return False
+
+        self.__conn = conn
+        self.__reader = FrameReader(conn, max_frame_size=1024 * 1024)
+
+        #negotiate compression and record format
+        self.__use_zlib = False
+        self.__use_json_records = False
+
+        features = ([ZLIB_DICTIONARY_NAME] if self.__compression else []) + ([JSON_RECORDS_NAME] if self.__json_records else [])
+        if len(features) > 0 and self.__negotiation:
+            answer = self.__Exchange("hello~" + ",".join(features))
+
+            if answer == None:
+                return False
+
+            #older server does not know negotiation (and closed connection) -> reconnect without
+            if not answer.startswith("hello~"):
+                Write_To_Log_File("SSL", f"negotiation rejected by server ({answer}) -> legacy upload")
+
+                self.__negotiation = False
+                self.__hello_accepted = False
+                self.__legacy_since = monotonic()
+                self.__Close()
+
+                return self.__Connect()
 
+            self.__hello_accepted = True
 
-        ##send receive message##
+            negotiated = answer.split("~", 1)[1].split(",") if answer.startswith("hello~") else []
 
-        answer = "" #answer from server stored here
-        returnNone = False #true if error occured and None should be returned
+            self.__use_zlib = ZLIB_DICTIONARY_NAME in negotiated
+            self.__use_json_records = JSON_RECORDS_NAME in negotiated
+
+            Write_To_Log_File("SSL", f"compression negotiated: {self.__use_zlib}, json records negotiated: {self.__use_json_records}")
+
+        return True
+
+    def __Close(self):
+        """
+        Close open connection
+        """
+
+        if self.__conn == None:
+            return
+
+        try:
+            self.__conn.shutdown(socket.SHUT_RDWR)
+        except Exception as ex:
+            print(f"Exception occured in shutdown connection: {ex}")
+
+        try:
+            self.__conn.close()
+        except Exception as ex:
+            print(f"Exception occured in close connection: {ex}")
+
+        self.__conn = None
+        self.__reader = None
+
+    def __Encode(self, message:str, compressible:bool) -> bytes:
+        """
+        Convert message to bytes ("command~payload" is sent as "zcommand~'length'~'zlib bytes'" if compression is used)
+        """
+
+        if not compressible or not self.__use_zlib:
+            return str.encode(message + "\n")
+
+        command, payload = message.split("~", 1)
+
+        compressor = zlib.compressobj(level=6, zdict=ZLIB_DICTIONARY_JSON if self.__use_json_records else ZLIB_DICTIONARY)
+        compressed = compressor.compress(str.encode(payload)) + compressor.flush()
+
+        Write_To_Log_File("SSL", f"payload compressed from {len(payload)} to {len(compressed)} bytes")
+
+        return str.encode(f"z{command}~{len(compressed)}~") + compressed + b"\n"
+
+    def __Exchange(self, message:str, compressible:bool = False, jsons:list = None) -> str:
+        """
+        Send message over open connection and read answer -> if a failure occures: None is returned (and connection is closed)
+
+        params:
+        compressible: true -> message may be sent compressed (if negotiated with server)
+        jsons: measurements appended to message (joined in format negotiated with server)
+        """
 
         #send data to server and expect answer
         try:
-            message_bytes = str.encode(message + "\n") #convert to bytes
+            if jsons != None:
+                message += self.__Join_Jsons(jsons)
+
+            message_bytes = self.__Encode(message, compressible) #convert to bytes
 
             print(f"Sending message: {message_bytes}")
 
             Write_To_Log_File("SSL", "start sending text to server")
-            conn.sendall(message_bytes) #send message
+            self.__conn.sendall(message_bytes) #send message
             Write_To_Log_File("SSL", "text successfully sent to server")
 
             print("Message Sent")
 
-            try:
-                Write_To_Log_File("SSL", "start reading from server")
-                answer = self.__read_from_conn(conn) #read answer
-                Write_To_Log_File("SSL", "successfully read data from server")
+        except Exception as ex:
+            Write_To_Log_File("SSL", f"exception occured in send data to server: {ex}")
 
-                print(f"Answer received: {answer}")
+            print(f"Exception occured during sending data to server: {ex}")
 
-            except Exception as ex:
-                returnNone = True #set flag
+            self.__Close()
+            return None
 
-                Write_To_Log_File("SSL", f"exception occured in read_from_conn: {ex}")
+        try:
+            Write_To_Log_File("SSL", "start reading from server")
+            answer = self.__read_from_conn() #read answer
+            Write_To_Log_File("SSL", "successfully read data from server")
 
-                print(f"Exception occured during receiving answer from server: {ex}")
+            print(f"Answer received: {answer}")
 
         except Exception as ex:
-            returnNone = True #set flag
+            Write_To_Log_File("SSL", f"exception occured in read_from_conn: {ex}")
 
-            Write_To_Log_File("SSL", f"exception occured in send data to server: {ex}")
+            print(f"Exception occured during receiving answer from server: {ex}")
 
-            print(f"Exception occured during sending data to server: {ex}")
+            self.__Close()
+            return None
 
-        finally:
-            
-            #close connection
-            try:
-                conn.shutdown(socket.SHUT_RDWR)
-            except Exception as ex:
-                print(f"Exception occured in shutdown connection: {ex}")
+        #store session for resumption (available after first data was received)
+        try:
+            self.__session = self.__conn.session
+        except:
+            pass
 
-            try:
-                conn.close()
-            except Exception as ex:
-                print(f"Exception occured in close connection: {ex}")
+        return answer
+
+    def __Send_Read(self, message:str, compressible:bool = False, jsons:list = None) -> str:
+        """
+        Sends message and reives answer -> if a failure occures: None is returned
+
+        params:
+        compressible: true -> message may be sent compressed (if negotiated with server)
+        jsons: measurements appended to message (joined in format negotiated with server)
+        """
+
+        reused = self.__conn != None #connection of an earlier message is used
 
-               
-        if returnNone: #error occured and None should be returned
+        if not reused and not self.__Connect():
             return None
-        else: #data sent successfully
-            return answer
 
-    def __Write(self, message: str) -> bool:
+        answer = self.__Exchange(message, compressible, jsons)
+
+        #connection of an earlier message was closed by server (e.g. idle timeout) -> retry once with a new connection
+        if answer == None and reused:
+            Write_To_Log_File("SSL", "kept connection failed -> reconnect")
+
+            if not self.__Connect():
+                return None
+
+            answer = self.__Exchange(message, compressible, jsons)
+
+        if not self.__persistent:
+            self.__Close()
+
+        return answer
+
+    def __Write(self, message: str, compressible:bool = False, jsons:list = None) -> bool:
         """
         Send message to server
         """
         
         try:
-            received = self.__Send_Read(message)
+            received = self.__Send_Read(message, compressible, jsons)
 
             if received == None: #exception during sending/receiving data
                 return False
@@ -200,6 +468,16 @@ class SSL:
             print(f"Unable to send message to server: {ex}")
             return False
 
+    def __Join_Jsons(self, jsons:list) -> str:
+        """
+        Join measurements with ';' as separator (measurements are json strings already -> only encoded again for legacy servers)
+        """
+
+        if self.__use_json_records:
+            return ";".join(jsons)
+
+        return ";".join(json.dumps(json_) for json_ in jsons)
+
     def Send_Jsons(self, jsons:list) -> bool:
         """
         This method sends all measurements as json to server
@@ -208,13 +486,71 @@ class SSL:
         jsons: measurements as list containing jsons
         """
         
-        stringified_jsons = []
-        for json_ in jsons:
-            stringified_jsons.append(json.dumps(json_))
+        return self.__Write("data~", compressible=True, jsons=jsons)
 
-        jsons_appended = ";".join(stringified_jsons) #convert jsons and join them with ';' as separator
+    def __Send_Jsons_Legacy(self, jsons:list) -> set or None:
+        """
+        Send measurements with "data~" (servers without "records~"): all or none of them are handled
+        """
+
+        if self.Send_Jsons(jsons):
+            return set(range(len(jsons)))
+
+        return None
+
+    def Send_Jsons_Acknowledged(self, jsons:list) -> set or None:
+        """
+        This method sends all measurements as json to server and gets which of them were handled
+
+        params:
+        jsons: measurements as list containing jsons
+
+        returns:
+        set of indices (in jsons) that were stored or rejected as invalid by the server (can be removed from cache)
+        None -> sending failed
+        """
+
+        try:
+            if not self.__acknowledged_records:
+                return self.__Send_Jsons_Legacy(jsons)
+
+            received = self.__Send_Read("records~", compressible=True, jsons=jsons)
+
+            if received == None: #exception during sending/receiving data
+                return None
+
+            #new server failed to handle upload (e.g. read error or receive buffer full) -> measurements stay in cache
+            if received == "failed" and self.__hello_accepted:
+                Write_To_Log_File("SSL", "acknowledged records failed on server -> retried later")
+                return None
+
+            #older server does not know "records~" (and closed connection) -> whole upload confirmed or failed
+            if received == "failed":
+                Write_To_Log_File("SSL", "acknowledged records rejected by server -> legacy upload")
+
+                self.__acknowledged_records = False
+                self.__legacy_since = monotonic()
+                self.__Close()
+
+                return self.__Send_Jsons_Legacy(jsons)
+
+            splitted_answer = received.split("~")
+
+            if len(splitted_answer) != 3 or splitted_answer[0] != "acked":
+                raise Exception(f"unknown confirmation message received: {received}")
+
+            accepted = Decode_Index_Ranges(splitted_answer[1])
+            invalid = Decode_Index_Ranges(splitted_answer[2])
+
+            if len(invalid) > 0:
+                Write_To_Log_File("SSL", f"{len(invalid)} measurements rejected as invalid by server -> dropped")
+                print(f"{len(invalid)} measurements rejected as invalid by server -> dropped")
+
+            return accepted | invalid
 
-        return self.__Write("data~"+jsons_appended)
+        except Exception as ex:
+            print(f"Unable to send message to server: {ex}")
+            return None
             
 class Cache:
     def __init__(self, relative_fileName = "cache") -> None:
@@ -302,6 +638,27 @@ class Cache:
             print(f"Cache read encountered an error: {ex}")
             return None
 
+    def Cache_Replace(self, jsons:list) -> bool:
+        try:
+            Write_To_Log_File("Cache", "start cache replace")
+
+            #write jsons to temporary file and replace cache (cache stays complete if interrupted)
+            with open(self.__full_fileName + ".tmp", 'w') as fd:
+                for json_file in jsons:
+                    fd.write(json.dumps(json_file) + "\n")
+
+            os.replace(self.__full_fileName + ".tmp", self.__full_fileName)
+
+            Write_To_Log_File("Cache", "cache replace successfully finished")
+
+            return True
+
+        except Exception as ex:
+            Write_To_Log_File("Cache", f"exception occured in cache replace: {ex}")
+
+            print(f"Cache replace encountered an error: {ex}")
+            return False
+
     def Cache_Clear(self) -> bool:
         try:
             Write_To_Log_File("Cache", "start cache clear")
@@ -558,6 +915,8 @@ class BLE:
         return (timeStamp, jsons)
 
 #init
+epoch_timestamps = False #true -> timestamps are sent as epoch milliseconds (only supported by servers decoding records as Measurement)
+master_id = format(uuid.getnode(), "012x") #mac address identifies master (server suppresses retransmitted measurements by master and timestamp)
 server = SSL()
 ble = BLE(["Device1", "Device2", "Device3"]) #all devices that master has to listen for is given as parameter here
 cache = Cache()
@@ -579,30 +938,27 @@ while True:
         #start a ble request
         Write_To_Log_File("Main", "request for data started")
         start_Time, jsons = ble.Start_Request() #get measurements (or errors) from all devices
-        new_measurement = json.dumps({"timeStamp":start_Time.strftime("%d/%m/%Y %H:%M:%S"), "data":jsons}) #add timestamp and measurement results to a json
+        timeStamp = int(start_Time.timestamp() * 1000) if epoch_timestamps else start_Time.strftime("%d/%m/%Y %H:%M:%S")
+        new_measurement = json.dumps({"master":master_id, "timeStamp":timeStamp, "data":jsons}) #add master identity, timestamp and measurement results to a json
         Write_To_Log_File("Main", "successfully read data from ble and dumped to json")
 
         #read cached jsons
         Write_To_Log_File("Main", "start cache things")
         cached_jsons = cache.Cache_Read() #read cached mesurements
 
-        #append jsons
-        all_jsons.append(new_measurement) 
-
+        #append jsons (oldest first -> server stores points of a backlog in time order)
         if cached_jsons != None:
             all_jsons.extend(cached_jsons)
+
+        all_jsons.append(new_measurement)
+        new_index = len(all_jsons) - 1 #index of new measurement
         
         Write_To_Log_File("Main", "successfully stopped cache things")
         
         Write_To_Log_File("Main", "start send data to server")
-        #if jsons sent successfully
-        if server.Send_Jsons(all_jsons): #try send all measuremens to server
-            Write_To_Log_File("Main", "successfully sent data to server -> delete cache")
-    
-            if not cache.Cache_Clear():#clear cache
-                raise Exception("cache could not be cleared")
+        handled = server.Send_Jsons_Acknowledged(all_jsons) #try send all measuremens to server
 
-        else: #sending measurements not successful
+        if handled == None: #sending measurements not successful
             Write_To_Log_File("Main", "send data to server failed -> cache data")
             print("Data Cached")
 
@@ -610,6 +966,24 @@ while True:
             if not cache.Cache_Append_Json(new_measurement):
                 raise Exception("cache could not be extended")
 
+        else: #server answered which measurements it handled -> keep only the others in cache
+            Write_To_Log_File("Main", f"server handled {len(handled)} of {len(all_jsons)} measurements -> update cache")
+
+            cached_handled = cached_jsons != None and any(index != new_index for index in handled) #cached measurements have to be removed from cache
+
+            if cached_handled:
+                remaining_jsons = [json_ for index, json_ in enumerate(all_jsons[:new_index]) if index not in handled] #cached measurements not handled by server
+
+                if new_index not in handled:
+                    remaining_jsons.append(new_measurement)
+
+                if not cache.Cache_Replace(remaining_jsons):
+                    raise Exception("cache could not be replaced")
+
+            elif new_index not in handled: #append new measurement to chache
+                if not cache.Cache_Append_Json(new_measurement):
+                    raise Exception("cache could not be extended")
+
     except Exception as ex:
         Write_To_Log_File("Main", f"exception occured in main loop: {ex}")
         print(f"Exception occured in MainLoop: {ex}")
\ No newline at end of file
@@ -0,0 +1,749 @@
+import asyncio
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+from time import perf_counter, sleep
+
+import requests
+
+import ords_standin
+import server
+
+#example measurement as sent by a master
+MEASUREMENT = json.dumps(json.dumps({
+    "timeStamp": "04/04/2022 10:15:30",
+    "data": {
+        "Device1": {"scd_30_sensor": {"SCD_30_CO2": 812.4, "SCD_30_HUM": 41.2, "SCD_30_TEMP": 22.8}, "light_sensor": {"LS_lightStrength": 512.0}, "battery_voltage": {"bat_voltage": 3.91}},
+        "Device2": {"scd_30_sensor": {"SCD_30_CO2": 790.1, "SCD_30_HUM": 40.7, "SCD_30_TEMP": 23.1}, "light_sensor": {"LS_lightStrength": 498.0}, "battery_voltage": {"bat_voltage": 3.88}},
+        "Device3": {"scd_30_sensor": {"SCD_30_CO2": 845.9, "SCD_30_HUM": 42.0, "SCD_30_TEMP": 22.5}, "light_sensor": {"LS_lightStrength": 530.0}, "magnetic_sensors": {"MS_S1": False, "MS_S2": True, "MS_S3": False, "MS_S4": False, "MS_S5": True}, "battery_voltage": {"bat_voltage": 3.95}},
+    },
+}))
+
+def create_certificate(directory:str) -> tuple:
+    """
+    Create a self signed certificate for local benchmarks (requires openssl)
+
+    returns:
+    (certfile, keyfile)
+    """
+
+    certfile = os.path.join(directory, "certificate.crt")
+    keyfile = os.path.join(directory, "certificate.key")
+
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", keyfile, "-out", certfile, "-days", "1", "-subj", "/CN=localhost"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    return (certfile, keyfile)
+
+def free_port() -> int:
+    """
+    Get a free local port
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def raise_fd_limit():
+    """
+    Raise the open file limit so many simulated masters can be connected at once
+    """
+
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except Exception:
+        pass
+
+async def simulate_master(port:int, message:str) -> str:
+    """
+    Connect like a master, send one message and return the answer
+    """
+
+    context = ssl._create_unverified_context()
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, ssl=context, server_hostname="localhost")
+    try:
+        writer.write(str.encode(message + "\n"))
+        await writer.drain()
+
+        answer = await reader.readuntil(b"\n")
+
+        return bytes.decode(answer[:-1])
+
+    finally:
+        writer.close()
+
+async def simulate_masters(port:int, number_of_masters:int, message:str) -> tuple:
+    """
+    Simulate a number of masters uploading at the same time
+
+    returns:
+    (confirmed, failed, seconds)
+    """
+
+    start = perf_counter()
+    answers = await asyncio.gather(*[simulate_master(port, message) for _ in range(number_of_masters)], return_exceptions=True)
+    duration = perf_counter() - start
+
+    confirmed = sum(1 for answer in answers if answer == "confirmed")
+
+    return (confirmed, len(answers) - confirmed, duration)
+
+def run_masters_process(port:int, number_of_masters:int, message:str, results):
+    """
+    Entry point of client process (clients must not share the gil with the server under test)
+    """
+
+    raise_fd_limit()
+    results.put(asyncio.run(simulate_masters(port, number_of_masters, message)))
+
+def benchmark_listener(masters_counts=(10, 100, 1000)):
+    """
+    Compare threaded SSL listener (serial and worker pool) with AsyncSSL
+    """
+
+    raise_fd_limit()
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = create_certificate(directory)
+
+        implementations = [
+            ("SSL serial", lambda port: server.SSL("127.0.0.1", port, certfile=certfile, keyfile=keyfile)),
+            ("SSL max_workers=16", lambda port: server.SSL("127.0.0.1", port, max_workers=16, certfile=certfile, keyfile=keyfile)),
+            ("AsyncSSL", lambda port: server.AsyncSSL("127.0.0.1", port, certfile=certfile, keyfile=keyfile)),
+        ]
+
+        print(f"{'implementation':<22}{'masters':>8}{'confirmed':>11}{'failed':>8}{'seconds':>10}{'masters/s':>11}")
+
+        for name, create in implementations:
+            port = free_port()
+
+            with contextlib.redirect_stdout(io.StringIO()): #server prints every connection
+                instance = create(port)
+                sleep(0.5) #wait for listener
+
+            for number_of_masters in masters_counts:
+                results = multiprocessing.Queue()
+                process = multiprocessing.Process(target=run_masters_process, args=(port, number_of_masters, "data~" + MEASUREMENT, results))
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    process.start()
+                    confirmed, failed, duration = results.get()
+                    process.join()
+
+                instance.Get_jsonBuffer() #empty buffer
+
+                print(f"{name:<22}{number_of_masters:>8}{confirmed:>11}{failed:>8}{duration:>10.3f}{number_of_masters / duration:>11.1f}")
+
+class ChunkedConnection:
+    def __init__(self, data:bytes, chunk_size:int = 16 * 1024) -> None:
+        """
+        Socket stand-in returning data in chunks of tls record size
+        """
+
+        self.__data = memoryview(data)
+        self.__position = 0
+        self.__chunk_size = chunk_size
+
+    def settimeout(self, timeout:float):
+        pass
+
+    def recv(self, buflen:int = 1024) -> bytes:
+        size = min(buflen, self.__chunk_size)
+        chunk = bytes(self.__data[self.__position:self.__position + size])
+        self.__position += len(chunk)
+
+        return chunk
+
+    def recv_into(self, buffer) -> int:
+        size = min(len(buffer), self.__chunk_size, len(self.__data) - self.__position)
+        buffer[:size] = self.__data[self.__position:self.__position + size]
+        self.__position += size
+
+        return size
+
+def legacy_read_from_conn(conn) -> str:
+    """
+    Character by character reader used before FrameReader (for comparison)
+    """
+
+    message = ""
+    while True:
+        data = conn.recv(buflen=1024)
+
+        if data == b"":
+            raise Exception("No data received.")
+
+        for chr in bytes.decode(data):
+            if chr == "\n":
+                return message
+
+            else:
+                message += chr
+
+def benchmark_frame_reader(frame_sizes=(1024, 1024 * 1024, 50 * 1024 * 1024), total_bytes=100 * 1024 * 1024):
+    """
+    Compare throughput of FrameReader with the legacy reader at different frame sizes
+    """
+
+    print(f"{'reader':<14}{'frame size':>12}{'frames':>8}{'seconds':>10}{'MB/s':>10}")
+
+    for frame_size in frame_sizes:
+        number_of_frames = max(1, total_bytes // frame_size)
+        data = (b"x" * frame_size + b"\n") * number_of_frames
+
+        readers = [
+            ("FrameReader", lambda conn: server.FrameReader(conn).Read_Frame),
+            ("legacy", lambda conn: (lambda: legacy_read_from_conn(conn))),
+        ]
+
+        for name, create in readers:
+            frames = number_of_frames if name == "FrameReader" else max(1, number_of_frames // 10) #legacy reader is too slow for the full amount
+            read = create(ChunkedConnection(data))
+
+            start = perf_counter()
+            for _ in range(frames):
+                read()
+            duration = perf_counter() - start
+
+            print(f"{name:<14}{frame_size:>12}{frames:>8}{duration:>10.3f}{frames * frame_size / duration / 1e6:>10.1f}")
+
+def create_backlog(number_of_records:int) -> list:
+    """
+    Create realistic measurements (changing values, 30 second steps) as sent by a master
+    """
+
+    random.seed(1)
+    start = datetime(2022, 4, 4, 8, 0, 0)
+
+    records = []
+    for i in range(number_of_records):
+        devices = {}
+        for device in ("Device1", "Device2", "Device3"):
+            sensors = {
+                "scd_30_sensor": {"SCD_30_CO2": random.uniform(400, 2000), "SCD_30_HUM": random.uniform(30, 60), "SCD_30_TEMP": random.uniform(18, 26)},
+                "light_sensor": {"LS_lightStrength": random.uniform(0, 1000)},
+                "battery_voltage": {"bat_voltage": random.uniform(3.4, 4.2)},
+            }
+
+            if device == "Device3":
+                sensors["magnetic_sensors"] = {f"MS_S{j}": random.random() < 0.3 for j in range(1, 6)}
+
+            devices[device] = sensors
+
+        timeStamp = (start + timedelta(seconds=30 * i)).strftime("%d/%m/%Y %H:%M:%S")
+        records.append(json.dumps({"master": "b827eb3a5c01", "timeStamp": timeStamp, "data": devices}))
+
+    return records
+
+def benchmark_compression(backlog_sizes=(1, 10, 100, 500), repetitions=20):
+    """
+    Compare bytes on the wire and cpu time (master: encoding, server: parsing) of plain and compressed uploads
+    """
+
+    print(f"{'encoding':<12}{'records':>8}{'bytes':>10}{'ratio':>8}{'master ms':>11}{'server ms':>11}")
+
+    for backlog_size in backlog_sizes:
+        payload = ";".join(json.dumps(record) for record in create_backlog(backlog_size))
+        json_payload = ";".join(create_backlog(backlog_size)) #json records ("json1")
+
+        def plain():
+            return str.encode("records~" + payload + "\n")
+
+        def compressed(zdict, payload=payload):
+            compressor = zlib.compressobj(level=6, zdict=zdict) if zdict != None else zlib.compressobj(level=6)
+            data = compressor.compress(str.encode(payload)) + compressor.flush()
+
+            return str.encode(f"zrecords~{len(data)}~") + data + b"\n"
+
+        encodings = [
+            ("plain", plain),
+            ("zlib", lambda: compressed(None)),
+            ("zlib+dict", lambda: compressed(server.ZLIB_DICTIONARY)),
+            ("json1", lambda: str.encode("records~" + json_payload + "\n")),
+            ("json1+dict", lambda: compressed(server.ZLIB_DICTIONARY_JSON, json_payload)),
+        ]
+
+        for name, encode in encodings:
+            start = perf_counter()
+            for _ in range(repetitions):
+                message = encode()
+            master_ms = (perf_counter() - start) / repetitions * 1000
+
+            server_ms = None
+            if name != "zlib": #server only knows the preset dictionary
+                handler = server.MessageHandler(max_buffered_records=backlog_size * repetitions)
+
+                start = perf_counter()
+                for _ in range(repetitions):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        handler._handle_stream(server.FrameReader(ChunkedConnection(message)))
+                server_ms = (perf_counter() - start) / repetitions * 1000
+
+            server_text = f"{server_ms:>11.3f}" if server_ms != None else f"{'-':>11}"
+            print(f"{name:<12}{backlog_size:>8}{len(message):>10}{len(message) / len(plain()):>8.3f}{master_ms:>11.3f}{server_text}")
+
+#conditions of database simulated by ORDS stand-in (name, arguments of OrdsStandIn)
+DATABASE_CONDITIONS = [
+    ("ideal", {}),
+    ("latency 20ms", {"latency_s": 0.02}),
+    ("latency 1ms/row", {"latency_s": 0.005, "latency_per_row_s": 0.001}),
+    ("errors 10%", {"error_rate": 0.1, "seed": 1}),
+    ("cap 50 req/s", {"max_requests_per_s": 50}),
+    ("cap 2000 rows/s", {"max_rows_per_s": 2000}),
+]
+
+def benchmark_database(number_of_records=2000, conditions=DATABASE_CONDITIONS, single_records=200):
+    """
+    Measure records/s of single row inserts, batched inserts and Uploader under simulated database conditions (ORDS stand-in)
+    """
+
+    records = create_backlog(number_of_records)
+
+    def send_single(db, records):
+        return [db.Send_single_measurement(record) for record in records]
+
+    def send_batched(db, records):
+        return db.Send_measurements(records)
+
+    def send_uploader(db, records):
+        queue = server.IngestQueue(max_items=len(records))
+        queue.Put([(i, record) for i, record in enumerate(records)])
+
+        done = threading.Event()
+        completed = []
+        def on_complete(entries, persisted):
+            completed.extend(entries)
+            if len(completed) == len(records):
+                done.set()
+
+        uploader = server.Uploader(db, queue.Drain, on_complete, workers=4, batch_size=100, retry_base_delay_s=0.1)
+
+        #wait until everything is stored (failed measurements are retried)
+        done.wait()
+        while uploader.Get_Stats()["stored"] < len(records) and uploader.Get_Stats()["waiting_retry"] > 0:
+            sleep(0.01)
+
+        stored = uploader.Get_Stats()["stored"]
+        uploader.Close()
+
+        return [True] * stored + [False] * (len(records) - stored)
+
+    paths = [
+        ("Send_single", send_single, {"batch_url": None}),
+        ("Send_measurements", send_batched, {"batch_size": 100}),
+        ("Uploader 4 workers", send_uploader, {"batch_size": 100}),
+    ]
+
+    print(f"{'condition':<18}{'path':<20}{'records':>9}{'requests':>10}{'stored':>8}{'seconds':>10}{'records/s':>11}")
+
+    for condition, arguments in conditions:
+        for name, send, database_arguments in paths:
+            standIn = ords_standin.OrdsStandIn(**arguments)
+            db = server.Database(url=standIn.Get_Url(), batch_url=database_arguments.get("batch_url", standIn.Get_Batch_Url()), batch_size=database_arguments.get("batch_size", 100))
+
+            selected = records if send != send_single else records[:single_records] #single row path is slow
+
+            with contextlib.redirect_stdout(io.StringIO()): #failed requests are printed
+                start = perf_counter()
+                results = send(db, selected)
+                duration = perf_counter() - start
+
+            stats = standIn.Get_Stats()
+            standIn.Close()
+
+            print(f"{condition:<18}{name:<20}{len(selected):>9}{stats['requests']:>10}{sum(1 for result in results if result):>8}{duration:>10.3f}{len(selected) / duration:>11.1f}")
+
+def benchmark_uploader(number_of_records=4000, workers_counts=(1, 2, 4, 8), latency_s=0.02, batch_size=50):
+    """
+    Compare upload throughput of Uploader with different worker counts (database latency simulated by ORDS stand-in)
+    """
+
+    records = create_backlog(number_of_records)
+
+    print(f"{'workers':>8}{'records':>9}{'stored':>8}{'in order':>10}{'seconds':>10}{'records/s':>11}")
+
+    for workers in workers_counts:
+        standIn = ords_standin.OrdsStandIn(latency_s=latency_s)
+        db = server.Database(url=standIn.Get_Url(), batch_url=standIn.Get_Batch_Url(), batch_size=batch_size)
+
+        queue = server.IngestQueue(max_items=number_of_records)
+        queue.Put([(i, record) for i, record in enumerate(records)])
+
+        completed = []
+        done = threading.Event()
+
+        def on_complete(entries, persisted):
+            completed.extend(id_ for id_, measurement in entries)
+            if len(completed) == number_of_records:
+                done.set()
+
+        start = perf_counter()
+        uploader = server.Uploader(db, queue.Drain, on_complete, workers=workers, max_in_flight=workers * 2, batch_size=batch_size)
+        done.wait()
+        duration = perf_counter() - start
+
+        stored = uploader.Get_Stats()["stored"]
+        uploader.Close()
+        standIn.Close()
+
+        print(f"{workers:>8}{number_of_records:>9}{stored:>8}{str(completed == sorted(completed)):>10}{duration:>10.3f}{number_of_records / duration:>11.1f}")
+
+def benchmark_fanout(number_of_records=2000, latency_s=0.05, batch_size=50):
+    """
+    Compare time until all measurements are stored per sink of FanOut (slow ORDS stand-in next to fast file archive)
+    """
+
+    records = create_backlog(number_of_records)
+
+    standIn = ords_standin.OrdsStandIn(latency_s=latency_s)
+    db = server.Database(url=standIn.Get_Url(), batch_url=standIn.Get_Batch_Url(), batch_size=batch_size)
+
+    queue = server.IngestQueue(max_items=number_of_records)
+    queue.Put([(i, record) for i, record in enumerate(records)])
+
+    completed = []
+    done = threading.Event()
+
+    def on_complete(entries, persisted):
+        completed.extend(id_ for id_, measurement in entries)
+        if len(completed) == number_of_records:
+            done.set()
+
+    with tempfile.TemporaryDirectory() as directory:
+        fanout = server.FanOut(queue.Drain, on_complete, batch_size=batch_size)
+        fanout.Add_Sink("ords", db, workers=2, max_in_flight=4, batch_size=batch_size)
+        fanout.Add_Sink("archive", server.FileArchiveSink(directory), batch_size=batch_size)
+
+        start = perf_counter()
+        fanout.Start()
+
+        #time until sink stored all measurements
+        finished = {}
+        while len(finished) < 2:
+            for name, stats in fanout.Get_Stats().items():
+                if name != "pending" and name not in finished and stats["uploader"]["stored"] == number_of_records:
+                    finished[name] = perf_counter() - start
+            sleep(0.001)
+
+        done.wait()
+        duration = perf_counter() - start
+
+        stats = fanout.Get_Stats()
+        standIn.Close()
+
+    print(f"{'sink':>10}{'stored':>8}{'seconds':>10}{'records/s':>11}")
+    for name, seconds in finished.items():
+        print(f"{name:>10}{stats[name]['uploader']['stored']:>8}{seconds:>10.3f}{number_of_records / seconds:>11.1f}")
+    print(f"completed: {len(completed)} in {duration:.3f}s")
+
+def benchmark_archive(number_of_records=50000, page_size=10000, latency_s=0.2):
+    """
+    Compare reading all measurements back: paginated ORDS GET (like get_data_all of analysis) and parquet archive
+    """
+
+    if server.pyarrow == None:
+        print("pyarrow not installed")
+        return
+
+    import pyarrow.dataset
+
+    records = create_backlog(number_of_records)
+
+    standIn = ords_standin.OrdsStandIn(latency_s=latency_s) #latency of database per request (simulated by stand-in)
+    db = server.Database(url=standIn.Get_Url(), batch_url=standIn.Get_Batch_Url(), batch_size=1000)
+    db.Send_measurements(records)
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = server.ParquetArchiveSink(directory)
+        for start in range(0, number_of_records, 1000):
+            archive.Send_measurements(records[start:start + 1000])
+        archive.Close()
+        archive.Compact(all_partitions=True)
+
+        def read_ords():
+            rows = []
+            offset = 0
+            while True:
+                page = requests.get(standIn.Get_Url(), params={"limit": page_size, "offset": offset}).json()
+                rows.extend(page["items"])
+                offset += page["count"]
+                if not page["hasMore"]:
+                    return len(rows)
+
+        def read_parquet():
+            return pyarrow.dataset.dataset(directory, partitioning="hive").to_table().num_rows
+
+        print(f"{'reader':<22}{'rows':>8}{'seconds':>10}{'rows/s':>12}")
+
+        for name, read in [(f"ORDS GET (limit {page_size})", read_ords), ("parquet archive", read_parquet)]:
+            start = perf_counter()
+            rows = read()
+            duration = perf_counter() - start
+
+            print(f"{name:<22}{rows:>8}{duration:>10.3f}{rows / duration:>12.1f}")
+
+    standIn.Close()
+
+def benchmark_timeseries(days=365, intervall_s=30, number_of_records=20000):
+    """
+    Measure append rate of TimeSeriesStore and range scans of a year of 30-second data
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = server.TimeSeriesStore(directory)
+
+        #ingest pipeline: whole measurements (every reading is a point)
+        records = [server.Measurement.From_Json(record) for record in create_backlog(number_of_records)]
+
+        start = perf_counter()
+        for i in range(0, number_of_records, 100):
+            store.Send_measurements(records[i:i + 100])
+        duration = perf_counter() - start
+
+        points = store.Get_Stats()["points"]
+        print(f"ingest: {number_of_records} measurements ({points} points) in {duration:.3f}s -> {number_of_records / duration:.1f} measurements/s, {points / duration:.1f} points/s")
+
+        #one series of a year
+        first = int(datetime(2022, 1, 1).timestamp() * 1000)
+        number_of_points = days * 24 * 3600 // intervall_s
+        timestamps = [first + i * intervall_s * 1000 for i in range(number_of_points)]
+        values = [random.uniform(400, 2000) for i in range(number_of_points)]
+
+        start = perf_counter()
+        for i in range(0, number_of_points, 10000):
+            store.Append("b827eb000001", "Device1", "year", list(zip(timestamps[i:i + 10000], values[i:i + 10000])))
+        duration = perf_counter() - start
+        print(f"append: {number_of_points} points in {duration:.3f}s -> {number_of_points / duration:.1f} points/s")
+
+        print(f"{'range':<8}{'points':>9}{'ms':>10}")
+
+        for name, length_days in [("year", days), ("month", 30), ("day", 1), ("hour", 1 / 24)]:
+            begin = first + random.randint(0, int((days - length_days) * 24 * 3600)) * 1000
+            end = begin + int(length_days * 24 * 3600 * 1000)
+
+            repetitions = 20
+            start = perf_counter()
+            for _ in range(repetitions):
+                scanned, scannedValues = store.Scan("b827eb000001", "Device1", "year", begin, end)
+            duration = (perf_counter() - start) / repetitions
+
+            print(f"{name:<8}{len(scanned):>9}{duration * 1000:>10.3f}")
+
+        #backlog of a master after an outage of a day (older than latest point -> late points)
+        backlog = [(timeStamp - 2 * 24 * 3600 * 1000 + 1, value) for timeStamp, value in zip(timestamps[-2880:], values[-2880:])]
+        for i in range(0, len(backlog), 100):
+            store.Append("b827eb000001", "Device1", "year", backlog[i:i + 100])
+
+        for name in ["late", "merged"]:
+            if name == "merged":
+                store.Flush()
+
+            start = perf_counter()
+            scanned, scannedValues = store.Scan("b827eb000001", "Device1", "year", first, first + days * 24 * 3600 * 1000)
+            print(f"year with day of backlog ({name}): {len(scanned)} points in {(perf_counter() - start) * 1000:.3f}ms")
+
+        store.Close()
+
+def benchmark_rollup(number_of_records=20000, batch_sizes=(1, 100)):
+    """
+    Measure update rate of RollupEngine (in order and shuffled like cache flushes of masters) and query time of daily curves compared to raw rows
+    """
+
+    records = [server.Measurement.From_Json(record) for record in create_backlog(number_of_records)]
+    shuffled = random.sample(records, len(records))
+
+    print(f"{'order':<10}{'batch':>7}{'records':>9}{'seconds':>10}{'records/s':>11}")
+
+    for name, selected in [("in order", records), ("shuffled", shuffled)]:
+        for batch_size in batch_sizes:
+            selected_records = selected if batch_size > 1 else selected[:2000] #single records are slow
+
+            with tempfile.TemporaryDirectory() as directory:
+                rollups = server.RollupEngine(directory + "/rollups.sqlite")
+
+                start = perf_counter()
+                for i in range(0, len(selected_records), batch_size):
+                    rollups.Send_measurements(selected_records[i:i + batch_size])
+                duration = perf_counter() - start
+
+            print(f"{name:<10}{batch_size:>7}{len(selected_records):>9}{duration:>10.3f}{len(selected_records) / duration:>11.1f}")
+
+    rollups = server.RollupEngine()
+    rollups.Send_measurements(records)
+
+    first = records[0].timeStamp.replace(hour=0, minute=0, second=0)
+    last = records[-1].timeStamp + timedelta(days=1)
+
+    #daily curve of CO2 (15 minute means) from raw rows and from rollups
+    start = perf_counter()
+    buckets = {}
+    for measurement in records:
+        for deviceName, sensorName, measurementName, measurementData in measurement.readings:
+            if deviceName == "Device1" and measurementName == "SCD_30_CO2":
+                buckets.setdefault(measurement.timeStamp.replace(minute=measurement.timeStamp.minute // 15 * 15, second=0), []).append(measurementData)
+    raw = {bucket: sum(values) / len(values) for bucket, values in buckets.items()}
+    raw_duration = perf_counter() - start
+
+    start = perf_counter()
+    curve = rollups.Get_Rollups(records[0].master, "Device1", "SCD_30_CO2", "15min", first, last)
+    rollup_duration = perf_counter() - start
+
+    print(f"15 minute CO2 curve ({len(curve)} buckets): raw rows {raw_duration * 1000:.1f}ms, rollups {rollup_duration * 1000:.1f}ms")
+
+def benchmark_query(days=365, intervall_s=30, points=1000, repetitions=5):
+    """
+    Measure response time of QueryServer for a year of 30-second data (downsampled, first query and cached)
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = server.TimeSeriesStore(directory)
+
+        first = int(datetime(2022, 1, 1).timestamp() * 1000)
+        number_of_points = days * 24 * 3600 // intervall_s
+        store.Append("b827eb000001", "Device3", "SCD_30_CO2", [(first + i * intervall_s * 1000, 600 + 300 * math.sin(i / 500) + random.gauss(0, 20)) for i in range(number_of_points)])
+
+        queryServer = server.QueryServer(store, port=0)
+        session = requests.Session()
+
+        print(f"{'method':<8}{'points':>8}{'returned':>10}{'first ms':>10}{'cached ms':>11}{'bytes':>9}")
+
+        for method in server.DOWNSAMPLERS.keys():
+            query = {"master": "b827eb000001", "device": "Device3", "metric": "co2", "from": "2022-01-01", "to": "2023-01-01", "points": points, "method": method}
+
+            start = perf_counter()
+            answer = session.get(queryServer.Get_Url(), params=query)
+            first_duration = perf_counter() - start
+
+            start = perf_counter()
+            for _ in range(repetitions):
+                session.get(queryServer.Get_Url(), params=query)
+            cached_duration = (perf_counter() - start) / repetitions
+
+            print(f"{method:<8}{number_of_points:>8}{len(answer.json()['points']):>10}{first_duration * 1000:>10.1f}{cached_duration * 1000:>11.1f}{len(answer.content):>9}")
+
+        print(queryServer.Get_Stats())
+
+        queryServer.Close()
+        store.Close()
+
+def legacy_decode(token:bytes):
+    """
+    Decoding work per record before Measurement (receive, deduplication, database and error check decoded the record each)
+    """
+
+    measurement = json.loads(token) #receive: json string
+    json.loads(measurement) #deduplication: key
+
+    for _ in range(2): #database and error check: data and timestamp
+        measurement_json = json.loads(measurement)
+        datetime.strptime(measurement_json["timeStamp"], "%d/%m/%Y %H:%M:%S")
+
+def benchmark_measurement(number_of_records=20000):
+    """
+    Compare cpu time per record of legacy decoding with Measurement (decoded once) and memory per buffered record
+    """
+
+    records = create_backlog(number_of_records)
+    legacy_tokens = [str.encode(json.dumps(record)) for record in records] #double encoded
+    json_tokens = [str.encode(record) for record in records] #json records ("json1")
+
+    decoders = [
+        ("legacy (4x decode)", legacy_decode, legacy_tokens),
+        ("Measurement legacy", server.Measurement.From_Record, legacy_tokens),
+        ("Measurement json1", server.Measurement.From_Record, json_tokens),
+    ]
+
+    print(f"{'decoder':<22}{'records':>9}{'us/record':>11}")
+
+    for name, decode, tokens in decoders:
+        start = perf_counter()
+        for token in tokens:
+            decode(token)
+        duration = perf_counter() - start
+
+        print(f"{name:<22}{len(tokens):>9}{duration / len(tokens) * 1e6:>11.2f}")
+
+    print()
+    print(f"{'buffered as':<22}{'bytes/record':>13}")
+
+    representations = [
+        ("json string", lambda: [bytes.decode(token) for token in json_tokens]),
+        ("nested dicts", lambda: [json.loads(token) for token in json_tokens]),
+        ("Measurement", lambda: [server.Measurement.From_Record(token) for token in json_tokens]),
+    ]
+
+    for name, create in representations:
+        tracemalloc.start()
+        buffered = create()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print(f"{name:<22}{size / len(buffered):>13.0f}")
+
+def benchmark_timestamp(number_of_timestamps=1000000):
+    """
+    Compare strptime/strftime with Parse_TimeStamp/Format_Ords_TimeStamp (measurements 30 seconds apart)
+    """
+
+    start_time = datetime(2022, 4, 4, 8, 0, 0)
+    times = [start_time + timedelta(seconds=30 * i) for i in range(number_of_timestamps)]
+    legacy = [time.strftime("%d/%m/%Y %H:%M:%S") for time in times]
+    epoch_ms = [int(time.timestamp() * 1000) for time in times]
+
+    codecs = [
+        ("parse strptime", lambda: [datetime.strptime(timeStamp, "%d/%m/%Y %H:%M:%S") for timeStamp in legacy]),
+        ("parse legacy", lambda: [server.Parse_TimeStamp(timeStamp) for timeStamp in legacy]),
+        ("parse epoch ms", lambda: [server.Parse_TimeStamp(timeStamp) for timeStamp in epoch_ms]),
+        ("format strftime", lambda: [time.strftime("%d-%b-%Y %I:%M:%S %p") for time in times]),
+        ("format ORDS", lambda: [server.Format_Ords_TimeStamp(time) for time in times]),
+    ]
+
+    print(f"{'codec':<18}{'timestamps':>11}{'seconds':>10}{'ns/timestamp':>14}")
+
+    for name, run in codecs:
+        start = perf_counter()
+        run()
+        duration = perf_counter() - start
+
+        print(f"{name:<18}{number_of_timestamps:>11}{duration:>10.3f}{duration / number_of_timestamps * 1e9:>14.0f}")
+
+BENCHMARKS = {
+    "listener": benchmark_listener,
+    "frame_reader": benchmark_frame_reader,
+    "compression": benchmark_compression,
+    "database": benchmark_database,
+    "uploader": benchmark_uploader,
+    "fanout": benchmark_fanout,
+    "archive": benchmark_archive,
+    "timeseries": benchmark_timeseries,
+    "rollup": benchmark_rollup,
+    "query": benchmark_query,
+    "measurement": benchmark_measurement,
+    "timestamp": benchmark_timestamp,
+}
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] if len(sys.argv) > 1 else list(BENCHMARKS.keys())
+
+    for name in selected:
+        print(f"### {name} ###")
+        BENCHMARKS[name]()
+        print()
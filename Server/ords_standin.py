@@ -0,0 +1,310 @@
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.parse import parse_qsl, urlsplit
+
+#columns of table any_sensor_data_entry (without entryid)
+COLUMNS = [
+    "inserttime",
+    "device1humidity", "device1co2", "device1temp",
+    "device2humidity", "device2co2", "device2temp",
+    "device3humidity", "device3co2", "device3temp",
+    "device3window1a", "device3window2b", "device3window3a", "device3window4b", "device3window5a",
+    "device1light", "device2light", "device3light",
+    "device1battery", "device2battery", "device3battery",
+]
+
+class TokenBucket:
+    def __init__(self, rate:float) -> None:
+        """
+        Limits throughput to rate tokens per second (starts empty, burst of one second)
+        """
+
+        self.__rate = rate
+        self.__tokens = 0
+        self.__updated = monotonic()
+        self.__lock = threading.Lock()
+
+    def Take(self, tokens:float):
+        """
+        This method waits until tokens are available and takes them
+        """
+
+        with self.__lock: #requests are served one after another while the cap is reached
+            while True:
+                now = monotonic()
+                self.__tokens = min(self.__rate, self.__tokens + (now - self.__updated) * self.__rate)
+                self.__updated = now
+
+                if self.__tokens >= min(tokens, self.__rate):
+                    self.__tokens -= tokens
+                    return
+
+                sleep((min(tokens, self.__rate) - self.__tokens) / self.__rate)
+
+class OrdsStandIn:
+    def __init__(self, host:str = "127.0.0.1", port:int = 0, latency_s:float = 0, latency_per_row_s:float = 0, error_rate:float = 0, max_requests_per_s:float = None, max_rows_per_s:float = None, columns:list = None, seed:int = None) -> None:
+        """
+        Local stand-in for the ORDS endpoints of table any_sensor_data_entry (for tests and benchmarks)
+
+        endpoints:
+        POST /ords/sensor_datalake2/sens/any_sensor_data_entry/ -> form data of one row
+        POST /ords/sensor_datalake2/sens/any_sensor_data_batch/ -> {"items": [rows]}, answers {"results": [1, 0, ...]}
+        GET /ords/sensor_datalake2/sens/any_sensor_data_entry/?limit=25&offset=0 -> {"items": [rows], "hasMore": ..., "limit": ..., "offset": ..., "count": ...}
+
+        params:
+        host: host to listen on
+        port: port to listen on (0 -> free port)
+        latency_s: simulated latency of database per request (inserts and reads)
+        latency_per_row_s: simulated additional latency per inserted or read row
+        error_rate: share of requests answered with 503 (nothing inserted or read)
+        max_requests_per_s: throughput cap of requests (None -> unlimited)
+        max_rows_per_s: throughput cap of inserted and read rows (None -> unlimited)
+        columns: columns of table (None -> COLUMNS, e.g. ["inserttime"] + Compile_Measurement_Schema(schema)[1] for more devices)
+        seed: seed of simulated errors (None -> random)
+        """
+
+        self.__rows = []
+        self.__rows_lock = threading.Lock()
+        self.__stats = {"requests": 0, "errors": 0, "rejected_rows": 0}
+        self.__latency_s = latency_s
+        self.__latency_per_row_s = latency_per_row_s
+        self.__error_rate = error_rate
+        self.__random = random.Random(seed)
+        self.__request_bucket = TokenBucket(max_requests_per_s) if max_requests_per_s != None else None
+        self.__row_bucket = TokenBucket(max_rows_per_s) if max_rows_per_s != None else None
+        self.__columns = set(columns if columns != None else COLUMNS)
+        self.__available = True
+
+        self.__server = ThreadingHTTPServer((host, port), self.__create_handler())
+        self.__server.daemon_threads = True
+
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def __create_handler(self):
+        """
+        This method creates the request handler class bound to this instance
+        """
+
+        standIn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" #keep-alive
+            disable_nagle_algorithm = True #headers and body are written separately
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if not standIn._is_available():
+                    self.close_connection = True
+                    return
+
+                url = urlsplit(self.path)
+
+                if not url.path.endswith("/any_sensor_data_entry/"):
+                    self.__answer(404, b"")
+                    return
+
+                if standIn._simulate_request():
+                    self.__answer(503, b"")
+                    return
+
+                try:
+                    query = dict(parse_qsl(url.query))
+                    limit = int(query.get("limit", 25))
+                    offset = int(query.get("offset", 0))
+                except Exception:
+                    self.__answer(400, b"")
+                    return
+
+                self.__answer(200, str.encode(json.dumps(standIn._select(limit, offset))))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if not standIn._is_available():
+                    self.close_connection = True
+                    return
+
+                if standIn._simulate_request():
+                    self.__answer(503, b"")
+                    return
+
+                if self.path.endswith("/any_sensor_data_entry/"):
+                    ok = standIn._insert(dict(parse_qsl(bytes.decode(body))))
+                    self.__answer(201 if ok else 400, b"")
+
+                elif self.path.endswith("/any_sensor_data_batch/"):
+                    try:
+                        items = json.loads(body)["items"]
+                    except Exception:
+                        self.__answer(400, b"")
+                        return
+
+                    results = standIn._insert_many(items)
+                    self.__answer(200, str.encode(json.dumps({"results": results})))
+
+                else:
+                    self.__answer(404, b"")
+
+            def __answer(self, status:int, body:bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def _is_available(self) -> bool:
+        return self.__available
+
+    def _simulate_request(self) -> bool:
+        """
+        This method applies throughput cap and latency of a request
+
+        returns:
+        true -> request fails (simulated error)
+        """
+
+        if self.__request_bucket != None:
+            self.__request_bucket.Take(1)
+
+        sleep(self.__latency_s)
+
+        with self.__rows_lock:
+            self.__stats["requests"] += 1
+            failed = self.__random.random() < self.__error_rate
+            if failed:
+                self.__stats["errors"] += 1
+
+        return failed
+
+    def __check_row(self, row:dict) -> bool:
+        """
+        This method checks a row like the table does (inserttime required, no unknown columns)
+        """
+
+        if row.get("inserttime") in (None, ""):
+            return False
+
+        return all(column in self.__columns for column in row.keys())
+
+    def _insert(self, row:dict) -> bool:
+        """
+        This method inserts a single row
+        """
+
+        return self._insert_many([row])[0] == 1
+
+    def _insert_many(self, rows:list) -> list:
+        """
+        This method inserts many rows
+
+        returns:
+        result of every row (1 -> inserted, 0 -> failed)
+        """
+
+        if self.__row_bucket != None:
+            self.__row_bucket.Take(len(rows))
+
+        sleep(self.__latency_per_row_s * len(rows))
+
+        results = [1 if self.__check_row(row) else 0 for row in rows]
+
+        with self.__rows_lock:
+            for row, result in zip(rows, results):
+                if result == 1:
+                    self.__rows.append(dict(row, entryid=len(self.__rows) + 1))
+                else:
+                    self.__stats["rejected_rows"] += 1
+
+        return results
+
+    def _select(self, limit:int, offset:int) -> dict:
+        """
+        This method gets a page of rows like the AutoREST GET of ORDS (throughput cap and latency per row apply to read rows)
+        """
+
+        with self.__rows_lock:
+            items = self.__rows[offset:offset + limit]
+            hasMore = offset + limit < len(self.__rows)
+
+        if self.__row_bucket != None:
+            self.__row_bucket.Take(len(items))
+
+        sleep(self.__latency_per_row_s * len(items))
+
+        return {"items": items, "hasMore": hasMore, "limit": limit, "offset": offset, "count": len(items)}
+
+    def Set_Available(self, available:bool):
+        """
+        This method simulates an outage (false -> connections are closed without answer)
+        """
+
+        self.__available = available
+
+    def Get_Url(self) -> str:
+        """
+        This method gets url of single row endpoint
+        """
+
+        return f"http://{self.__server.server_address[0]}:{self.__server.server_address[1]}/ords/sensor_datalake2/sens/any_sensor_data_entry/"
+
+    def Get_Batch_Url(self) -> str:
+        """
+        This method gets url of batch endpoint
+        """
+
+        return f"http://{self.__server.server_address[0]}:{self.__server.server_address[1]}/ords/sensor_datalake2/sens/any_sensor_data_batch/"
+
+    def Get_Rows(self) -> list:
+        """
+        This method gets a copy of all inserted rows
+        """
+
+        with self.__rows_lock:
+            return list(self.__rows)
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters (rows inserted, requests handled, simulated errors, rejected rows)
+        """
+
+        with self.__rows_lock:
+            return dict(self.__stats, rows=len(self.__rows))
+
+    def Close(self):
+        """
+        This method stops the stand-in (open keep-alive connections are not answered anymore)
+        """
+
+        self.__available = False
+        self.__server.shutdown()
+        self.__server.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for the ORDS endpoints of table any_sensor_data_entry")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0, help="latency per request in seconds")
+    parser.add_argument("--latency-per-row", type=float, default=0, help="latency per inserted row in seconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 503")
+    parser.add_argument("--max-requests-per-s", type=float, default=None)
+    parser.add_argument("--max-rows-per-s", type=float, default=None)
+    args = parser.parse_args()
+
+    standIn = OrdsStandIn(port=args.port, latency_s=args.latency, latency_per_row_s=args.latency_per_row, error_rate=args.error_rate, max_requests_per_s=args.max_requests_per_s, max_rows_per_s=args.max_rows_per_s)
+    print(f"ORDS stand-in listening: {standIn.Get_Url()} {standIn.Get_Batch_Url()}")
+
+    try:
+        while True:
+            sleep(10)
+            print(standIn.Get_Stats())
+
+    except KeyboardInterrupt:
+        standIn.Close()
@@ -1,470 +1,4343 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import json
+import sys
+import array
+import bisect
+import mmap
+import struct
+import zlib
+import heapq
+import hashlib
+import math
+import random
+import sqlite3
 import threading
+from collections import deque, OrderedDict
+import asyncio
 import socket
 import ssl
 import os
 from time import monotonic, sleep
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
 import smtplib
 import yaml
 import requests
 
+try: #only required for parquet archive
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+#preset dictionary of compressed uploads (typical measurement as sent by a master, most frequent strings at the end)
+#changing it requires a new compression name, master and server must use identical dictionaries
+ZLIB_DICTIONARY_NAME = "zlib1"
+ZLIB_DICTIONARY = rb'"{\"master\": \"\", \"timeStamp\": \"/04/2022 10:\", \"data\": {\"Device1\": \"BLE_error\", \"Device2\": {\"scd_30_sensor\": {\"SCD_30_CO2\": \"read_failed\", \"SCD_30_HUM\": \"read_failed\", \"SCD_30_TEMP\": \"read_failed\"}, \"light_sensor\": \"physical_connection_error\", \"battery_voltage\": {\"bat_voltage\": \"read_failed\"}}, \"Device3\": {\"scd_30_sensor\": {\"SCD_30_CO2\": 812.0, \"SCD_30_HUM\": 41.0, \"SCD_30_TEMP\": 22.0}, \"magnetic_sensors\": {\"MS_S1\": false, \"MS_S2\": true, \"MS_S3\": false, \"MS_S4\": true, \"MS_S5\": false}, \"light_sensor\": {\"LS_lightStrength\": 512.0}, \"battery_voltage\": {\"bat_voltage\": 3.9}}}}";'
+
+#records of masters supporting this feature are json objects (not json objects encoded as json string)
+JSON_RECORDS_NAME = "json1"
+
+#preset dictionary of compressed uploads with json records (same measurement, not encoded as string)
+ZLIB_DICTIONARY_JSON = str.encode(json.loads(ZLIB_DICTIONARY[:-1])) + b";"
+
+#preset dictionaries by their id in the zlib header (master chooses dictionary matching its record format)
+ZLIB_DICTIONARIES = {zlib.adler32(dictionary): dictionary for dictionary in (ZLIB_DICTIONARY, ZLIB_DICTIONARY_JSON)}
+
 class Error(object):
     PhysicalConnectionerror = "physical_connection_error" #cannot communiacte with device
     ReadFailure = "read_failed" #cannot read measurement
     BleFailure = "BLE_error" #cannot connect to microcontroller over ble
     BatLowVoltage = "Battery_Low_Voltage" #battery is on a critical voltage level
+    OutOfRange = "Out_Of_Range" #reading outside of physical range
+    RateOfChange = "Rate_Of_Change" #reading changed faster than possible
+    FlatLine = "Flat_Line" #sensor sends identical readings (stuck)
+    Outlier = "Outlier" #reading far from recent readings
+    Drift = "Drift" #recent readings left long-term range
+
+def Encode_Index_Ranges(indices:list) -> str:
+    """
+    Encode ascending record indices as ranges (e.g. [0, 1, 2, 5, 7, 8] -> "0-2,5,7-8")
+    """
+
+    ranges = []
+    start = None
+    previous = None
+    for index in indices:
+        if start != None and index == previous + 1:
+            previous = index
+            continue
+
+        if start != None:
+            ranges.append(str(start) if start == previous else f"{start}-{previous}")
+
+        start = index
+        previous = index
+
+    if start != None:
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+
+    return ",".join(ranges)
+
+#month names of ORDS timestamps ("%b" in english)
+ORDS_MONTHS = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+TWO_DIGITS = tuple(f"{number:02d}" for number in range(60))
+ORDS_HOURS = tuple(f"{hour % 12 or 12:02d}" for hour in range(24)) #hour of 12-hour clock
+ORDS_PERIODS = tuple("AM" if hour < 12 else "PM" for hour in range(24))
+
+_date_memo = {} #date part of legacy timestamps -> (year, month, day)
+_ords_date_memo = {} #(year, month, day) -> date part of ORDS timestamp
+
+def Parse_TimeStamp(timeStamp) -> datetime:
+    """
+    Parse timestamp of a measurement ("%d/%m/%Y %H:%M:%S" or epoch milliseconds)
+
+    fixed layout is parsed without strptime (date part is memoized, measurements of a day share it)
+    """
+
+    if isinstance(timeStamp, int): #epoch milliseconds -> local time (like legacy timestamps)
+        return datetime.fromtimestamp(timeStamp / 1000)
+
+    if len(timeStamp) != 19 or timeStamp[2] != "/" or timeStamp[5] != "/" or timeStamp[10] != " " or timeStamp[13] != ":" or timeStamp[16] != ":":
+        return datetime.strptime(timeStamp, "%d/%m/%Y %H:%M:%S") #not in fixed layout
+
+    date = _date_memo.get(timeStamp[:10])
+    if date == None:
+        date = (int(timeStamp[6:10]), int(timeStamp[3:5]), int(timeStamp[0:2]))
+
+        if len(_date_memo) >= 4096:
+            _date_memo.clear()
+        _date_memo[timeStamp[:10]] = date
+
+    return datetime(date[0], date[1], date[2], int(timeStamp[11:13]), int(timeStamp[14:16]), int(timeStamp[17:19]))
+
+def Format_Ords_TimeStamp(timeStamp:datetime) -> str:
+    """
+    Format timestamp for ORDS (same as strftime("%d-%b-%Y %I:%M:%S %p"), date part is cached)
+    """
+
+    date = (timeStamp.year, timeStamp.month, timeStamp.day)
+
+    date_text = _ords_date_memo.get(date)
+    if date_text == None:
+        date_text = f"{timeStamp.day:02d}-{ORDS_MONTHS[timeStamp.month]}-{timeStamp.year:04d}"
+
+        if len(_ords_date_memo) >= 4096:
+            _ords_date_memo.clear()
+        _ords_date_memo[date] = date_text
+
+    hour = timeStamp.hour
+
+    return f"{date_text} {ORDS_HOURS[hour]}:{TWO_DIGITS[timeStamp.minute]}:{TWO_DIGITS[timeStamp.second]} {ORDS_PERIODS[hour]}"
+
+class Measurement:
+    __slots__ = ("master", "timeStamp", "readings", "errors", "key", "raw")
+
+    def __init__(self, master:str, timeStamp:datetime, readings:tuple, errors:tuple, key:str, raw:str) -> None:
+        """
+        Measurement of a master decoded once (shared by database, error check, ...)
+
+        params:
+        master: identity of master ("" if not sent)
+        timeStamp: time of measurement (sent as "%d/%m/%Y %H:%M:%S" or epoch milliseconds)
+        readings: values as tuple of (device, sensor, measurement, value)
+        errors: errors as tuple of (device, sensor, measurement, error) -> sensor and measurement are None if whole device/sensor failed
+        key: identity of measurement (master and timestamp, hash of raw if master is not sent)
+        raw: measurement as json string (as stored in write-ahead log and retry queue)
+        """
+
+        self.master = master
+        self.timeStamp = timeStamp
+        self.readings = readings
+        self.errors = errors
+        self.key = key
+        self.raw = raw
+
+    @staticmethod
+    def From_Dict(measurement_json:dict, raw:str):
+        """
+        Create measurement from decoded json (raises an error if invalid)
+        """
+
+        readings = []
+        errors = []
+
+        #iterate over device, sensor and measurement (names are interned -> shared by all measurements)
+        for deviceName, deviceData in measurement_json["data"].items():
+            deviceName = sys.intern(deviceName)
+
+            if deviceData == Error.BleFailure: #device has ble error
+                errors.append((deviceName, None, None, Error.BleFailure))
+                continue
+
+            for sensorName, sensorData in deviceData.items():
+                sensorName = sys.intern(sensorName)
+
+                if sensorData == Error.PhysicalConnectionerror: #sensor has physical connection error
+                    errors.append((deviceName, sensorName, None, Error.PhysicalConnectionerror))
+                    continue
+
+                for measurementName, measurementData in sensorData.items():
+                    measurementName = sys.intern(measurementName)
+
+                    if measurementData == Error.ReadFailure: #read failure occured
+                        errors.append((deviceName, sensorName, measurementName, Error.ReadFailure))
+                    else:
+                        readings.append((deviceName, sensorName, measurementName, measurementData))
+
+        master = measurement_json.get("master", "")
+        timeStamp = measurement_json["timeStamp"]
+
+        if master != "":
+            key = f"{master}|{timeStamp}"
+        else: #legacy master without identity -> timestamps of different masters collide -> key on whole record
+            key = "|" + hashlib.blake2b(str.encode(raw), digest_size=16).hexdigest()
+
+        return Measurement(master, Parse_TimeStamp(timeStamp), tuple(readings), tuple(errors), key, raw)
+
+    @staticmethod
+    def From_Json(raw:str):
+        """
+        Create measurement from json string (raises an error if invalid)
+        """
+
+        return Measurement.From_Dict(json.loads(raw), raw)
+
+    @staticmethod
+    def From_Record(token:bytes):
+        """
+        Create measurement from a received record (raises an error if invalid)
+
+        record is a json object ("json1") or a json object encoded as json string (legacy masters)
+        """
+
+        decoded = json.loads(token)
+
+        if isinstance(decoded, str): #legacy -> decode inner json
+            return Measurement.From_Json(decoded)
+
+        return Measurement.From_Dict(decoded, bytes.decode(bytes(token)))
+
+    @staticmethod
+    def Parse(measurement):
+        """
+        Get measurement of a json string (measurements are returned as they are)
+        """
+
+        if isinstance(measurement, Measurement):
+            return measurement
+
+        return Measurement.From_Json(measurement)
+
+    def __repr__(self) -> str:
+        return self.raw
+
+class FrameReader:
+    def __init__(self, conn:socket.socket, delimiter:bytes = b"\n", max_frame_size:int = 64 * 1024 * 1024, initial_size:int = 64 * 1024) -> None:
+        """
+        Init frame reader (reads delimiter separated frames from a socket)
+
+        Data is received with recv_into into one growing bytearray, the delimiter is
+        searched with find (already searched bytes are not searched again) and every
+        frame is decoded exactly once. Bytes received after a delimiter are kept for the next frame.
+
+        params:
+        conn: connected socket (or ssl socket)
+        delimiter: end of frame
+        max_frame_size: maximum length of a frame (or token) in bytes (without delimiter)
+        initial_size: initial size of receive buffer in bytes
+        """
+
+        self.__conn = conn
+        self.__delimiter = delimiter
+        self.__max_frame_size = max_frame_size
+
+        self.__buffer = bytearray(max(initial_size, len(delimiter) + 1)) #receive buffer
+        self.__length = 0 #number of valid bytes in buffer
+        self.__searched = 0 #bytes before this index do not contain the start of a separator
+
+    def __grow(self):
+        """
+        Double size of receive buffer (limited to max frame size)
+        """
+
+        new_size = min(len(self.__buffer) * 2, self.__max_frame_size + len(self.__delimiter))
+
+        if new_size <= len(self.__buffer):
+            raise Exception(f"Frame exceeds maximum frame size of {self.__max_frame_size} bytes")
+
+        self.__buffer.extend(bytes(new_size - len(self.__buffer)))
+
+    def _take_token(self, separators:tuple) -> tuple:
+        """
+        Remove the next token (bytes until the first of the separators) from the buffer
+
+        returns:
+        (token as bytearray, separator) or None if no separator is buffered yet
+        """
+
+        #search separators in not yet searched bytes
+        position = -1
+        separator = None
+        for separator_ in separators:
+            position_ = self.__buffer.find(separator_, self.__searched, self.__length if position < 0 else position + len(separator_))
+
+            if position_ >= 0 and (position < 0 or position_ < position):
+                position = position_
+                separator = separator_
+
+        if position < 0:
+            self.__searched = max(0, self.__length - max(len(separator_) for separator_ in separators) + 1) #separator could be split over two chunks
+
+            if self.__length > self.__max_frame_size:
+                raise Exception(f"Frame exceeds maximum frame size of {self.__max_frame_size} bytes")
+
+            return None
+
+        token = self.__buffer[:position]
+
+        #move remaining bytes to start of buffer
+        remaining_start = position + len(separator)
+        remaining = self.__length - remaining_start
+        self.__buffer[:remaining] = self.__buffer[remaining_start:self.__length]
+        self.__length = remaining
+        self.__searched = 0
+
+        return (token, separator)
+
+    def _free_space(self) -> int:
+        """
+        Make sure buffer has free space (grow if full)
+
+        returns:
+        number of bytes that can be received into buffer
+        """
+
+        if self.__length == len(self.__buffer): #buffer full
+            self.__grow()
+
+        return len(self.__buffer) - self.__length
+
+    def _append(self, data:bytes):
+        """
+        Append received bytes to buffer (data must fit into free space)
+        """
+
+        self.__buffer[self.__length:self.__length + len(data)] = data
+        self.__length += len(data)
+
+    def _buffered(self) -> int:
+        """
+        Number of received but not yet consumed bytes
+        """
+
+        return self.__length
+
+    def _take_bytes(self, size:int) -> bytearray:
+        """
+        Remove the next size bytes from the buffer
+
+        returns:
+        bytes as bytearray or None if not enough bytes are buffered yet
+        """
+
+        if size > self.__max_frame_size:
+            raise Exception(f"Frame exceeds maximum frame size of {self.__max_frame_size} bytes")
+
+        if self.__length < size:
+            return None
+
+        data = self.__buffer[:size]
+
+        #move remaining bytes to start of buffer
+        remaining = self.__length - size
+        self.__buffer[:remaining] = self.__buffer[size:self.__length]
+        self.__length = remaining
+        self.__searched = 0
+
+        return data
+
+    def Read_Token(self, separators:tuple, deadline:float = None) -> tuple:
+        """
+        Read from connection until one of the separators is received
+
+        this method can raise an error
+
+        params:
+        separators: tuple of separators (bytes)
+        deadline: monotonic time until the token has to be read completely (None -> no deadline)
+
+        returns:
+        (token without separator as bytearray, separator that ended the token)
+        """
+
+        while True:
+            token = self._take_token(separators)
+
+            if token != None:
+                return token
+
+            self._free_space()
+
+            #limit read timeout to remaining time of deadline
+            if deadline != None:
+                remaining_time = deadline - monotonic()
+
+                if remaining_time <= 0:
+                    raise Exception(f"Connection deadline exceeded.\nAlready read {self.__length} bytes.")
+
+                self.__conn.settimeout(min(5, remaining_time))
+
+            with memoryview(self.__buffer) as view:
+                received = self.__conn.recv_into(view[self.__length:]) #read directly into buffer
+
+            #if no data received
+            if received == 0:
+                raise Exception(f"No data received.\nAlready read {self.__length} bytes.")
+
+            self.__length += received
+
+    def Wait_For_Data(self, timeout:float) -> bool:
+        """
+        Wait until data of the next frame is available
+
+        params:
+        timeout: maximum waiting time in seconds
+
+        returns:
+        false if connection was closed by peer or no data arrived within timeout
+        """
+
+        if self.__length > 0: #data already buffered
+            return True
+
+        self._free_space()
+        self.__conn.settimeout(timeout)
+
+        try:
+            with memoryview(self.__buffer) as view:
+                received = self.__conn.recv_into(view[self.__length:]) #read directly into buffer
+
+        except socket.timeout:
+            return False
+
+        if received == 0: #connection closed
+            return False
+
+        self.__length += received
+
+        return True
+
+    def Read_Exactly(self, size:int, deadline:float = None) -> bytearray:
+        """
+        Read a fixed number of bytes from connection (e.g. binary payload of known length)
+
+        this method can raise an error
+
+        params:
+        size: number of bytes
+        deadline: monotonic time until the bytes have to be read completely (None -> no deadline)
+        """
+
+        while True:
+            data = self._take_bytes(size)
+
+            if data != None:
+                return data
+
+            self._free_space()
+
+            #limit read timeout to remaining time of deadline
+            if deadline != None:
+                remaining_time = deadline - monotonic()
+
+                if remaining_time <= 0:
+                    raise Exception(f"Connection deadline exceeded.\nAlready read {self.__length} bytes.")
+
+                self.__conn.settimeout(min(5, remaining_time))
+
+            with memoryview(self.__buffer) as view:
+                received = self.__conn.recv_into(view[self.__length:]) #read directly into buffer
+
+            #if no data received
+            if received == 0:
+                raise Exception(f"No data received.\nAlready read {self.__length} bytes.")
+
+            self.__length += received
+
+    def Read_Frame_Bytes(self, deadline:float = None) -> bytearray:
+        """
+        Read next frame from connection
+
+        this method can raise an error
+
+        params:
+        deadline: monotonic time until the frame has to be read completely (None -> no deadline)
+
+        returns:
+        frame without delimiter as bytearray
+        """
+
+        return self.Read_Token((self.__delimiter,), deadline)[0]
+
+    def Read_Frame(self, deadline:float = None) -> str:
+        """
+        Read next frame from connection and decode it
+
+        this method can raise an error
+
+        params:
+        deadline: monotonic time until the frame has to be read completely (None -> no deadline)
+
+        returns:
+        frame without delimiter as string
+        """
+
+        return str(self.Read_Frame_Bytes(deadline), "utf-8")
+
+class AsyncFrameReader(FrameReader):
+    def __init__(self, reader:asyncio.StreamReader, delimiter:bytes = b"\n", max_frame_size:int = 64 * 1024 * 1024, initial_size:int = 64 * 1024) -> None:
+        """
+        Init frame reader for asyncio streams (same buffering as FrameReader)
+
+        params:
+        reader: stream reader of connection
+        delimiter: end of frame
+        max_frame_size: maximum length of a frame (or token) in bytes (without delimiter)
+        initial_size: initial size of receive buffer in bytes
+        """
+
+        super().__init__(None, delimiter, max_frame_size, initial_size)
+
+        self.__reader = reader
+        self.__delimiter = delimiter
+
+    async def Read_Token(self, separators:tuple) -> tuple:
+        """
+        Read from stream until one of the separators is received
+
+        this method can raise an error
+
+        returns:
+        (token without separator as bytearray, separator that ended the token)
+        """
+
+        while True:
+            token = self._take_token(separators)
+
+            if token != None:
+                return token
+
+            data = await self.__reader.read(self._free_space())
+
+            #if no data received
+            if data == b"":
+                raise Exception(f"No data received.\nAlready read {self._buffered()} bytes.")
+
+            self._append(data)
+
+    async def Wait_For_Data(self, timeout:float) -> bool:
+        """
+        Wait until data of the next frame is available
+
+        params:
+        timeout: maximum waiting time in seconds
+
+        returns:
+        false if connection was closed by peer or no data arrived within timeout
+        """
+
+        if self._buffered() > 0: #data already buffered
+            return True
+
+        try:
+            data = await asyncio.wait_for(self.__reader.read(self._free_space()), timeout)
+
+        except asyncio.TimeoutError:
+            return False
+
+        if data == b"": #connection closed
+            return False
+
+        self._append(data)
+
+        return True
+
+    async def Read_Exactly(self, size:int) -> bytearray:
+        """
+        Read a fixed number of bytes from stream (e.g. binary payload of known length)
+
+        this method can raise an error
+        """
+
+        while True:
+            data = self._take_bytes(size)
+
+            if data != None:
+                return data
+
+            data = await self.__reader.read(self._free_space())
+
+            #if no data received
+            if data == b"":
+                raise Exception(f"No data received.\nAlready read {self._buffered()} bytes.")
+
+            self._append(data)
+
+    async def Read_Frame_Bytes(self) -> bytearray:
+        """
+        Read next frame from stream
+
+        returns:
+        frame without delimiter as bytearray
+        """
+
+        return (await self.Read_Token((self.__delimiter,)))[0]
+
+    async def Read_Frame(self) -> str:
+        """
+        Read next frame from stream and decode it
+
+        returns:
+        frame without delimiter as string
+        """
+
+        return str(await self.Read_Frame_Bytes(), "utf-8")
+
+class IngestQueue:
+    def __init__(self, max_items:int = 100000) -> None:
+        """
+        Init thread safe bounded queue between network and database path
+
+        params:
+        max_items: high-water mark (items are rejected as long as the queue holds this many items)
+        """
+
+        self.__max_items = max_items
+
+        self.__items = deque()
+        self.__lock = threading.Lock()
+
+        #counters
+        self.__enqueued = 0
+        self.__dequeued = 0
+        self.__dropped = 0
+        self.__max_depth = 0
+
+    def Put(self, items:list, force:bool = False) -> bool:
+        """
+        Append items to queue (all or none of them)
+
+        params:
+        force: true -> enqueue even if high-water mark is exceeded
+
+        returns:
+        true -> items enqueued
+        false -> queue would exceed high-water mark (items dropped)
+        """
+
+        with self.__lock:
+            if not force and len(self.__items) + len(items) > self.__max_items:
+                self.__dropped += len(items)
+                return False
+
+            self.__items.extend(items)
+            self.__enqueued += len(items)
+            self.__max_depth = max(self.__max_depth, len(self.__items))
+
+            return True
+
+    def Drain(self, max_items:int = None) -> list:
+        """
+        Remove and return the oldest items from queue
+
+        params:
+        max_items: maximum number of items returned (None -> all)
+        """
+
+        with self.__lock:
+            count = len(self.__items) if max_items == None else min(max_items, len(self.__items))
+
+            drained = [self.__items.popleft() for _ in range(count)]
+            self.__dequeued += count
+
+            return drained
+
+    def Get_Stats(self) -> dict:
+        """
+        Get queue counters
+        """
+
+        with self.__lock:
+            return {
+                "depth": len(self.__items),
+                "max_depth": self.__max_depth,
+                "high_water_mark": self.__max_items,
+                "enqueued": self.__enqueued,
+                "dequeued": self.__dequeued,
+                "dropped": self.__dropped,
+            }
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+class WriteAheadLog:
+    def __init__(self, directory:str, commit_window_s:float = 0.005, max_segment_bytes:int = 16 * 1024 * 1024, unacknowledged_timeout_s:float = 24 * 3600) -> None:
+        """
+        Init append-only write-ahead log for received measurements
+
+        Records are appended to segment files by a committer thread which writes and fsyncs
+        everything appended during a commit window at once (group commit across all connections).
+        Stored records are marked as acknowledged, segments containing only acknowledged records are deleted.
+        Records not acknowledged within unacknowledged_timeout_s (e.g. retry queue was full) are acknowledged by the log itself,
+        otherwise a single lost record would keep all later segments forever.
+
+        params:
+        directory: directory of segment files (created if not existing)
+        commit_window_s: time the committer waits for further records before writing and fsyncing them
+        max_segment_bytes: size after which a new segment file is started
+        unacknowledged_timeout_s: time after which an unacknowledged record is given up (None -> never)
+        """
+
+        self.__directory = directory
+        self.__commit_window_s = commit_window_s
+        self.__max_segment_bytes = max_segment_bytes
+        self.__unacknowledged_timeout_s = unacknowledged_timeout_s
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.__condition = threading.Condition()
+        self.__pending = bytearray() #appended but not yet written lines
+        self.__next_id = 1 #id of next appended record
+        self.__appended_id = 0 #id of last appended record
+        self.__durable_id = 0 #records up to this id are written and fsynced
+        self.__failed = False #true if writing the log failed
+
+        self.__unacknowledged = [] #heap of ids of records not yet stored in database
+        self.__acknowledged = set() #acknowledged ids still contained in heap
+        self.__appended_times = deque() #(highest id, time) of every append (oldest first) -> timeout of unacknowledged records
+        self.__expired = 0 #records acknowledged by timeout
+
+        self.__closed_segments = [] #(path, highest id) of segments that are not written anymore
+        self.__next_segment = 1 #number of next segment file (above every existing file)
+        self.__replayed = self.__read_segments() #records not acknowledged before restart
+
+        self.__segment_path = None
+        self.__segment = None
+        self.__segment_max_id = 0
+        self.__open_segment()
+
+        #counters
+        self.__commits = 0
+        self.__appended_records = 0
+
+        #start committer thread
+        self.__committer_thread = threading.Thread(target=self.__committer, daemon=True)
+        self.__committer_thread.start()
+
+    def __read_segments(self) -> list:
+        """
+        Read all existing segments (replay)
+
+        returns:
+        list of (id, record) not acknowledged yet (ordered by id)
+        """
+
+        records = {}
+        acknowledged = set()
+
+        for fileName in sorted(os.listdir(self.__directory)):
+            if not (fileName.startswith("wal_") and fileName.endswith(".log")):
+                continue
+
+            path = os.path.join(self.__directory, fileName)
+            max_id = 0 #highest id of records and acknowledgements (ids are never reused while segment exists)
+
+            try:
+                self.__next_segment = max(self.__next_segment, int(fileName[len("wal_"):-len(".log")]) + 1)
+            except ValueError:
+                pass
+
+            with open(path, "rb") as fd:
+                for line in fd:
+                    if not line.endswith(b"\n"): #torn write of last line -> was never confirmed
+                        break
+
+                    try:
+                        kind, id_, payload = (line[:-1].split(b"\t", 2) + [b""])[:3]
+                        id_ = int(id_)
+
+                        if kind == b"R":
+                            records[id_] = json.loads(payload)
+                            max_id = max(max_id, id_)
+
+                        elif kind == b"A":
+                            acknowledged.add(id_)
+                            max_id = max(max_id, id_)
+
+                    except Exception as ex:
+                        print(f"Invalid line in write-ahead log {fileName} skipped: {ex}")
+
+            self.__closed_segments.append((path, max_id))
+            self.__next_id = max(self.__next_id, max_id + 1)
+
+        self.__appended_id = self.__next_id - 1
+        self.__durable_id = self.__appended_id
+
+        replayed = [(id_, records[id_]) for id_ in sorted(records.keys()) if id_ not in acknowledged]
+
+        for id_, record in replayed:
+            heapq.heappush(self.__unacknowledged, id_)
+
+        if len(replayed) > 0:
+            self.__appended_times.append((replayed[-1][0], monotonic()))
+
+        return replayed
+
+    def __open_segment(self):
+        """
+        Start a new segment file
+        """
+
+        if self.__segment != None:
+            self.__segment.close()
+
+        with self.__condition:
+            if self.__segment_path != None:
+                self.__closed_segments.append((self.__segment_path, self.__segment_max_id))
+
+            #new file every time (a segment of last run is never written again)
+            number = max(self.__next_segment, self.__next_id)
+            self.__next_segment = number + 1
+
+            self.__segment_path = os.path.join(self.__directory, f"wal_{number:012d}.log")
+            self.__segment = open(self.__segment_path, "ab")
+            self.__segment_max_id = self.__next_id - 1
+
+    def __committer(self):
+        """
+        Write and fsync appended lines (one fsync per commit window)
+        """
+
+        while True:
+            try:
+                with self.__condition:
+                    while len(self.__pending) == 0:
+                        self.__condition.wait()
+
+                sleep(self.__commit_window_s) #collect records of concurrent connections
+
+                with self.__condition:
+                    data = self.__pending
+                    self.__pending = bytearray()
+                    appended_id = self.__appended_id
+
+                try:
+                    self.__segment.write(data)
+                    self.__segment.flush()
+                    os.fsync(self.__segment.fileno())
+
+                except Exception as ex:
+                    with self.__condition:
+                        self.__pending = data + self.__pending #write again with next commit
+
+                    raise ex
+
+                with self.__condition:
+                    self.__segment_max_id = max(self.__segment_max_id, appended_id)
+                    self.__durable_id = appended_id
+                    self.__failed = False
+                    self.__commits += 1
+                    self.__condition.notify_all()
+
+                if self.__segment.tell() >= self.__max_segment_bytes:
+                    self.__open_segment()
+
+                self.__truncate()
+
+            except Exception as ex:
+                with self.__condition:
+                    self.__failed = True
+                    self.__condition.notify_all()
+
+                print(f"Critical error in write-ahead log: {ex}")
+
+                sleep(1)
+
+    def __truncate(self):
+        """
+        Delete closed segments whose records are all acknowledged
+        """
+
+        with self.__condition:
+            self.__expire()
+
+            #remove acknowledged ids from top of heap
+            while len(self.__unacknowledged) > 0 and self.__unacknowledged[0] in self.__acknowledged:
+                self.__acknowledged.discard(heapq.heappop(self.__unacknowledged))
+
+            lowest_unacknowledged = self.__unacknowledged[0] if len(self.__unacknowledged) > 0 else self.__next_id
+
+            #active segment is never deleted
+            deletable = [segment for segment in self.__closed_segments if segment[1] < lowest_unacknowledged and segment[0] != self.__segment_path]
+            self.__closed_segments = [segment for segment in self.__closed_segments if segment not in deletable]
+
+            #ids below lowest unacknowledged id are not in heap anymore (e.g. acknowledged twice)
+            if len(deletable) > 0:
+                self.__acknowledged = {id_ for id_ in self.__acknowledged if id_ >= lowest_unacknowledged}
+
+        for path, max_id in deletable:
+            try:
+                os.remove(path)
+            except Exception as ex:
+                print(f"Exception occured during deleting write-ahead log segment: {ex}")
+
+    def __expire(self):
+        """
+        Acknowledge oldest records that were not acknowledged within timeout (called with lock held)
+        """
+
+        if self.__unacknowledged_timeout_s == None:
+            return
+
+        expired_before = monotonic() - self.__unacknowledged_timeout_s
+
+        while len(self.__unacknowledged) > 0:
+            id_ = self.__unacknowledged[0]
+
+            #drop appends of records that are not in heap anymore
+            while len(self.__appended_times) > 0 and self.__appended_times[0][0] < id_:
+                self.__appended_times.popleft()
+
+            if len(self.__appended_times) == 0 or self.__appended_times[0][1] >= expired_before:
+                return
+
+            heapq.heappop(self.__unacknowledged)
+
+            if id_ in self.__acknowledged:
+                self.__acknowledged.discard(id_)
+                continue
+
+            print(f"Record {id_} of write-ahead log not acknowledged within {self.__unacknowledged_timeout_s}s -> given up")
+            self.__pending += b"A\t%d\n" % id_
+            self.__expired += 1
+
+    def Get_Replayed(self) -> list:
+        """
+        Get records that were not acknowledged before last shutdown (only once)
+
+        returns:
+        list of (id, record)
+        """
+
+        replayed = self.__replayed
+        self.__replayed = []
+
+        return replayed
+
+    def Append(self, records:list) -> list:
+        """
+        Append records to log (does not wait until they are durable -> see Wait_Durable)
+
+        returns:
+        ids of records
+        """
+
+        lines = bytearray()
+        with self.__condition:
+            ids = list(range(self.__next_id, self.__next_id + len(records)))
+            self.__next_id += len(records)
+
+            for id_, record in zip(ids, records):
+                lines += b"R\t%d\t" % id_ + str.encode(json.dumps(record)) + b"\n"
+                heapq.heappush(self.__unacknowledged, id_)
+
+            self.__pending += lines
+            self.__appended_id = self.__next_id - 1
+            self.__appended_records += len(records)
+            if len(records) > 0:
+                self.__appended_times.append((self.__appended_id, monotonic()))
+            self.__condition.notify_all()
+
+        return ids
+
+    def Wait_Durable(self, id_:int, timeout:float = 10.0) -> bool:
+        """
+        Wait until all records up to id are written and fsynced
+
+        returns:
+        false if writing failed or timeout expired
+        """
+
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__durable_id >= id_ or self.__failed, timeout)
+
+            return self.__durable_id >= id_
+
+    def Acknowledge(self, ids:list):
+        """
+        Mark records as stored (they are not replayed anymore and their segments can be deleted)
+        """
+
+        with self.__condition:
+            for id_ in ids:
+                #ids below lowest id of heap are already removed from heap (acknowledged twice or expired)
+                if id_ != None and len(self.__unacknowledged) > 0 and id_ >= self.__unacknowledged[0]:
+                    self.__acknowledged.add(id_)
+                    self.__pending += b"A\t%d\n" % id_
+
+            self.__condition.notify_all()
+
+    def Get_Stats(self) -> dict:
+        """
+        Get counters of log
+        """
+
+        with self.__condition:
+            return {
+                "appended": self.__appended_records,
+                "commits": self.__commits,
+                "unacknowledged": len(self.__unacknowledged) - len(self.__acknowledged),
+                "segments": len(self.__closed_segments) + 1,
+                "expired": self.__expired,
+                "failed": self.__failed,
+            }
+
+class MessageHandler:
+    def __init__(self, certfile:str = None, keyfile:str = None, all_or_nothing:bool = False, max_buffered_records:int = 100000, wal_directory:str = None, max_message_size:int = 64 * 1024 * 1024) -> None:
+        """
+        Init message handler (protocol and receive buffer shared by all server implementations)
+
+        Uploads ("data~record;record;...") are parsed record by record while they are received.
+
+        params:
+        certfile: path to certificate (None -> SSL/certificate.crt next to this script)
+        keyfile: path to private key (None -> SSL/certificate.key next to this script)
+        all_or_nothing: true -> records of an upload are only stored if all of them are valid
+                        false -> every valid record is stored as soon as it is received
+        max_buffered_records: high-water mark of receive buffer (uploads are answered with "failed" while it is reached)
+        wal_directory: directory of write-ahead log (None -> no write-ahead log, received measurements are lost on restart)
+                       uploads are only confirmed after their records are fsynced, records not acknowledged with Acknowledge_Stored are replayed on restart
+        max_message_size: maximum length of a single record (and of a compressed upload before and after inflating) in bytes
+        """
+
+        dirname = os.path.dirname(__file__)
+
+        self._certfile = certfile if certfile != None else dirname + r'/SSL/certificate.crt'
+        self._keyfile = keyfile if keyfile != None else dirname + r'/SSL/certificate.key'
+
+        self.__all_or_nothing = all_or_nothing
+        self.__max_message_size = max_message_size
+
+        self.__input_jsons = IngestQueue(max_buffered_records) #all measurements received stored here (as (wal id, Measurement))
+
+        self.__wal = None
+        if wal_directory != None:
+            self.__wal = WriteAheadLog(wal_directory)
+
+            replayed = []
+            for id_, record in self.__wal.Get_Replayed():
+                try:
+                    replayed.append((id_, Measurement.From_Json(record)))
+
+                except Exception as ex:
+                    print(f"Exception occured during replaying measurement: {ex}")
+                    self.__wal.Acknowledge([id_]) #invalid -> never stored
+
+            self.__input_jsons.Put(replayed, force=True) #records received before restart
+
+            print(f"{len(replayed)} measurements replayed from write-ahead log")
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        """
+        Create server side ssl context with loaded certificate
+        """
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self._certfile, self._keyfile) #load certificate
+
+        return context
+
+    def _handle_stream(self, reader:FrameReader, deadline:float = None) -> str:
+        """
+        Read and process a message from a master record by record
+
+        this method can raise an error (connection problems)
+
+        returns:
+        answer for master ("confirmed"/"failed" for "data~", "acked~..." for "records~", "hello~..." for "hello~")
+        """
+
+        header, separator = reader.Read_Token((b"~", b"\n"), deadline) #read command
+
+        #negotiation of optional features
+        if separator == b"~" and header == b"hello":
+            return self.__answer_hello(reader.Read_Frame_Bytes(deadline))
+
+        #compressed upload ("zdata~'length'~'zlib bytes'\n" or "zrecords~'length'~'zlib bytes'\n")
+        if separator == b"~" and header in (b"zdata", b"zrecords"):
+            length, separator = reader.Read_Token((b"~",), deadline)
+            compressed = reader.Read_Exactly(self.__get_compressed_length(length), deadline)
+            reader.Read_Frame_Bytes(deadline) #end of message
+
+            upload = self.__begin_upload(header[1:], b"~")
+            self.__handle_compressed(compressed, upload)
+
+        else:
+            upload = self.__begin_upload(header, separator)
+
+            if upload == None:
+                if separator != b"\n":
+                    reader.Read_Frame_Bytes(deadline) #skip rest of message
+
+                return "failed"
+
+            while separator != b"\n":
+                token, separator = reader.Read_Token((b";", b"\n"), deadline) #read next record
+
+                self.__handle_record(token, upload)
+
+        self.__store_collected(upload)
+        self.__wait_durable(upload)
+
+        return self.__answer(upload)
+
+    async def _handle_stream_async(self, reader:AsyncFrameReader) -> str:
+        """
+        Read and process a message from a master record by record (asyncio version of _handle_stream)
+
+        this method can raise an error (connection problems)
+
+        returns:
+        answer for master ("confirmed"/"failed" for "data~", "acked~..." for "records~", "hello~..." for "hello~")
+        """
+
+        header, separator = await reader.Read_Token((b"~", b"\n")) #read command
+
+        #negotiation of optional features
+        if separator == b"~" and header == b"hello":
+            return self.__answer_hello(await reader.Read_Frame_Bytes())
+
+        #compressed upload ("zdata~'length'~'zlib bytes'\n" or "zrecords~'length'~'zlib bytes'\n")
+        if separator == b"~" and header in (b"zdata", b"zrecords"):
+            length, separator = await reader.Read_Token((b"~",))
+            compressed = await reader.Read_Exactly(self.__get_compressed_length(length))
+            await reader.Read_Frame_Bytes() #end of message
+
+            upload = self.__begin_upload(header[1:], b"~")
+            await asyncio.get_running_loop().run_in_executor(None, self.__handle_compressed, compressed, upload) #inflating and parsing a large upload would block all other connections
+
+        else:
+            upload = self.__begin_upload(header, separator)
+
+            if upload == None:
+                if separator != b"\n":
+                    await reader.Read_Frame_Bytes() #skip rest of message
+
+                return "failed"
+
+            while separator != b"\n":
+                token, separator = await reader.Read_Token((b";", b"\n")) #read next record
+
+                self.__handle_record(token, upload)
+
+        self.__store_collected(upload)
+        await asyncio.get_running_loop().run_in_executor(None, self.__wait_durable, upload) #do not block event loop while waiting for fsync
+
+        return self.__answer(upload)
+
+    def __answer_hello(self, features:bytearray) -> str:
+        """
+        Answer feature negotiation ("hello~feature,feature" -> "hello~'features supported by master and server'")
+        """
+
+        supported = [ZLIB_DICTIONARY_NAME, JSON_RECORDS_NAME]
+
+        return "hello~" + ",".join(feature for feature in bytes.decode(bytes(features)).split(",") if feature in supported)
+
+    def __get_compressed_length(self, length:bytearray) -> int:
+        """
+        Get length of a compressed upload (raises an error if invalid or too long)
+        """
+
+        length_ = int(length)
+
+        if length_ < 0 or length_ > self.__max_message_size:
+            raise Exception(f"Invalid length of compressed upload: {length_}")
+
+        return length_
+
+    def __get_zlib_dictionary(self, compressed:bytearray) -> bytes:
+        """
+        Get preset dictionary of a compressed upload by the dictionary id in its zlib header
+        """
+
+        if len(compressed) < 6 or not compressed[1] & 0x20: #no preset dictionary
+            return ZLIB_DICTIONARY
+
+        return ZLIB_DICTIONARIES.get(int.from_bytes(compressed[2:6], "big"), ZLIB_DICTIONARY)
+
+    def __handle_compressed(self, compressed:bytearray, upload:dict):
+        """
+        Inflate a compressed upload and handle its records as soon as they are inflated
+        """
+
+        inflater = zlib.decompressobj(zdict=self.__get_zlib_dictionary(compressed))
+        pending = bytearray() #inflated bytes of records not yet complete
+        data = compressed
+        inflated = 0 #total inflated bytes of upload
+
+        try:
+            while True:
+                chunk = inflater.decompress(data, 1024 * 1024) #inflate at most 1MB at once (zip bombs)
+                data = inflater.unconsumed_tail
+
+                inflated += len(chunk)
+                if inflated > self.__max_message_size:
+                    raise Exception(f"Inflated upload exceeds maximum size of {self.__max_message_size} bytes")
+
+                pending += chunk
+
+                #handle all complete records
+                start = 0
+                position = pending.find(b";", start)
+                while position >= 0:
+                    self.__handle_record(pending[start:position], upload)
+
+                    start = position + 1
+                    position = pending.find(b";", start)
+
+                del pending[:start]
+
+                if len(pending) > self.__max_message_size:
+                    raise Exception(f"Record exceeds maximum size of {self.__max_message_size} bytes")
+
+                #all input consumed and no output left in inflater (a full chunk may be followed by more output -> never flush unbounded)
+                if len(data) == 0 and (inflater.eof or len(chunk) < 1024 * 1024):
+                    break
+
+            self.__handle_record(pending, upload) #last record
+
+        except Exception as ex:
+            print(f"Exception occured during inflating upload: {ex}")
+
+            upload["successful"] = False
+
+    def __begin_upload(self, header:bytearray, separator:bytes) -> dict:
+        """
+        Check message header and create state of upload
+
+        "data~record;record;..."    -> answer "confirmed" or "failed" for whole upload
+        "records~record;record;..." -> answer "acked~'accepted indices'~'invalid indices'"
+
+        returns:
+        state of upload or None if header is unknown
+        """
+
+        if separator == b"~" and header in (b"data", b"records"):
+            return {
+                "acknowledge": header == b"records", #answer with indices of records
+                "index": 0, #index of next record
+                "collected": [], #records waiting for end of upload (only if all_or_nothing)
+                "collected_indices": [],
+                "accepted": [], #indices of stored records
+                "invalid": [], #indices of records that can never be stored
+                "successful": True, #false as soon as a record was not stored
+                "wal_id": 0, #highest write-ahead log id of stored records
+            }
+
+        print(f"unknown command received: {bytes(header[:100])}")
+
+        return None
+
+    def __handle_record(self, token:bytearray, upload:dict):
+        """
+        Decode a single received measurement and store it (or collect it if all_or_nothing)
+        """
+
+        index = upload["index"]
+        upload["index"] += 1
+
+        try:
+            record = Measurement.From_Record(token) #decoded once for all consumers
+
+        except Exception as ex:
+            print(f"Exeption occured during handling json: {ex}")
+
+            upload["invalid"].append(index)
+            upload["successful"] = False
+            return
+
+        if self.__all_or_nothing:
+            upload["collected"].append(record)
+            upload["collected_indices"].append(index)
+
+        elif self.__store_jsons([record], upload):
+            upload["accepted"].append(index)
+
+        else: #receive buffer full -> master has to retry
+            upload["successful"] = False
+
+    def __store_collected(self, upload:dict):
+        """
+        Store collected records (only if all_or_nothing)
+        """
+
+        if self.__all_or_nothing and upload["successful"]:
+            if self.__store_jsons(upload["collected"], upload):
+                upload["accepted"] = upload["collected_indices"]
+
+            else:
+                upload["successful"] = False
+
+    def __wait_durable(self, upload:dict):
+        """
+        Wait until stored records of upload are written to write-ahead log (group commit)
+        """
+
+        if self.__wal == None or upload["wal_id"] == 0:
+            return
+
+        if not self.__wal.Wait_Durable(upload["wal_id"]):
+            print("Write-ahead log not durable -> upload not confirmed")
+
+            upload["accepted"] = []
+            upload["successful"] = False
+
+    def __answer(self, upload:dict) -> str:
+        """
+        Get answer for master
+        """
+
+        if upload["acknowledge"]:
+            return "acked~" + Encode_Index_Ranges(upload["accepted"]) + "~" + Encode_Index_Ranges(upload["invalid"])
+
+        if upload["successful"]:
+            return "confirmed" #return a positive confirmation to master
+
+        return "failed" #processing failed -> return a negative confirmation to master
+
+    def __store_jsons(self, jsons_list:list, upload:dict) -> bool:
+        """
+        This method appends all mesurements to write-ahead log and receive buffer
+
+        returns:
+        false if receive buffer is full
+        """
+        
+        try:
+            ids = [None] * len(jsons_list)
+
+            if self.__wal != None:
+                ids = self.__wal.Append([measurement.raw for measurement in jsons_list])
+
+            if self.__input_jsons.Put(list(zip(ids, jsons_list))):
+                if self.__wal != None and len(ids) > 0:
+                    upload["wal_id"] = max(upload["wal_id"], ids[-1])
+
+                return True
+
+            if self.__wal != None:
+                self.__wal.Acknowledge(ids) #rejected records must not be replayed
+
+            print(f"Receive buffer full: {len(jsons_list)} measurements rejected")
+            return False
+
+        except Exception as ex:
+            print(f"Execption occured during saving jsons: {ex}")
+            return False
+
+    def Get_jsonBuffer(self, max_items:int = None) -> list:
+        """
+        This method gets received measurements (oldest first, as Measurement) and deletes them afterwards
+
+        params:
+        max_items: maximum number of measurements returned (None -> all)
+        """
+
+        return [json_ for id_, json_ in self.__input_jsons.Drain(max_items)]
+
+    def Get_jsonBuffer_With_Ids(self, max_items:int = None) -> list:
+        """
+        This method gets received measurements (oldest first) together with their write-ahead log id and deletes them afterwards
+        (ids have to be passed to Acknowledge_Stored as soon as the measurements are stored)
+
+        params:
+        max_items: maximum number of measurements returned (None -> all)
+
+        returns:
+        list of (id, Measurement) -> id is None if no write-ahead log is used
+        """
+
+        return self.__input_jsons.Drain(max_items)
+
+    def Acknowledge_Stored(self, ids:list):
+        """
+        This method marks measurements as stored in database (write-ahead log does not replay them anymore)
+        """
+
+        if self.__wal != None:
+            self.__wal.Acknowledge(ids)
+
+    def Get_WalStats(self) -> dict:
+        """
+        This method gets counters of write-ahead log (None if no write-ahead log is used)
+        """
+
+        if self.__wal == None:
+            return None
+
+        return self.__wal.Get_Stats()
+
+    def Get_BufferStats(self) -> dict:
+        """
+        This method gets counters of receive buffer (depth, dropped measurements, ...)
+        """
+
+        return self.__input_jsons.Get_Stats()
+
+class SSL(MessageHandler):
+    def __init__(self, host="0.0.0.0", port = 443, max_workers:int = None, connection_deadline_s:float = 15.0, idle_timeout_s:float = None, max_message_size:int = 64 * 1024 * 1024, certfile:str = None, keyfile:str = None, all_or_nothing:bool = False, max_buffered_records:int = 100000, wal_directory:str = None) -> None:
+        """
+        Init ssl
+
+        params:
+        host: host ip
+        port: port
+        max_workers: number of worker threads handling clients (None -> clients are handled one after another in the listener thread)
+        connection_deadline_s: maximum time a single client may take for handshake, request and response (per message)
+        idle_timeout_s: time a connection is kept open waiting for the next message (None -> one message per connection)
+                        an open connection occupies a worker -> masters sending more often than idle_timeout_s hold a worker for good (use AsyncSSL for persistent connections)
+        max_message_size: maximum length of a single record (and of a compressed upload before and after inflating) in bytes
+        certfile: path to certificate (None -> SSL/certificate.crt next to this script)
+        keyfile: path to private key (None -> SSL/certificate.key next to this script)
+        all_or_nothing: true -> records of an upload are only stored if all of them are valid
+        max_buffered_records: high-water mark of receive buffer (uploads are answered with "failed" while it is reached)
+        wal_directory: directory of write-ahead log (None -> no write-ahead log)
+        """
+        
+        super().__init__(certfile, keyfile, all_or_nothing, max_buffered_records, wal_directory, max_message_size)
+
+        self.HOST = host
+        self.PORT = port
+
+        self.__connection_deadline_s = connection_deadline_s
+        self.__idle_timeout_s = idle_timeout_s
+        self.__max_message_size = max_message_size
+
+        #worker pool (only in worker-pool mode)
+        self.__pool = None
+        self.__pool_slots = None
+        if max_workers != None:
+            self.__pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ssl_worker")
+            self.__pool_slots = threading.BoundedSemaphore(max_workers) #accept loop blocks as soon as all workers are busy
+
+        #start listener thread
+        self.__listener_thread = threading.Thread(target=self.__listener, daemon=True)
+        self.__listener_thread.start()    
+
+    def __listener(self):
+        """
+        Start listener
+        """
+        
+        while True:
+            try:
+                #create ssl socket and start listening
+                context = self._create_ssl_context()
+
+                bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
+                bindsocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                bindsocket.bind((self.HOST, self.PORT))
+                bindsocket.listen(64)
+
+                while True:
+                    slot_acquired = False #true if a worker slot is reserved for the next connection
+
+                    try:
+                        print("listening")
+
+                        #wait for a free worker (only in worker-pool mode)
+                        if self.__pool != None:
+                            self.__pool_slots.acquire()
+                            slot_acquired = True
+
+                        newsocket, fromaddr = bindsocket.accept() #wait for incoming connection
+                        print("accepted")
+
+                        if self.__pool != None: #hand connection over to worker pool
+                            self.__pool.submit(self.__serve_connection_release_slot, context, newsocket)
+                            slot_acquired = False #slot is released by worker
+
+                        else: #handle connection in listener thread
+                            self.__serve_connection(context, newsocket)
+
+                    except Exception as ex:
+                        #free reserved worker slot
+                        if slot_acquired:
+                            self.__pool_slots.release()
+
+                        #close eventual open newsocket
+                        try:
+                            newsocket.close()
+                        except:
+                            pass
+
+                        print(f"Exception occured during accepting client: {ex}")
+
+            except Exception as ex:
+
+                #close eventually open bindsocket
+                try:
+                    bindsocket.close()
+                except:
+                    pass
+
+                print(f"Critical error in listener thread: {ex}")
+
+    def __serve_connection_release_slot(self, context:ssl.SSLContext, newsocket:socket.socket):
+        """
+        Serve a connection inside a worker and free the worker slot afterwards
+        """
+
+        try:
+            self.__serve_connection(context, newsocket)
+
+        finally:
+            self.__pool_slots.release()
+
+    def __serve_connection(self, context:ssl.SSLContext, newsocket:socket.socket):
+        """
+        Wrap an accepted socket, handle the client and close the connection
+
+        params:
+        context: ssl context of server
+        newsocket: accepted (not yet wrapped) socket
+        """
+
+        deadline = monotonic() + self.__connection_deadline_s #client has to be handled until this time
+        connstream = None
+
+        try:
+            newsocket.settimeout(min(5, self.__connection_deadline_s)) #handshake timeout
+            connstream = context.wrap_socket(newsocket, server_side=True)
+            print("socket wrapped")
+            connstream.settimeout(5) #set read/write timeout to 5 seconds
+            print("timeout set")
+            newsocket.close() #close original socket
+            print("accepted socket closed")
+            
+            print("start client handling")
+            self.__handle_client(connstream, deadline)
+            print("Client handled")
+
+        except Exception as ex:
+            #close eventual open newsocket
+            try:
+                newsocket.close()
+            except:
+                pass
+
+            print(f"Exception occured during accepting and handling client: {ex}")
+
+        finally:
+
+            #close connection
+            if connstream != None:
+                try:
+                    connstream.shutdown(socket.SHUT_RDWR)
+                except Exception as ex:
+                    print(f"Exception occured in shutdown connection: {ex}")
+
+                try:
+                    connstream.close()
+                except Exception as ex:
+                    print(f"Exception occured in close connection: {ex}")
+
+            print("connection closed")
+
+    def __handle_client(self, conn:ssl.SSLSocket, deadline:float = None):
+        """
+        Handle a connected client (master)
+
+        Messages are handled until the master closes the connection or the idle timeout expires.
+
+        params:
+        deadline: monotonic time until the first message has to be handled (None -> no deadline)
+        """
+        
+        try:
+            reader = FrameReader(conn, max_frame_size=self.__max_message_size)
+
+            while True:
+                answer = "failed" #answer for master
+                keep_open = self.__idle_timeout_s != None #connection can be used for further messages
+
+                try:
+                    answer = self._handle_stream(reader, deadline) #read and process message from master
+
+                    if answer.startswith("hello~"): #negotiation is followed by the actual message
+                        keep_open = True
+
+                except Exception as ex:
+                    keep_open = False #message could not be read completely -> end of message unknown
+
+                    print(f"Error occured during reading data from master: {ex}")
+
+                conn.sendall(str.encode(answer + "\n")) #return confirmation to master
+
+                #wait for next message
+                if not keep_open or not reader.Wait_For_Data(self.__idle_timeout_s if self.__idle_timeout_s != None else self.__connection_deadline_s):
+                    return
+
+                deadline = monotonic() + self.__connection_deadline_s
+
+        except Exception as ex:
+            print(f"Exception occured during handling client: {ex}")
+
+class AsyncSSL(MessageHandler):
+    def __init__(self, host="0.0.0.0", port = 443, connection_deadline_s:float = 15.0, idle_timeout_s:float = None, max_message_size:int = 64 * 1024 * 1024, certfile:str = None, keyfile:str = None, all_or_nothing:bool = False, max_buffered_records:int = 100000, wal_directory:str = None) -> None:
+        """
+        Init asyncio based ssl server (same protocol and Get_jsonBuffer contract as SSL)
+
+        All connections are handled by one event loop running in a daemon thread,
+        so idle or slow masters do not occupy an os thread each.
+
+        params:
+        host: host ip
+        port: port
+        connection_deadline_s: maximum time a single client may take for handshake, request and response (per message)
+        idle_timeout_s: time a connection is kept open waiting for the next message (None -> one message per connection)
+        max_message_size: maximum length of a single record (and of a compressed upload before and after inflating) in bytes
+        certfile: path to certificate (None -> SSL/certificate.crt next to this script)
+        keyfile: path to private key (None -> SSL/certificate.key next to this script)
+        all_or_nothing: true -> records of an upload are only stored if all of them are valid
+        max_buffered_records: high-water mark of receive buffer (uploads are answered with "failed" while it is reached)
+        wal_directory: directory of write-ahead log (None -> no write-ahead log)
+        """
+
+        super().__init__(certfile, keyfile, all_or_nothing, max_buffered_records, wal_directory, max_message_size)
+
+        self.HOST = host
+        self.PORT = port
+
+        self.__connection_deadline_s = connection_deadline_s
+        self.__idle_timeout_s = idle_timeout_s
+        self.__max_message_size = max_message_size
+
+        #start event loop in listener thread
+        self.__loop = asyncio.new_event_loop()
+        self.__listener_thread = threading.Thread(target=self.__run_loop, daemon=True)
+        self.__listener_thread.start()
+
+    def __run_loop(self):
+        """
+        Run event loop of listener thread
+        """
+
+        asyncio.set_event_loop(self.__loop)
+        self.__loop.run_until_complete(self.__listener())
+
+    async def __listener(self):
+        """
+        Start listener
+        """
+
+        while True:
+            try:
+                context = self._create_ssl_context()
+
+                server = await asyncio.start_server(
+                    self.__handle_client, self.HOST, self.PORT, 
+                    ssl=context, 
+                    backlog=1024, 
+                    ssl_handshake_timeout=min(5, self.__connection_deadline_s),
+                    reuse_address=True,
+                )
+
+                print("listening")
+
+                async with server:
+                    await server.serve_forever()
+
+            except Exception as ex:
+                print(f"Critical error in listener: {ex}")
+
+                await asyncio.sleep(1) #do not restart listener in a busy loop
+
+    async def __handle_client(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        """
+        Handle a connected client (master)
+
+        Messages are handled until the master closes the connection or the idle timeout expires.
+        """
+
+        try:
+            frame_reader = AsyncFrameReader(reader, max_frame_size=self.__max_message_size)
+
+            while True:
+                keep_open = await asyncio.wait_for(self.__handle_request(frame_reader, writer), self.__connection_deadline_s)
+
+                #wait for next message
+                if not keep_open or not await frame_reader.Wait_For_Data(self.__idle_timeout_s if self.__idle_timeout_s != None else self.__connection_deadline_s):
+                    break
+
+        except Exception as ex:
+            print(f"Exception occured during handling client: {ex}")
+
+        finally:
+
+            #close connection
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception as ex:
+                print(f"Exception occured in close connection: {ex}")
+
+    async def __handle_request(self, reader:AsyncFrameReader, writer:asyncio.StreamWriter) -> bool:
+        """
+        Read a message, process it and answer the master
+
+        returns:
+        true if connection is used for further messages (idle timeout set or negotiation received)
+        false if not or the message could not be read completely (connection can not be used anymore)
+        """
+
+        answer = "failed" #answer for master
+        keep_open = self.__idle_timeout_s != None
+
+        try:
+            answer = await self._handle_stream_async(reader) #read and process message from master
+
+            if answer.startswith("hello~"): #negotiation is followed by the actual message
+                keep_open = True
+
+        except Exception as ex:
+            keep_open = False
+
+            print(f"Error occured during reading data from master: {ex}")
+
+        writer.write(str.encode(answer + "\n")) #return confirmation to master
+        await writer.drain()
+
+        return keep_open
+
+class BloomFilter:
+    def __init__(self, capacity:int, false_positive_rate:float = 0.001) -> None:
+        """
+        Init bloom filter (set without false negatives and a small rate of false positives)
+
+        params:
+        capacity: number of keys the false positive rate is calculated for
+        false_positive_rate: probability of a false positive at capacity
+        """
+
+        self.__size = max(8, int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))) #number of bits
+        self.__hashes = max(1, round(self.__size / capacity * math.log(2))) #number of hash functions
+        self.__bits = bytearray((self.__size + 7) // 8)
+
+    def __positions(self, key:str):
+        """
+        Bit positions of key (double hashing)
+        """
+
+        digest = hashlib.blake2b(str.encode(key), digest_size=16).digest()
+        hash1 = int.from_bytes(digest[:8], "little")
+        hash2 = int.from_bytes(digest[8:], "little") | 1
+
+        return [(hash1 + i * hash2) % self.__size for i in range(self.__hashes)]
+
+    def Add(self, key:str):
+        for position in self.__positions(key):
+            self.__bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key:str) -> bool:
+        return all(self.__bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(key))
+
+class Deduplicator:
+    def __init__(self, max_entries:int = 200000, retention_s:float = 7 * 24 * 3600, use_bloom_filter:bool = False, bloom_capacity:int = 1000000) -> None:
+        """
+        Init duplicate suppression of retransmitted measurements (key: master identity + measurement timestamp, whole record if master identity is not sent)
+
+        Seen keys are kept in a bounded hash set, keys older than retention_s or exceeding max_entries are evicted (oldest first).
+        Optionally evicted keys are moved to a bloom filter, so duplicates of older measurements are still recognized
+        (with a small probability a new measurement is wrongly taken as a duplicate).
+
+        params:
+        max_entries: maximum number of keys in hash set
+        retention_s: time a key is kept in hash set
+        use_bloom_filter: true -> evicted keys are kept in a bloom filter
+        bloom_capacity: number of evicted keys per bloom filter generation (two generations are kept)
+        """
+
+        self.__max_entries = max_entries
+        self.__retention_s = retention_s
+
+        self.__seen = OrderedDict() #key -> time key was added (oldest first)
+
+        self.__bloom_capacity = bloom_capacity
+        self.__bloom_filters = None
+        self.__bloom_count = 0
+        if use_bloom_filter:
+            self.__bloom_filters = [BloomFilter(bloom_capacity), BloomFilter(bloom_capacity)] #[current, previous generation]
+
+        #counters
+        self.__checked = 0
+        self.__hits = 0
+        self.__bloom_hits = 0
+        self.__evicted = 0
+
+    def __get_key(self, measurement:json) -> str:
+        """
+        Get key of a measurement (master identity and timestamp, hash of whole record for legacy masters without identity)
+        """
+
+        return Measurement.Parse(measurement).key
+
+    def __evict(self, now:float):
+        """
+        Remove keys that are too old or exceed max_entries
+        """
+
+        while len(self.__seen) > 0:
+            key, added = next(iter(self.__seen.items()))
+
+            if len(self.__seen) <= self.__max_entries and now - added < self.__retention_s:
+                break
+
+            self.__seen.popitem(last=False)
+            self.__evicted += 1
+
+            if self.__bloom_filters != None:
+                #start new generation if current one is full
+                if self.__bloom_count >= self.__bloom_capacity:
+                    self.__bloom_filters = [BloomFilter(self.__bloom_capacity), self.__bloom_filters[0]]
+                    self.__bloom_count = 0
+
+                self.__bloom_filters[0].Add(key)
+                self.__bloom_count += 1
+
+    def Is_Duplicate(self, measurement:json) -> bool:
+        """
+        This method checks if a measurement was seen before (and remembers it otherwise)
+        """
+
+        try:
+            key = self.__get_key(measurement)
+
+        except Exception as ex:
+            print(f"Exception occured during getting key of measurement: {ex}")
+            return False #cannot be checked -> let database path handle it
+
+        now = monotonic()
+        self.__checked += 1
+
+        if key in self.__seen:
+            self.__hits += 1
+            return True
+
+        if self.__bloom_filters != None and any(key in bloom_filter for bloom_filter in self.__bloom_filters):
+            self.__bloom_hits += 1
+            return True
+
+        self.__seen[key] = now
+        self.__evict(now)
+
+        return False
+
+    def Get_Stats(self) -> dict:
+        """
+        Get counters (hit rate = duplicates / checked measurements)
+        """
+
+        duplicates = self.__hits + self.__bloom_hits
+
+        return {
+            "checked": self.__checked,
+            "duplicates": duplicates,
+            "bloom_hits": self.__bloom_hits,
+            "hit_rate": duplicates / self.__checked if self.__checked > 0 else 0.0,
+            "entries": len(self.__seen),
+            "evicted": self.__evicted,
+        }
+
+#converters of column types in measurement schema
+SCHEMA_TYPES = {
+    "float": float,
+    "bool": lambda value: 1 if bool(value) else 0, #stored as number
+}
+
+def Load_Measurement_Schema(path:str = None) -> dict:
+    """
+    Load mapping of measurements to table columns (yaml)
+
+    params:
+    path: path to schema (None -> measurement_schema.yaml next to this script)
+
+    returns:
+    schema as device -> sensor -> measurement -> {"column": ..., "type": ...}
+    """
+
+    if path == None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "measurement_schema.yaml")
+
+    with open(path, "r") as fd:
+        return yaml.safe_load(fd)
+
+def Compile_Measurement_Schema(schema:dict) -> tuple:
+    """
+    Compile measurement schema to a flat lookup (done once at startup)
+
+    returns:
+    (lookup as (device, sensor, measurement) -> (column, converter), list of all columns)
+    """
+
+    lookup = {}
+    columns = []
+    for deviceName, sensors in schema.items():
+        for sensorName, measurements in sensors.items():
+            for measurementName, mapping in measurements.items():
+                column = mapping["column"]
+
+                if mapping["type"] not in SCHEMA_TYPES:
+                    raise Exception(f"Unknown type in measurement schema: {mapping['type']} ({deviceName}/{sensorName}/{measurementName})")
+
+                if column in columns:
+                    raise Exception(f"Column used twice in measurement schema: {column}")
+
+                lookup[(deviceName, sensorName, measurementName)] = (column, SCHEMA_TYPES[mapping["type"]])
+                columns.append(column)
+
+    return (lookup, columns)
+
+class CircuitBreaker:
+    Closed = "closed" #requests pass
+    Open = "open" #requests fail fast
+    HalfOpen = "half_open" #one probe request passes
+
+    def __init__(self, failure_threshold:int = 5, error_rate_threshold:float = 0.5, window:int = 20, open_duration_s:float = 30.0) -> None:
+        """
+        Init circuit breaker
+
+        params:
+        failure_threshold: failures in a row that open the breaker
+        error_rate_threshold: error rate of last requests that opens the breaker (if window is full)
+        window: number of last requests used for error rate
+        open_duration_s: time requests fail fast before a probe is allowed
+        """
+
+        self.__failure_threshold = failure_threshold
+        self.__error_rate_threshold = error_rate_threshold
+        self.__open_duration_s = open_duration_s
+
+        self.__lock = threading.Lock()
+        self.__state = CircuitBreaker.Closed
+        self.__outcomes = deque(maxlen=window) #true -> success
+        self.__failures_in_a_row = 0
+        self.__opened_at = 0
+        self.__probe_in_flight = False
+        self.__rejected = 0
+        self.__opened = 0
+
+    def Allow(self) -> bool:
+        """
+        This method checks if a request may be sent (false -> fail fast)
+        """
+
+        with self.__lock:
+            if self.__state == CircuitBreaker.Closed:
+                return True
+
+            if self.__state == CircuitBreaker.Open and monotonic() >= self.__opened_at + self.__open_duration_s:
+                self.__state = CircuitBreaker.HalfOpen
+
+            if self.__state == CircuitBreaker.HalfOpen and not self.__probe_in_flight:
+                self.__probe_in_flight = True
+                return True
+
+            self.__rejected += 1
+            return False
+
+    def Record(self, success:bool):
+        """
+        This method records the outcome of an allowed request
+        """
+
+        with self.__lock:
+            self.__outcomes.append(success)
+            self.__failures_in_a_row = 0 if success else self.__failures_in_a_row + 1
+
+            if self.__state == CircuitBreaker.HalfOpen:
+                self.__probe_in_flight = False
+
+                if success: #database works again
+                    self.__state = CircuitBreaker.Closed
+                    self.__outcomes.clear()
+                else:
+                    self.__open()
+
+            elif self.__state == CircuitBreaker.Closed and not success:
+                window_full = len(self.__outcomes) == self.__outcomes.maxlen
+
+                if self.__failures_in_a_row >= self.__failure_threshold or (window_full and self.__get_error_rate() >= self.__error_rate_threshold):
+                    self.__open()
+
+    def __open(self):
+        """
+        Open breaker (lock must be held)
+        """
+
+        self.__state = CircuitBreaker.Open
+        self.__opened_at = monotonic()
+        self.__opened += 1
+
+    def __get_error_rate(self) -> float:
+        if len(self.__outcomes) == 0:
+            return 0.0
+
+        return sum(1 for outcome in self.__outcomes if not outcome) / len(self.__outcomes)
+
+    def Get_State(self) -> str:
+        """
+        This method gets state of breaker (Closed, Open or HalfOpen)
+        """
+
+        with self.__lock:
+            return self.__state
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets state and counters of breaker
+        """
+
+        with self.__lock:
+            return {"state": self.__state, "error_rate": round(self.__get_error_rate(), 3), "rejected": self.__rejected, "opened": self.__opened}
+
+class AimdLimiter:
+    def __init__(self, initial:float, minimum:float, maximum:float, increase:float = 1.0, decrease_factor:float = 0.5) -> None:
+        """
+        Init limit with additive increase / multiplicative decrease
+
+        params:
+        initial: limit at start
+        minimum: lowest limit
+        maximum: highest limit
+        increase: added on success
+        decrease_factor: limit is multiplied with it on overload
+        """
+
+        self.__minimum = minimum
+        self.__maximum = maximum
+        self.__increase = increase
+        self.__decrease_factor = decrease_factor
+
+        self.__limit = float(initial)
+        self.__in_use = 0
+        self.__condition = threading.Condition()
+
+    def Increase(self, amount:float = None):
+        """
+        This method raises limit additively (request was fast and successful)
+        """
+
+        with self.__condition:
+            self.__limit = min(self.__maximum, self.__limit + (amount if amount != None else self.__increase))
+            self.__condition.notify_all()
+
+    def Decrease(self):
+        """
+        This method lowers limit multiplicatively (request was slow or failed)
+        """
+
+        with self.__condition:
+            self.__limit = max(self.__minimum, self.__limit * self.__decrease_factor)
+
+    def Get(self) -> int:
+        """
+        This method gets current limit (rounded down)
+        """
+
+        return int(self.__limit)
+
+    def Acquire(self, timeout:float = None) -> bool:
+        """
+        This method waits until less than limit slots are in use and takes one
+
+        returns:
+        true -> slot taken
+        false -> timeout
+        """
+
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__in_use < int(self.__limit), timeout):
+                return False
+
+            self.__in_use += 1
+            return True
+
+    def Release(self):
+        """
+        This method gives a slot back
+        """
+
+        with self.__condition:
+            self.__in_use -= 1
+            self.__condition.notify()
+
+#status codes of ords rejecting a row because of its data (sending it again never succeeds)
+ORDS_REJECTED_STATUS = (400, 413, 422)
+
+class Database:
+    def __init__(self, userName='SENSOR_DATALAKE2', password='smarTclassrooM2Da', 
+        url='https://glusfqycvwrucp9-db202202211424.adb.eu-zurich-1.oraclecloudapps.com/ords/sensor_datalake2/sens/any_sensor_data_entry/',
+        batch_url='https://glusfqycvwrucp9-db202202211424.adb.eu-zurich-1.oraclecloudapps.com/ords/sensor_datalake2/sens/any_sensor_data_batch/',
+        batch_size:int = 100, max_connections:int = 10, schema:dict = None,
+        timeout_s:tuple = (5.0, 30.0), target_latency_s:float = 2.0, breaker:CircuitBreaker = None,
+    ) -> None:
+        """
+        Init database class
+
+        All requests use one pooled session (connections are kept alive between requests).
+
+        params:
+        userName: user of rest api
+        password: password of rest api
+        url: endpoint for single measurements (form data)
+        batch_url: endpoint for many measurements per request (json {"items": [...]} -> {"results": [1, 0, ...]}, see Datenbank/Skript Datenbank.txt)
+                   None -> batches are sent row by row over the pooled session
+        batch_size: maximum number of measurements per batch request (batch size is adapted between 1 and batch_size)
+        max_connections: maximum number of pooled connections (concurrent requests are adapted between 1 and max_connections)
+        schema: mapping of measurements to columns (None -> Load_Measurement_Schema())
+        timeout_s: (connect, read) timeout of every request
+        target_latency_s: requests slower than this lower batch size and concurrency (AIMD)
+        breaker: circuit breaker (None -> CircuitBreaker()), requests fail fast while it is open
+        """
+        
+        self.__userName = userName
+        self.__password = password
+
+        self.__url = url
+        self.__batch_url = batch_url
+        self.__timeout_s = timeout_s
+        self.__target_latency_s = target_latency_s
+
+        #adaptive rate control and circuit breaker
+        self.__batch_size = AimdLimiter(initial=batch_size, minimum=1, maximum=batch_size, increase=max(1, batch_size // 10))
+        self.__concurrency = AimdLimiter(initial=max_connections, minimum=1, maximum=max_connections)
+        self.__breaker = breaker if breaker != None else CircuitBreaker()
+
+        #metrics
+        self.__metrics_lock = threading.Lock()
+        self.__metrics = {"requests": 0, "failures": 0, "timeouts": 0, "fast_failed": 0, "rejected": 0}
+        self.__latency_ewma_s = None
+
+        #flat lookup (device, sensor, measurement) -> (column, converter)
+        self.__lookup, self.__columns = Compile_Measurement_Schema(schema if schema != None else Load_Measurement_Schema())
+
+        self.__session = requests.Session()
+        self.__session.auth = (self.__userName, self.__password)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+
+    def __request(self, url:str, **kwargs) -> requests.Response:
+        """
+        This method sends a post request through circuit breaker and concurrency limit and adapts rate to its latency
+
+        this method raises an error if the breaker is open, the request fails or the database answers with a server error
+        """
+
+        if not self.__breaker.Allow():
+            with self.__metrics_lock:
+                self.__metrics["fast_failed"] += 1
+
+            raise Exception("Circuit breaker open (database not available)")
+
+        self.__concurrency.Acquire()
+        start = monotonic()
+        try:
+            r = self.__session.post(url, timeout=self.__timeout_s, **kwargs)
+            success = r.status_code < 500 and r.status_code != 429 #client errors are errors of data, not of database
+
+        except requests.exceptions.Timeout:
+            with self.__metrics_lock:
+                self.__metrics["timeouts"] += 1
+
+            success = False
+            raise
+
+        except Exception:
+            success = False
+            raise
+
+        finally:
+            self.__concurrency.Release()
+            latency = monotonic() - start
+
+            self.__breaker.Record(success)
+            self.__adapt(success, latency)
+
+        if not success:
+            raise Exception(f"Database answered with status {r.status_code}")
+
+        return r
+
+    def __adapt(self, success:bool, latency:float):
+        """
+        This method adapts batch size and concurrency (additive increase if fast and successful, multiplicative decrease otherwise)
+        """
+
+        with self.__metrics_lock:
+            self.__metrics["requests"] += 1
+            if not success:
+                self.__metrics["failures"] += 1
+
+            self.__latency_ewma_s = latency if self.__latency_ewma_s == None else 0.8 * self.__latency_ewma_s + 0.2 * latency
+
+        if success and latency <= self.__target_latency_s:
+            self.__batch_size.Increase()
+            self.__concurrency.Increase(1 / max(1, self.__concurrency.Get())) #+1 per round of requests
+
+        else:
+            self.__batch_size.Decrease()
+            self.__concurrency.Decrease()
+
+    def __count_rejected(self, number:int):
+        with self.__metrics_lock:
+            self.__metrics["rejected"] += number
+
+    def __post(self, row:dict) -> bool:
+        """
+        This method send a single row to server backend (missing values are not sent)
+        
+        returns:
+        successful -> true
+        successful -> false
+        rejected because of its data -> None (never retried)
+        """
+
+        r = self.__request(self.__url, data=row)
+
+        if r.ok:
+            return True
+
+        if r.status_code in ORDS_REJECTED_STATUS:
+            print(f"Row rejected by database (status {r.status_code}): {r.text[:200]}")
+            self.__count_rejected(1)
+            return None
+
+        return False
+
+    def __post_rows(self, rows:list) -> list:
+        """
+        This method sends rows one by one (a failed row does not abort the others)
+
+        returns:
+        success of every row (list of bool, None if rejected because of its data)
+        """
+
+        results = []
+        for row in rows:
+            try:
+                results.append(self.__post(row))
+
+            except Exception as ex: #server error, timeout or circuit breaker open
+                print(f"Exception occured during posting row: {ex}")
+                results.append(False)
+
+        return results
+
+    def __post_batch(self, rows:list) -> list:
+        """
+        This method sends many rows with one request to server backend
+
+        returns:
+        success of every row (list of bool, None if rejected because of its data)
+        """
+
+        if self.__batch_url == None:
+            return self.__post_rows(rows)
+
+        r = self.__request(self.__batch_url, json={"items": rows})
+
+        if r.status_code == 404: #batch endpoint not installed -> send rows one by one
+            print("Batch endpoint not available -> measurements are sent one by one")
+
+            self.__batch_url = None
+            return self.__post_rows(rows)
+
+        if r.status_code in ORDS_REJECTED_STATUS and len(rows) > 1: #a row of batch is invalid -> find it by sending rows one by one
+            print(f"Batch rejected by database (status {r.status_code}) -> rows are sent one by one")
+            return self.__post_rows(rows)
+
+        if r.status_code in ORDS_REJECTED_STATUS:
+            self.__count_rejected(1)
+            return [None]
+
+        if not r.ok:
+            return [False] * len(rows)
+
+        results = [result in (1, True) for result in r.json()["results"]]
+
+        if len(results) != len(rows):
+            raise Exception(f"Batch endpoint returned {len(results)} results for {len(rows)} rows")
+
+        #other rows were inserted -> database works, failed rows were rejected because of their data
+        if any(results) and not all(results):
+            self.__count_rejected(results.count(False))
+            return [True if result else None for result in results]
+
+        return results
+
+    def Send_measurements(self, measurements:list) -> list:
+        """
+        This method tries to send many measurements (in batches of current batch size)
+
+        returns:
+        success of every measurement (list of bool in same order, all false while circuit breaker is open)
+        None for measurements that are rejected because of their data (value can not be converted, rejected by database) -> never retried
+        """
+
+        results = [False] * len(measurements)
+
+        #convert measurements to rows
+        rows = []
+        indices = [] #index of measurement of every row
+        for index, measurement in enumerate(measurements):
+            try:
+                rows.append(self.__measurement_to_row(Measurement.Parse(measurement)))
+                indices.append(index)
+
+            except Exception as ex:
+                print(f"Exception occured during converting measurement: {ex}")
+
+                results[index] = None
+                self.__count_rejected(1)
+
+        #send rows in batches (batch size adapts to latency of database)
+        start = 0
+        while start < len(rows):
+            #database not available -> all remaining rows fail fast
+            if self.__breaker.Get_State() == CircuitBreaker.Open and start > 0:
+                break
+
+            batch = rows[start:start + self.__batch_size.Get()]
+
+            try:
+                batch_results = self.__post_batch(batch)
+
+            except Exception as ex:
+                print(f"Exception occured during sending batch to database: {ex}")
+                batch_results = [False] * len(batch)
+
+            for offset, result in enumerate(batch_results):
+                results[indices[start + offset]] = result
+
+            start += len(batch)
+
+        return results
+
+    def Get_Metrics(self) -> dict:
+        """
+        This method gets metrics of database client (circuit breaker, current batch size and concurrency, latency, requests)
+        """
+
+        with self.__metrics_lock:
+            metrics = dict(self.__metrics)
+            metrics["latency_ewma_ms"] = round(self.__latency_ewma_s * 1000, 1) if self.__latency_ewma_s != None else None
+
+        metrics["breaker"] = self.__breaker.Get_Stats()
+        metrics["batch_size"] = self.__batch_size.Get()
+        metrics["concurrency"] = self.__concurrency.Get()
+
+        return metrics
+
+    def Send_single_measurement(self, measurement:json):
+        """
+        This method tries to send a single measurement
+        """
+
+        try:
+            return self.__post(self.__measurement_to_row(Measurement.Parse(measurement))) == True #rejected -> false
+
+        except Exception as ex:
+            print(f"Exception occured during sensing data to database: {ex}")
+            return False
+
+    def __measurement_to_row(self, measurement:Measurement) -> dict:
+        """
+        This method converts a measurement to a row of table any_sensor_data_entry (missing values are None)
+
+        this method can raise an error
+        """
+
+        row = dict.fromkeys(self.__columns)
+        row["inserttime"] = Format_Ords_TimeStamp(measurement.timeStamp) #get timestamp of measurement
+
+        #errors are not part of readings
+        for deviceName, sensorName, measurementName, measurementData in measurement.readings:
+            mapping = self.__lookup.get((deviceName, sensorName, measurementName))
+
+            if mapping == None:
+                print(f"Unknown measurement received (not in measurement schema): device: {deviceName} sensor: {sensorName} measurement: {measurementName}")
+                continue
+
+            column, convert = mapping
+            row[column] = convert(measurementData)
+
+        return row
+
+class RetryQueue:
+    def __init__(self, path:str = None, max_bytes:int = 1024 * 1024 * 1024) -> None:
+        """
+        Init retry queue (measurements that could not be stored in database, kept on disk in a sqlite database)
+
+        measurements are taken oldest measurement time first
+
+        params:
+        path: path of sqlite file (None -> in memory only)
+        max_bytes: maximum size of stored measurements on disk (Put is refused as soon as reached)
+        """
+
+        self.__max_bytes = max_bytes
+
+        self.__lock = threading.Lock()
+        self.__leased = set() #sequences taken but not removed or released yet
+
+        self.__connection = sqlite3.connect(path if path != None else ":memory:", check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS retry (seq INTEGER PRIMARY KEY AUTOINCREMENT, measured REAL NOT NULL, measurement TEXT NOT NULL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS retry_measured ON retry (measured, seq)")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS rejected (seq INTEGER PRIMARY KEY AUTOINCREMENT, measured REAL NOT NULL, measurement TEXT NOT NULL, rejected REAL NOT NULL)") #dead letters (never retried)
+
+        self.__page_size = self.__connection.execute("PRAGMA page_size").fetchone()[0]
+        self.__items = self.__connection.execute("SELECT COUNT(*) FROM retry").fetchone()[0]
+        self.__rejected = self.__connection.execute("SELECT COUNT(*) FROM rejected").fetchone()[0]
+        self.__refused = 0
+
+        if self.__items > 0:
+            print(f"Retry queue: {self.__items} measurements waiting from last run")
+
+    def __get_measured(self, measurement:Measurement) -> float:
+        """
+        This method gets measurement time as sortable number
+        """
+
+        return measurement.timeStamp.timestamp()
+
+    def __get_used_bytes(self) -> int:
+        """
+        This method gets bytes used by stored measurements (free pages are reused)
+        """
+
+        page_count = self.__connection.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self.__connection.execute("PRAGMA freelist_count").fetchone()[0]
+
+        return (page_count - freelist_count) * self.__page_size
+
+    def Put(self, measurements:list) -> bool:
+        """
+        This method stores measurements (Measurement or json, all or none of them, durable as soon as returned)
+
+        returns:
+        true -> measurements stored
+        false -> maximum size reached (measurements refused)
+        """
+
+        measurements = [Measurement.Parse(measurement) for measurement in measurements]
+        rows = [(self.__get_measured(measurement), measurement.raw) for measurement in measurements]
+
+        with self.__lock:
+            if self.__get_used_bytes() + sum(len(measurement) for measured, measurement in rows) > self.__max_bytes:
+                self.__refused += len(rows)
+                return False
+
+            with self.__connection:
+                self.__connection.execute("BEGIN")
+                self.__connection.executemany("INSERT INTO retry (measured, measurement) VALUES (?, ?)", rows)
+
+            self.__items += len(rows)
+
+            return True
+
+    def Take(self, max_items:int) -> list:
+        """
+        This method takes oldest measurements (they stay stored until Remove, Release makes them available again)
+
+        returns:
+        list of (sequence, Measurement)
+        """
+
+        with self.__lock:
+            if self.__items - len(self.__leased) <= 0:
+                return []
+
+            rows = self.__connection.execute("SELECT seq, measurement FROM retry ORDER BY measured, seq LIMIT ?", (max_items + len(self.__leased),)).fetchall()
+
+            taken = [(seq, measurement) for seq, measurement in rows if seq not in self.__leased][:max_items]
+            self.__leased.update(seq for seq, measurement in taken)
+
+        return [(seq, Measurement.From_Json(measurement)) for seq, measurement in taken] #stored measurements are valid
+
+    def Remove(self, sequences:list):
+        """
+        This method deletes taken measurements (stored in database)
+        """
+
+        with self.__lock:
+            with self.__connection:
+                self.__connection.execute("BEGIN")
+                self.__connection.executemany("DELETE FROM retry WHERE seq = ?", [(seq,) for seq in sequences])
+
+            self.__items -= len(sequences)
+            self.__leased.difference_update(sequences)
+
+    def Release(self, sequences:list):
+        """
+        This method makes taken measurements available again (not stored in database)
+        """
+
+        with self.__lock:
+            self.__leased.difference_update(sequences)
+
+    def Reject(self, sequences:list):
+        """
+        This method moves taken measurements to dead letters (rejected because of their data, never taken again)
+        """
+
+        with self.__lock:
+            with self.__connection:
+                self.__connection.execute("BEGIN")
+                self.__connection.executemany("INSERT INTO rejected (measured, measurement, rejected) SELECT measured, measurement, ? FROM retry WHERE seq = ?", [(datetime.now().timestamp(), seq) for seq in sequences])
+                self.__connection.executemany("DELETE FROM retry WHERE seq = ?", [(seq,) for seq in sequences])
+
+            self.__items -= len(sequences)
+            self.__rejected += len(sequences)
+            self.__leased.difference_update(sequences)
+
+    def Put_Rejected(self, measurements:list) -> bool:
+        """
+        This method stores measurements as dead letters (rejected because of their data, kept for inspection)
+
+        returns:
+        true -> measurements stored
+        false -> maximum size reached (measurements refused)
+        """
+
+        measurements = [Measurement.Parse(measurement) for measurement in measurements]
+        rows = [(self.__get_measured(measurement), measurement.raw, datetime.now().timestamp()) for measurement in measurements]
+
+        with self.__lock:
+            if self.__get_used_bytes() + sum(len(measurement) for measured, measurement, rejected in rows) > self.__max_bytes:
+                self.__refused += len(rows)
+                return False
+
+            with self.__connection:
+                self.__connection.execute("BEGIN")
+                self.__connection.executemany("INSERT INTO rejected (measured, measurement, rejected) VALUES (?, ?, ?)", rows)
+
+            self.__rejected += len(rows)
+
+            return True
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters of retry queue (measurements waiting, taken, refused, dead letters, bytes on disk)
+        """
+
+        with self.__lock:
+            return {"items": self.__items, "leased": len(self.__leased), "refused": self.__refused, "rejected": self.__rejected, "bytes": self.__get_used_bytes()}
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__items
+
+class Uploader:
+    def __init__(self, sink, source, on_complete = None, retry_queue:RetryQueue = None, workers:int = 4, max_in_flight:int = 8, batch_size:int = 100, retry_base_delay_s:float = 1.0, retry_max_delay_s:float = 300.0, poll_intervall_s:float = 0.2) -> None:
+        """
+        Init uploader (stores measurements in a sink with a pool of worker threads, independent of main loop)
+
+        failed measurements are moved to retry queue and sent again with exponential backoff (all of them as fast as possible as soon as database works again)
+        measurements rejected by the sink (result None, e.g. invalid value) are moved to dead letters of retry queue and never retried
+
+        params:
+        sink: sink measurements are sent to (Database or any other sink with Send_measurements(measurements) -> success of every measurement, None if rejected)
+        source: function returning new measurements as list of (id, Measurement) (gets maximum number as argument, e.g. MessageHandler.Get_jsonBuffer_With_Ids)
+        on_complete: function called with (entries, persisted) as soon as a batch of new measurements is completed (called in order of submission, one after another)
+                     persisted: true -> stored in database, retry queue or dead letters, false -> not persisted (retry queue full)
+        retry_queue: retry queue of failed measurements (None -> in memory only)
+        workers: number of worker threads sending batches to database
+        max_in_flight: maximum number of batches submitted but not delivered yet (source is not read while reached, bounds batches completed behind a slow older batch)
+        batch_size: maximum number of measurements per batch
+        retry_base_delay_s: delay of first retry (doubled for every failed retry)
+        retry_max_delay_s: maximum delay between retries
+        poll_intervall_s: time waited if source is empty
+        """
+
+        self.__sink = sink
+        self.__source = source
+        self.__on_complete = on_complete
+        self.__retry_queue = retry_queue if retry_queue != None else RetryQueue()
+        self.__batch_size = batch_size
+        self.__retry_base_delay_s = retry_base_delay_s
+        self.__retry_max_delay_s = retry_max_delay_s
+        self.__poll_intervall_s = poll_intervall_s
+
+        self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="uploader")
+        self.__in_flight = threading.BoundedSemaphore(max_in_flight) #dispatcher blocks as soon as limit is reached
+
+        #completed batches waiting for older batches (as sequence -> (entries, results, retry))
+        self.__completed = {}
+        self.__completed_lock = threading.Lock()
+        self.__next_submitted = 0 #sequence of next submitted batch
+        self.__next_delivered = 0 #sequence of next batch passed to on_complete
+        self.__delivery_lock = threading.Lock() #only one thread calls on_complete
+
+        #backoff of retries (guarded by completed lock, written by delivering worker and read by dispatcher)
+        self.__retry_failures = 0 #failed retries in a row
+        self.__next_retry = 0 #retries are not submitted before this time
+
+        self.__stats = {"submitted": 0, "stored": 0, "failed": 0, "rejected": 0, "retried": 0, "not_persisted": 0}
+
+        self.__running = True
+        self.__dispatcher_thread = threading.Thread(target=self.__dispatcher, daemon=True)
+        self.__dispatcher_thread.start()
+
+    def __get_retry_delay(self) -> float:
+        """
+        This method gets delay until next retry (exponential backoff with jitter)
+        """
+
+        delay = min(self.__retry_max_delay_s, self.__retry_base_delay_s * 2 ** max(0, self.__retry_failures - 1))
+
+        return delay * random.uniform(0.5, 1.5)
+
+    def __dispatcher(self):
+        """
+        Reads source and retry queue and submits batches to worker pool
+        """
+
+        while self.__running:
+            try:
+                self.__in_flight.acquire() #wait for free slot before anything is taken from source
+
+                entries = []
+                retry = False
+
+                #failed measurements first (as soon as backoff expired)
+                with self.__completed_lock:
+                    retry_due = monotonic() >= self.__next_retry
+
+                if retry_due:
+                    entries = self.__retry_queue.Take(self.__batch_size)
+                    retry = len(entries) > 0
+
+                    #database failed last time -> only one retry in flight
+                    with self.__completed_lock:
+                        if retry and self.__retry_failures > 0:
+                            self.__next_retry = monotonic() + self.__get_retry_delay()
+
+                if not retry:
+                    entries = self.__source(self.__batch_size)
+
+                if len(entries) == 0:
+                    self.__in_flight.release()
+                    sleep(self.__poll_intervall_s)
+                    continue
+
+                sequence = self.__next_submitted
+                self.__next_submitted += 1
+                self.__stats["submitted"] += len(entries)
+                if retry:
+                    self.__stats["retried"] += len(entries)
+
+                self.__pool.submit(self.__upload, sequence, entries, retry)
+
+            except Exception as ex:
+                self.__in_flight.release()
+                print(f"Exception occured in uploader: {ex}")
+                sleep(self.__poll_intervall_s)
+
+    def __upload(self, sequence:int, entries:list, retry:bool):
+        """
+        Sends a batch to database (runs in worker)
+        """
+
+        try:
+            results = self.__sink.Send_measurements([measurement for id_, measurement in entries])
+
+        except Exception as ex:
+            print(f"Exception occured during uploading batch: {ex}")
+            results = [False] * len(entries)
+
+        with self.__completed_lock:
+            self.__completed[sequence] = (entries, results, retry)
+
+        self.__deliver()
+
+    def __complete_retry(self, entries:list, results:list):
+        """
+        Removes stored measurements from retry queue, moves rejected ones to dead letters and schedules next retry
+        """
+
+        self.__retry_queue.Remove([seq for (seq, measurement), stored in zip(entries, results) if stored])
+        self.__retry_queue.Reject([seq for (seq, measurement), stored in zip(entries, results) if stored == None])
+        self.__retry_queue.Release([seq for (seq, measurement), stored in zip(entries, results) if stored == False])
+
+        with self.__completed_lock:
+            if False not in results: #database works (rejected measurements are no failure of database) -> drain retry queue
+                self.__retry_failures = 0
+                self.__next_retry = 0
+
+            else:
+                self.__retry_failures += 1
+                self.__next_retry = monotonic() + self.__get_retry_delay()
+
+    def __complete_new(self, entries:list, results:list) -> list:
+        """
+        Moves failed new measurements to retry queue and rejected ones to dead letters
+
+        returns:
+        persisted flag of every measurement
+        """
+
+        rejected = [measurement for (id_, measurement), stored in zip(entries, results) if stored == None]
+        if len(rejected) > 0:
+            stored = self.__retry_queue.Put_Rejected(rejected)
+            results = [stored if result == None else result for result in results]
+
+        failed = [measurement for (id_, measurement), stored in zip(entries, results) if not stored]
+
+        if len(failed) == 0:
+            return results
+
+        #database failed -> do not retry before backoff expired
+        with self.__completed_lock:
+            if self.__retry_failures == 0:
+                self.__retry_failures = 1
+                self.__next_retry = monotonic() + self.__get_retry_delay()
+
+        if self.__retry_queue.Put(failed):
+            return [True] * len(entries)
+
+        #retry queue full -> measurements stay in write-ahead log (replayed after restart)
+        print(f"Retry queue full: {len(failed)} measurements not persisted")
+        self.__stats["not_persisted"] += len(failed)
+
+        return results
+
+    def __deliver(self):
+        """
+        Passes completed batches to retry queue and on_complete in order of submission
+        """
+
+        #another worker is delivering -> it also delivers this batch
+        if not self.__delivery_lock.acquire(blocking=False):
+            return
+
+        try:
+            while True:
+                with self.__completed_lock:
+                    completed = self.__completed.pop(self.__next_delivered, None)
+
+                if completed == None:
+                    break
+
+                self.__next_delivered += 1
+                entries, results, retry = completed
+
+                stored = sum(1 for result in results if result)
+                rejected = sum(1 for result in results if result == None)
+                self.__stats["stored"] += stored
+                self.__stats["rejected"] += rejected
+                self.__stats["failed"] += len(results) - stored - rejected
+
+                try:
+                    if retry:
+                        self.__complete_retry(entries, results)
+                        continue
+
+                    persisted = self.__complete_new(entries, results)
+
+                    if self.__on_complete != None:
+                        self.__on_complete(entries, persisted)
+
+                except Exception as ex:
+                    print(f"Exception occured during completing batch of uploader: {ex}")
+
+                finally:
+                    self.__in_flight.release() #slot is free as soon as batch is delivered (not when completed -> completed batches are bounded)
+
+        finally:
+            self.__delivery_lock.release()
+
+        #batch completed while lock was released -> deliver it too
+        with self.__completed_lock:
+            pending = self.__next_delivered in self.__completed
+
+        if pending:
+            self.__deliver()
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters of uploader (measurements submitted, stored, failed, waiting for retry, batches in flight)
+        """
+
+        stats = dict(self.__stats)
+        stats["waiting_retry"] = len(self.__retry_queue)
+        stats["in_flight"] = self.__next_submitted - self.__next_delivered
+
+        with self.__completed_lock:
+            stats["retry_failures"] = self.__retry_failures
+
+        return stats
+
+    def Defer(self, measurements:list) -> bool:
+        """
+        This method puts measurements directly into retry queue (sent as soon as the sink catches up)
+
+        returns:
+        true -> measurements stored in retry queue
+        false -> retry queue full
+        """
+
+        if self.__retry_queue.Put(measurements):
+            return True
+
+        self.__stats["not_persisted"] += len(measurements)
+        return False
+
+    def Close(self):
+        """
+        This method stops dispatcher and waits for submitted batches
+        """
+
+        self.__running = False
+        self.__dispatcher_thread.join()
+        self.__pool.shutdown(wait=True)
+
+class StdoutSink:
+    def Send_measurements(self, measurements:list) -> list:
+        """
+        This method prints measurements (sink for debugging)
+
+        returns:
+        success of every measurement
+        """
+
+        for measurement in measurements:
+            print(measurement)
+
+        return [True] * len(measurements)
+
+class FileArchiveSink:
+    def __init__(self, directory:str) -> None:
+        """
+        Init file archive (measurements appended as json lines to one file per day, e.g. 2022-04-04.jsonl)
+
+        params:
+        directory: directory of archive
+        """
+
+        self.__directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def Send_measurements(self, measurements:list) -> list:
+        """
+        This method appends measurements to archive (durable as soon as returned)
+
+        returns:
+        success of every measurement
+        """
+
+        #group by day of measurement
+        days = {}
+        for measurement in measurements:
+            measurement = Measurement.Parse(measurement)
+            days.setdefault(measurement.timeStamp.strftime("%Y-%m-%d"), []).append(measurement.raw)
+
+        try:
+            for day, raws in days.items():
+                with open(os.path.join(self.__directory, day + ".jsonl"), "a") as fd:
+                    fd.write("\n".join(raws) + "\n")
+                    fd.flush()
+                    os.fsync(fd.fileno())
+
+        except Exception as ex:
+            print(f"Exception occured during writing archive: {ex}")
+            return [False] * len(measurements)
+
+        return [True] * len(measurements)
+
+class ParquetArchiveSink:
+    def __init__(self, directory:str, schema:dict = None, row_group_size:int = 10000, flush_intervall_s:float = 300.0, compact_intervall_s:float = 3600.0, compact_min_files:int = 10) -> None:
+        """
+        Init columnar archive (rows of table any_sensor_data_entry as parquet files, requires pyarrow)
+
+        files are partitioned by day and classroom (master): directory/date=2022-04-04/classroom=master1/part-....parquet
+        the archive can be read at once, e.g. pandas.read_parquet(directory, filters=[("date", ">=", "2022-04-01")])
+
+        rows are buffered in memory and written as one row group (buffered rows are lost if the server stops -> best effort sink, never use as required sink)
+        rows of a failed write are kept in buffer and written again with the next write of their partition
+
+        params:
+        directory: directory of archive
+        schema: mapping of measurements to columns (None -> Load_Measurement_Schema())
+        row_group_size: partition is written as soon as this number of rows is buffered
+        flush_intervall_s: partition is written as soon as its oldest buffered row is older (small files are compacted later)
+        compact_intervall_s: intervall of compaction (small files of a partition are merged into one file)
+        compact_min_files: partition of current day is compacted as soon as it has this number of files (past days as soon as they have more than one)
+        """
+
+        if pyarrow == None:
+            raise Exception("Parquet archive requires pyarrow (pip install pyarrow)")
+
+        self.__directory = directory
+        self.__row_group_size = row_group_size
+        self.__flush_intervall_s = flush_intervall_s
+        self.__compact_intervall_s = compact_intervall_s
+        self.__compact_min_files = compact_min_files
+
+        #columns of table (same as database)
+        if schema == None:
+            schema = Load_Measurement_Schema()
+        self.__lookup, columns = Compile_Measurement_Schema(schema)
+
+        types = {"float": pyarrow.float64(), "bool": pyarrow.int8()}
+        fields = [pyarrow.field("inserttime", pyarrow.timestamp("ms"))]
+        for deviceName, sensors in schema.items():
+            for sensorName, measurements in sensors.items():
+                for measurementName, mapping in measurements.items():
+                    fields.append(pyarrow.field(mapping["column"], types[mapping["type"]]))
+        self.__schema = pyarrow.schema(fields)
+
+        #buffered rows as (day, classroom) -> [time of first row, column -> values]
+        self.__buffers = {}
+        self.__lock = threading.Lock()
+        self.__file_number = 0
+
+        self.__stats = {"rows": 0, "files": 0, "failed_writes": 0, "compactions": 0, "compacted_files": 0}
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.__running = True
+        self.__maintenance_thread = threading.Thread(target=self.__maintenance, daemon=True)
+        self.__maintenance_thread.start()
+
+    def Send_measurements(self, measurements:list) -> list:
+        """
+        This method adds measurements to archive
+
+        returns:
+        success of every measurement (true -> buffered or written, false -> write of its partition failed)
+        """
+
+        results = [True] * len(measurements)
+
+        full = []
+        added = {} #partition -> indices of measurements of this call in its buffer
+        with self.__lock:
+            for index, measurement in enumerate(measurements):
+                measurement = Measurement.Parse(measurement)
+                partition = (measurement.timeStamp.strftime("%Y-%m-%d"), self.__get_classroom(measurement.master))
+
+                buffer = self.__buffers.get(partition)
+                if buffer == None:
+                    buffer = [monotonic(), {field.name: [] for field in self.__schema}]
+                    self.__buffers[partition] = buffer
+
+                self.__append_row(buffer[1], measurement)
+                added.setdefault(partition, []).append(index)
+
+                if len(buffer[1]["inserttime"]) >= self.__row_group_size:
+                    first, columns = self.__buffers.pop(partition)
+                    full.append((partition, first, columns, added.pop(partition)))
+
+        for partition, first, columns, indices in full:
+            if self.__write(partition, columns):
+                continue
+
+            #rows of this call are reported as failed (sent again by uploader), rows accepted before are kept in buffer
+            kept = len(columns["inserttime"]) - len(indices)
+            self.__restore(partition, first, {column: values[:kept] for column, values in columns.items()})
+
+            for index in indices:
+                results[index] = False
+
+        return results
+
+    def __restore(self, partition:tuple, first:float, columns:dict):
+        """
+        This method puts rows of a failed write back in front of buffer of their partition
+        """
+
+        if len(columns["inserttime"]) == 0:
+            return
+
+        with self.__lock:
+            buffer = self.__buffers.get(partition)
+
+            if buffer == None:
+                self.__buffers[partition] = [first, columns]
+                return
+
+            buffer[0] = min(buffer[0], first)
+            for column, values in columns.items():
+                buffer[1][column] = values + buffer[1][column]
+
+    def __get_classroom(self, master:str) -> str:
+        """
+        This method gets name of partition of a master (only characters allowed in paths)
+        """
+
+        classroom = "".join(char for char in master if char.isalnum() or char in "-_")
+
+        return classroom if classroom != "" else "unknown"
+
+    def __append_row(self, columns:dict, measurement:Measurement):
+        """
+        This method appends a measurement as row to buffered columns (missing values are None)
+        """
+
+        row = dict.fromkeys(columns.keys())
+        row["inserttime"] = measurement.timeStamp
+
+        for deviceName, sensorName, measurementName, measurementData in measurement.readings:
+            mapping = self.__lookup.get((deviceName, sensorName, measurementName))
+
+            if mapping == None: #unknown measurement (already reported by database)
+                continue
+
+            column, convert = mapping
+            row[column] = convert(measurementData)
+
+        for column, value in row.items():
+            columns[column].append(value)
+
+    def __get_partition_directory(self, partition:tuple) -> str:
+        day, classroom = partition
+
+        return os.path.join(self.__directory, f"date={day}", f"classroom={classroom}")
+
+    def __write_table(self, directory:str, name:str, table):
+        """
+        This method writes a table atomically (hidden temporary file is renamed, readers ignore it)
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        temporary = os.path.join(directory, "." + name + ".tmp")
+        pyarrow.parquet.write_table(table, temporary, row_group_size=self.__row_group_size)
+        os.replace(temporary, os.path.join(directory, name))
+
+    def __write(self, partition:tuple, columns:dict) -> bool:
+        """
+        This method writes buffered rows of a partition as new file
+
+        returns:
+        true -> rows written
+        """
+
+        try:
+            table = pyarrow.table(columns, schema=self.__schema)
+
+            with self.__lock:
+                self.__file_number += 1
+                name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{self.__file_number:06d}.parquet"
+
+            self.__write_table(self.__get_partition_directory(partition), name, table)
+
+            with self.__lock:
+                self.__stats["rows"] += table.num_rows
+                self.__stats["files"] += 1
+
+            return True
+
+        except Exception as ex:
+            print(f"Exception occured during writing parquet archive: {ex}")
+
+            with self.__lock:
+                self.__stats["failed_writes"] += 1
+
+            return False
+
+    def Flush(self, all_partitions:bool = True):
+        """
+        This method writes buffered rows (rows of failed writes stay buffered)
+
+        params:
+        all_partitions: true -> all partitions, false -> only partitions buffered longer than flush_intervall_s
+        """
+
+        with self.__lock:
+            partitions = [partition for partition, (first, columns) in self.__buffers.items() if all_partitions or monotonic() >= first + self.__flush_intervall_s]
+            buffers = [(partition, self.__buffers.pop(partition)) for partition in partitions]
+
+        for partition, (first, columns) in buffers:
+            if not self.__write(partition, columns):
+                self.__restore(partition, first, columns)
+
+    def Compact(self, all_partitions:bool = False):
+        """
+        This method merges small files of partitions into one file (rows sorted by inserttime)
+
+        params:
+        all_partitions: true -> every partition with more than one file
+        """
+
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        for dayDirectory in sorted(os.listdir(self.__directory)):
+            if not dayDirectory.startswith("date="):
+                continue
+
+            for classroomDirectory in sorted(os.listdir(os.path.join(self.__directory, dayDirectory))):
+                directory = os.path.join(self.__directory, dayDirectory, classroomDirectory)
+                files = sorted(name for name in os.listdir(directory) if name.endswith(".parquet") and not name.startswith("."))
+
+                #past days are not written anymore -> one file each
+                minimum_files = self.__compact_min_files if dayDirectory[len("date="):] >= today and not all_partitions else 2
+                if len(files) < minimum_files:
+                    continue
+
+                try:
+                    table = pyarrow.concat_tables([pyarrow.parquet.read_table(os.path.join(directory, name), schema=self.__schema) for name in files])
+                    table = table.sort_by("inserttime")
+
+                    with self.__lock:
+                        self.__file_number += 1
+                        name = f"compacted-{datetime.now().strftime('%Y%m%d%H%M%S')}-{self.__file_number:06d}.parquet"
+
+                    #compacted file is visible before parts are removed (a reader may see rows twice for a moment, never miss rows)
+                    self.__write_table(directory, name, table)
+
+                    for name in files:
+                        os.remove(os.path.join(directory, name))
+
+                    with self.__lock:
+                        self.__stats["compactions"] += 1
+                        self.__stats["compacted_files"] += len(files)
+
+                except Exception as ex:
+                    print(f"Exception occured during compaction of parquet archive ({directory}): {ex}")
+
+    def __maintenance(self):
+        """
+        Writes old buffers and compacts partitions periodically
+        """
+
+        last_compaction = monotonic()
+
+        while self.__running:
+            sleep(min(1.0, self.__flush_intervall_s))
+
+            try:
+                self.Flush(all_partitions=False)
+
+                if monotonic() >= last_compaction + self.__compact_intervall_s:
+                    last_compaction = monotonic()
+                    self.Compact()
+
+            except Exception as ex:
+                print(f"Exception occured in maintenance of parquet archive: {ex}")
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters (rows and files written, failed writes, compactions, buffered rows)
+        """
+
+        with self.__lock:
+            return dict(self.__stats, buffered=sum(len(columns["inserttime"]) for first, columns in self.__buffers.values()))
+
+    def Close(self):
+        """
+        This method stops maintenance and writes buffered rows
+        """
+
+        self.__running = False
+        self.__maintenance_thread.join()
+        self.Flush()
+
+class TimeSeries:
+    HeaderSize = 8 #number of points (int64) in front of timestamps
+
+    def __init__(self, path:str, index_stride:int = 1024, initial_capacity:int = 4096) -> None:
+        """
+        Init series (append-only columns of timestamps and values in memory-mapped files)
+
+        path.ts: number of points followed by timestamps (int64, epoch milliseconds, ascending)
+        path.val: values (float32)
+
+        params:
+        path: path of files (without extension)
+        index_stride: every index_stride-th timestamp is kept in memory (sparse index for range lookups)
+        initial_capacity: number of points files are allocated for (doubled as soon as full)
+        """
+
+        self.__index_stride = index_stride
+        self.__lock = threading.Lock()
+
+        self.__timestamps_fd = os.open(path + ".ts", os.O_RDWR | os.O_CREAT)
+        self.__values_fd = os.open(path + ".val", os.O_RDWR | os.O_CREAT)
+
+        self.__map(max(initial_capacity, (os.fstat(self.__timestamps_fd).st_size - TimeSeries.HeaderSize) // 8))
+        self.__count = struct.unpack_from("<q", self.__timestamps_map, 0)[0]
+
+        #sparse index (timestamp of every index_stride-th point)
+        self.__index = [self.__timestamps[i] for i in range(0, self.__count, index_stride)]
+
+    def __map(self, capacity:int):
+        """
+        This method maps files with space for capacity points (files are enlarged if needed)
+        """
+
+        if os.fstat(self.__timestamps_fd).st_size < TimeSeries.HeaderSize + capacity * 8:
+            os.ftruncate(self.__timestamps_fd, TimeSeries.HeaderSize + capacity * 8)
+        if os.fstat(self.__values_fd).st_size < capacity * 4:
+            os.ftruncate(self.__values_fd, capacity * 4)
+
+        self.__capacity = capacity
+        self.__timestamps_map = mmap.mmap(self.__timestamps_fd, TimeSeries.HeaderSize + capacity * 8)
+        self.__values_map = mmap.mmap(self.__values_fd, capacity * 4)
+        self.__timestamps = memoryview(self.__timestamps_map)[TimeSeries.HeaderSize:].cast("q")
+        self.__values = memoryview(self.__values_map).cast("f")
+
+    def __unmap(self):
+        """
+        This method releases mapping of files
+        """
+
+        self.__timestamps.release()
+        self.__values.release()
+        self.__timestamps_map.close()
+        self.__values_map.close()
+
+    def Get_Last(self) -> int:
+        """
+        This method gets latest timestamp (None if empty)
+        """
+
+        with self.__lock:
+            return self.__timestamps[self.__count - 1] if self.__count > 0 else None
+
+    def Append(self, timestamps:list, values:list):
+        """
+        This method appends points (timestamps have to be ascending and newer than latest timestamp)
+        """
+
+        with self.__lock:
+            if self.__count + len(timestamps) > self.__capacity:
+                capacity = self.__capacity
+                while self.__count + len(timestamps) > capacity:
+                    capacity *= 2
+
+                self.__unmap()
+                self.__map(capacity)
+
+            for timeStamp, value in zip(timestamps, values):
+                if self.__count % self.__index_stride == 0:
+                    self.__index.append(timeStamp)
+
+                self.__timestamps[self.__count] = timeStamp
+                self.__values[self.__count] = value
+                self.__count += 1
+
+            #number of points is written last (points are visible after a crash only if written completely)
+            struct.pack_into("<q", self.__timestamps_map, 0, self.__count)
+
+    def __lower_bound(self, timeStamp:int) -> int:
+        """
+        This method gets position of first point not older than timeStamp (sparse index first, then points of one block)
+        """
+
+        block = bisect.bisect_left(self.__index, timeStamp)
+
+        lo = max(0, (block - 1) * self.__index_stride)
+        hi = min(self.__count, block * self.__index_stride)
+
+        return bisect.bisect_left(self.__timestamps, timeStamp, lo, hi)
+
+    def Scan(self, start:int, end:int) -> tuple:
+        """
+        This method gets points in range
+
+        params:
+        start: first timestamp (inclusive, epoch milliseconds)
+        end: last timestamp (exclusive, epoch milliseconds)
+
+        returns:
+        (timestamps as array of int64, values as array of float32)
+        """
+
+        timestamps = array.array("q")
+        values = array.array("f")
+
+        with self.__lock:
+            lo = self.__lower_bound(start)
+            hi = self.__lower_bound(end)
+
+            if hi > lo:
+                timestamps.frombytes(self.__timestamps[lo:hi].cast("B"))
+                values.frombytes(self.__values[lo:hi].cast("B"))
+
+        return (timestamps, values)
+
+    def Get_Position(self, timeStamp:int) -> int:
+        """
+        This method gets position of first point not older than timeStamp
+        """
+
+        with self.__lock:
+            return self.__lower_bound(timeStamp)
+
+    def Truncate(self, count:int):
+        """
+        This method removes all points from position count on (number of points is written at once -> no partly removed points after a crash)
+        """
+
+        with self.__lock:
+            self.__count = min(count, self.__count)
+            struct.pack_into("<q", self.__timestamps_map, 0, self.__count)
+
+            del self.__index[(self.__count + self.__index_stride - 1) // self.__index_stride:]
+
+    def Flush(self):
+        """
+        This method writes mapped pages to disk
+        """
+
+        with self.__lock:
+            self.__timestamps_map.flush()
+            self.__values_map.flush()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def Close(self):
+        """
+        This method closes files
+        """
+
+        with self.__lock:
+            self.__timestamps_map.flush()
+            self.__values_map.flush()
+            self.__unmap()
+            os.close(self.__timestamps_fd)
+            os.close(self.__values_fd)
+
+class TimeSeriesStore:
+    def __init__(self, directory:str, index_stride:int = 1024, max_late_points:int = 10000) -> None:
+        """
+        Init local time-series store (one TimeSeries per master, device and metric, e.g. b827eb000001/Device1/SCD_30_CO2)
+
+        every classroom has its own series (masters use the same device names), masters without identity (legacy) are stored as master "unknown"
+        points older than the latest point of a series (e.g. backlog of a master) are kept in a second unsorted series (directory/master/device/metric.late),
+        they are merged while scanning and moved into the series as soon as max_late_points are reached or the store is flushed
+
+        params:
+        directory: directory of store
+        index_stride: see TimeSeries
+        max_late_points: number of late points of a series that are moved into the series at once (bounds work of scans)
+        """
+
+        self.__directory = directory
+        self.__index_stride = index_stride
+        self.__max_late_points = max_late_points
+
+        self.__series = {} #(master, device, metric) as in path -> [TimeSeries, late TimeSeries or None]
+        self.__lock = threading.Lock()
+        self.__append_lock = threading.Lock() #latest timestamp is checked and appended at once
+        self.__merge_lock = threading.Lock() #scans do not see a series while late points are moved into it
+
+        self.__stats = {"points": 0, "late": 0, "merged": 0, "duplicates": 0, "skipped": 0}
+
+        #open existing series
+        os.makedirs(directory, exist_ok=True)
+        for master in sorted(os.listdir(directory)):
+            if not os.path.isdir(os.path.join(directory, master)):
+                continue
+
+            for device in sorted(os.listdir(os.path.join(directory, master))):
+                if not os.path.isdir(os.path.join(directory, master, device)):
+                    continue
+
+                for name in sorted(os.listdir(os.path.join(directory, master, device))):
+                    if name.endswith(".ts") and not name.endswith(".late.ts"):
+                        self.__get_series(master, device, name[:-len(".ts")])
+
+    def __get_name(self, master:str, device:str, metric:str) -> tuple:
+        """
+        This method gets name of a series as used in path (only characters allowed in paths, "unknown" if master is not sent)
+        """
+
+        master, device, metric = ("".join(char for char in name if char.isalnum() or char in "-_") for name in (master, device, metric))
+
+        return (master if master != "" else "unknown", device, metric)
+
+    def __get_series(self, master:str, device:str, metric:str, create:bool = True) -> list:
+        """
+        This method gets series (opened or created if needed, None if not existing and create is false)
+        """
+
+        name = self.__get_name(master, device, metric)
+
+        with self.__lock:
+            series = self.__series.get(name)
+
+            if series == None:
+                path = os.path.join(self.__directory, *name)
+
+                if not create and not os.path.exists(path + ".ts"):
+                    return None
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                late = TimeSeries(path + ".late", self.__index_stride, initial_capacity=64) if os.path.exists(path + ".late.ts") else None
+
+                series = [TimeSeries(path, self.__index_stride), late]
+                self.__series[name] = series
+
+            return series
+
+    def Send_measurements(self, measurements:list) -> list:
+        """
+        This method appends readings of measurements to their series (fed by ingest pipeline)
+
+        returns:
+        success of every measurement
+        """
+
+        try:
+            #points per series
+            points = {}
+            for measurement in measurements:
+                measurement = Measurement.Parse(measurement)
+                timeStamp = int(measurement.timeStamp.timestamp() * 1000)
+
+                for deviceName, sensorName, measurementName, measurementData in measurement.readings:
+                    if not isinstance(measurementData, (int, float)): #no numeric value
+                        self.__stats["skipped"] += 1
+                        continue
+
+                    points.setdefault((measurement.master, deviceName, measurementName), []).append((timeStamp, float(measurementData)))
+
+            for (master, device, metric), seriesPoints in points.items():
+                self.Append(master, device, metric, seriesPoints)
+
+        except Exception as ex:
+            print(f"Exception occured during writing time-series store: {ex}")
+            return [False] * len(measurements)
+
+        return [True] * len(measurements)
+
+    def Append(self, master:str, device:str, metric:str, points:list):
+        """
+        This method appends points of a series
+
+        params:
+        master: identity of master ("" if not sent)
+        points: list of (timestamp as epoch milliseconds, value)
+        """
+
+        with self.__append_lock:
+            self.__append(self.__get_series(master, device, metric), master, device, metric, points)
+
+    def __append(self, series:list, master:str, device:str, metric:str, points:list):
+        last = series[0].Get_Last()
+        newer = ([], [])
+        older = ([], [])
+
+        for timeStamp, value in sorted(points):
+            if last == None or timeStamp > last:
+                newer[0].append(timeStamp)
+                newer[1].append(value)
+                last = timeStamp
+
+            elif timeStamp == last: #same measurement again
+                self.__stats["duplicates"] += 1
+
+            else:
+                older[0].append(timeStamp)
+                older[1].append(value)
+
+        series[0].Append(*newer)
+
+        if len(older[0]) > 0:
+            with self.__lock:
+                if series[1] == None:
+                    series[1] = TimeSeries(os.path.join(self.__directory, *self.__get_name(master, device, metric)) + ".late", self.__index_stride, initial_capacity=64)
+
+            series[1].Append(*older)
+            self.__stats["late"] += len(older[0])
+
+            if len(series[1]) >= self.__max_late_points:
+                self.__merge(series)
+
+        self.__stats["points"] += len(newer[0]) + len(older[0])
+
+    def __merge(self, series:list):
+        """
+        This method moves late points into the series (called with append lock held)
+
+        points from the oldest late point on are rewritten in order, the rewritten points are copied to the late series first
+        (every point is in one of both series at any time -> nothing is lost by a crash, duplicates are removed by the next merge)
+        """
+
+        main, late = series
+        if late == None or len(late) == 0:
+            return
+
+        lateTimestamps, lateValues = late.Scan(-2 ** 63, 2 ** 63 - 1)
+        first = min(lateTimestamps)
+
+        with self.__merge_lock:
+            position = main.Get_Position(first)
+            tailTimestamps, tailValues = main.Scan(first, 2 ** 63 - 1)
+
+            late.Append(tailTimestamps, tailValues)
+            late.Flush()
+
+            #points of series win over late points of same time (same measurement again)
+            points = dict(zip(lateTimestamps, lateValues))
+            points.update(zip(tailTimestamps, tailValues))
+            merged = sorted(points.items())
+
+            main.Truncate(position)
+            main.Append([timeStamp for timeStamp, value in merged], [value for timeStamp, value in merged])
+            main.Flush()
+
+            late.Truncate(0)
+            late.Flush()
+
+        self.__stats["merged"] += len(lateTimestamps)
+        self.__stats["duplicates"] += len(lateTimestamps) + len(tailTimestamps) - len(merged)
+
+    def Scan(self, master:str, device:str, metric:str, start, end) -> tuple:
+        """
+        This method gets points of a series in range
+
+        params:
+        master: identity of master ("" or "unknown" -> masters without identity)
+        start: first time (inclusive, datetime or epoch milliseconds)
+        end: last time (exclusive, datetime or epoch milliseconds)
+
+        returns:
+        (timestamps as array of int64, values as array of float32), empty if series does not exist
+        """
+
+        if isinstance(start, datetime):
+            start = int(start.timestamp() * 1000)
+        if isinstance(end, datetime):
+            end = int(end.timestamp() * 1000)
+
+        series = self.__get_series(master, device, metric, create=False)
+        if series == None:
+            return (array.array("q"), array.array("f"))
+
+        with self.__merge_lock:
+            timestamps, values = series[0].Scan(start, end)
+
+            late = []
+            if series[1] != None and len(series[1]) > 0: #at most max_late_points (late series is not sorted)
+                lateTimestamps, lateValues = series[1].Scan(-2 ** 63, 2 ** 63 - 1)
+                late = sorted((timeStamp, value) for timeStamp, value in zip(lateTimestamps, lateValues) if start <= timeStamp < end)
+
+        if len(late) == 0:
+            return (timestamps, values)
+
+        #insert late points between slices of series (points of series win over late points of same time)
+        mergedTimestamps = array.array("q")
+        mergedValues = array.array("f")
+        lo = 0
+        for timeStamp, value in late:
+            position = bisect.bisect_left(timestamps, timeStamp, lo)
+
+            mergedTimestamps.extend(timestamps[lo:position])
+            mergedValues.extend(values[lo:position])
+            lo = position
+
+            if (position < len(timestamps) and timestamps[position] == timeStamp) or (len(mergedTimestamps) > 0 and mergedTimestamps[-1] == timeStamp):
+                continue
+
+            mergedTimestamps.append(timeStamp)
+            mergedValues.append(value)
+
+        mergedTimestamps.extend(timestamps[lo:])
+        mergedValues.extend(values[lo:])
+
+        return (mergedTimestamps, mergedValues)
+
+    def Get_Series_Info(self, master:str, device:str, metric:str) -> dict:
+        """
+        This method gets size of a series (None if series does not exist)
+
+        returns:
+        {"points": number of points, "late_points": number of late points, "last": latest timestamp}
+        """
+
+        series = self.__get_series(master, device, metric, create=False)
+        if series == None:
+            return None
+
+        return {"points": len(series[0]), "late_points": len(series[1]) if series[1] != None else 0, "last": series[0].Get_Last()}
+
+    def Get_Series(self) -> list:
+        """
+        This method gets all series as list of (master, device, metric)
+        """
+
+        with self.__lock:
+            return sorted(self.__series.keys())
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters (points appended, late points, late points merged into series, duplicates, skipped non numeric readings, number of series)
+        """
+
+        with self.__lock:
+            return dict(self.__stats, series=len(self.__series))
+
+    def Flush(self):
+        """
+        This method moves late points into their series and writes all series to disk
+        """
+
+        with self.__lock:
+            series = list(self.__series.values())
+
+        for item in series:
+            with self.__append_lock:
+                self.__merge(item)
+
+            main, late = item
+            main.Flush()
+            if late != None:
+                late.Flush()
+
+    def Close(self):
+        """
+        This method closes all series
+        """
+
+        self.Flush()
+
+        with self.__lock:
+            for main, late in self.__series.values():
+                main.Close()
+                if late != None:
+                    late.Close()
+
+            self.__series = {}
+
+#resolutions of rollups as name -> length of bucket in seconds (buckets start at local time, e.g. days at midnight)
+ROLLUP_RESOLUTIONS = {
+    "minute": 60,
+    "15min": 15 * 60,
+    "hour": 3600,
+    "day": 24 * 3600,
+}
 
-class SSL:
-    def __init__(self, host="0.0.0.0", port = 443) -> None:
+class RollupEngine:
+    def __init__(self, path:str = None, resolutions:dict = ROLLUP_RESOLUTIONS, intervall_s:float = 30.0, max_gap_s:float = 120.0, applied_retention_s:float = 7 * 24 * 3600) -> None:
         """
-        Init ssl
+        Init rollups (count, min, max, mean, last and time open of window sensors per master, device, metric and bucket, kept in a sqlite database)
+
+        rollups are updated incrementally: a batch of measurements only updates the buckets it falls into (late measurements included)
+        time open: a window reading (true -> open) counts since the previous reading of the sensor (at most max_gap_s), late readings count intervall_s
 
         params:
-        host: host ip
-        port: port
+        path: path of sqlite file (None -> in memory only)
+        resolutions: resolutions as name -> length of bucket in seconds
+        intervall_s: measurement intervall of masters
+        max_gap_s: readings further apart are not connected (master offline)
+        applied_retention_s: keys of applied measurements are kept this long (measurements replayed after a restart are not counted twice)
         """
-        
-        self.HOST = host
-        self.PORT = port
 
-        self.__dirname = os.path.dirname(__file__)
+        self.__resolutions = resolutions
+        self.__intervall_ms = int(intervall_s * 1000)
+        self.__max_gap_ms = int(max_gap_s * 1000)
+        self.__applied_retention_s = applied_retention_s
 
-        self.__input_jsons = [] #all jsons received stored here
+        self.__last_reading = {} #(master, device, metric) -> time of latest reading (epoch milliseconds)
+        self.__lock = threading.Lock()
 
-        #start listener thread
-        self.__listener_thread = threading.Thread(target=self.__listener, daemon=True)
-        self.__listener_thread.start()    
+        self.__connection = sqlite3.connect(path if path != None else ":memory:", check_same_thread=False, isolation_level=None)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("""CREATE TABLE IF NOT EXISTS rollup (
+            resolution INTEGER NOT NULL, master TEXT NOT NULL, device TEXT NOT NULL, metric TEXT NOT NULL, bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL, last_time INTEGER NOT NULL, last REAL NOT NULL, open_ms INTEGER,
+            PRIMARY KEY (resolution, master, device, metric, bucket)) WITHOUT ROWID""")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS applied (key TEXT PRIMARY KEY, applied REAL NOT NULL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS applied_time ON applied (applied)")
 
-    def __listener(self):
+        self.__stats = {"measurements": 0, "readings": 0, "late": 0, "replayed": 0, "buckets_updated": 0}
+
+    def __get_bucket(self, timeStamp:datetime, seconds:int) -> int:
         """
-        Start listener
+        This method gets start of bucket (epoch milliseconds) a local time falls into
         """
-        
-        while True:
-            try:
-                #create ssl socket and start listening
-                context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-                context.load_cert_chain(self.__dirname + r'/SSL/certificate.crt', self.__dirname + r'/SSL/certificate.key') #load certificate
 
-                bindsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM, 0)
-                bindsocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                bindsocket.bind((self.HOST, self.PORT))
-                bindsocket.listen(5)
+        local = (timeStamp - datetime(1970, 1, 1)).total_seconds()
 
-                while True:
-                    try:
-                        print("listening")
-                        newsocket, fromaddr = bindsocket.accept() #wait for incoming connection
-                        print("accepted")
-                        connstream = context.wrap_socket(newsocket, server_side=True) # <- stuck here
-                        print("socket wrapped")
-                        connstream.settimeout(5) #set read/write timeout to 5 seconds
-                        print("timeout set")
-                        newsocket.close() #close original socket
-                        print("accepted socket closed")
-                        
-                        print("start client handling")
-                        self.__handle_client(connstream)
-                        print("Client handled")
+        return int((datetime(1970, 1, 1) + timedelta(seconds=local // seconds * seconds)).timestamp() * 1000)
 
-                    except Exception as ex:
-                        #close eventual open newsocket
-                        try:
-                            newsocket.close()
-                        except:
-                            pass
+    def Send_measurements(self, measurements:list) -> list:
+        """
+        This method adds measurements to rollups (all or none of them)
 
-                        print(f"Exception occured during accepting and handling client: {ex}")
+        returns:
+        success of every measurement
+        """
 
-                    finally:
+        try:
+            self.__apply([Measurement.Parse(measurement) for measurement in measurements])
 
-                        #close connection
-                        try:
-                            connstream.shutdown(socket.SHUT_RDWR)
-                        except Exception as ex:
-                            print(f"Exception occured in shutdown connection: {ex}")
+        except Exception as ex:
+            print(f"Exception occured during updating rollups: {ex}")
+            return [False] * len(measurements)
 
-                        try:
-                            connstream.close()
-                        except Exception as ex:
-                            print(f"Exception occured in close connection: {ex}")
+        return [True] * len(measurements)
 
-                        print("connection closed")
-                    
+    def __apply(self, measurements:list):
+        """
+        This method updates buckets of measurements in one transaction
+        """
 
-            except Exception as ex:
+        with self.__lock:
+            #measurements already applied (replayed from write-ahead log)
+            keys = [measurement.key for measurement in measurements]
+            applied = set()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                applied.update(row[0] for row in self.__connection.execute(f"SELECT key FROM applied WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+
+            #changes per bucket as (resolution, master, device, metric, bucket) -> [count, sum, min, max, last time, last, open ms]
+            changes = {}
+            last_reading = dict(self.__last_reading) #only kept if transaction succeeds
+            new_keys = set()
+            late = 0
+            readings = 0
+
+            for measurement in sorted(measurements, key=lambda measurement: measurement.timeStamp):
+                if measurement.key in applied or measurement.key in new_keys:
+                    continue
+                new_keys.add(measurement.key)
+
+                timeStamp = int(measurement.timeStamp.timestamp() * 1000)
+                buckets = [(seconds, self.__get_bucket(measurement.timeStamp, seconds)) for seconds in self.__resolutions.values()]
+
+                for deviceName, sensorName, measurementName, measurementData in measurement.readings:
+                    if not isinstance(measurementData, (int, float)): #no numeric value
+                        continue
+
+                    value = float(measurementData)
+                    readings += 1
+
+                    #time open of window sensors
+                    open_ms = None
+                    if isinstance(measurementData, bool):
+                        previous = last_reading.get((measurement.master, deviceName, measurementName))
+
+                        if previous != None and timeStamp > previous:
+                            duration = min(timeStamp - previous, self.__max_gap_ms)
+                        else:
+                            duration = self.__intervall_ms
+                            if previous != None and timeStamp < previous:
+                                late += 1
+
+                        open_ms = duration if measurementData else 0
+
+                    if timeStamp > last_reading.get((measurement.master, deviceName, measurementName), -1):
+                        last_reading[(measurement.master, deviceName, measurementName)] = timeStamp
+
+                    for seconds, bucket in buckets:
+                        change = changes.get((seconds, measurement.master, deviceName, measurementName, bucket))
+
+                        if change == None:
+                            changes[(seconds, measurement.master, deviceName, measurementName, bucket)] = [1, value, value, value, timeStamp, value, open_ms]
+                            continue
+
+                        change[0] += 1
+                        change[1] += value
+                        change[2] = min(change[2], value)
+                        change[3] = max(change[3], value)
+                        if timeStamp >= change[4]:
+                            change[4] = timeStamp
+                            change[5] = value
+                        if open_ms != None:
+                            change[6] = (change[6] or 0) + open_ms
+
+            now = datetime.now().timestamp()
+
+            with self.__connection:
+                self.__connection.execute("BEGIN")
+                self.__connection.executemany("""INSERT INTO rollup (resolution, master, device, metric, bucket, count, sum, min, max, last_time, last, open_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (resolution, master, device, metric, bucket) DO UPDATE SET
+                    count = count + excluded.count, sum = sum + excluded.sum, min = MIN(min, excluded.min), max = MAX(max, excluded.max),
+                    last = CASE WHEN excluded.last_time >= last_time THEN excluded.last ELSE last END, last_time = MAX(last_time, excluded.last_time),
+                    open_ms = CASE WHEN excluded.open_ms IS NULL THEN open_ms ELSE IFNULL(open_ms, 0) + excluded.open_ms END""",
+                    [key + tuple(change) for key, change in changes.items()])
+                self.__connection.executemany("INSERT OR IGNORE INTO applied (key, applied) VALUES (?, ?)", [(key, now) for key in new_keys])
+                self.__connection.execute("DELETE FROM applied WHERE applied < ?", (now - self.__applied_retention_s,))
+
+            self.__last_reading = last_reading
+            self.__stats["measurements"] += len(new_keys)
+            self.__stats["readings"] += readings
+            self.__stats["late"] += late
+            self.__stats["replayed"] += len(measurements) - len(new_keys)
+            self.__stats["buckets_updated"] += len(changes)
+
+    def Get_Rollups(self, master:str, device:str, metric:str, resolution:str, start, end) -> list:
+        """
+        This method gets rollups of a metric
 
-                #close eventually open bindsocket
-                try:
-                    bindsocket.close()
-                except:
-                    pass
+        params:
+        master: identity of master ("" -> masters without identity)
+        device: name of device (e.g. Device1)
+        metric: name of measurement (e.g. SCD_30_CO2)
+        resolution: name of resolution (e.g. "hour")
+        start: first bucket (inclusive, datetime or epoch milliseconds)
+        end: last bucket (exclusive, datetime or epoch milliseconds)
 
-                print(f"Critical error in listener thread: {ex}")
+        returns:
+        list of {"bucket", "count", "min", "max", "mean", "last", "open_s"} ordered by bucket (bucket as datetime, open_s None if no window sensor)
+        """
 
-    def __read_from_conn(self, conn:ssl.SSLSocket) -> str:
+        if resolution not in self.__resolutions:
+            raise Exception(f"Unknown resolution: {resolution}")
+
+        if isinstance(start, datetime):
+            start = int(start.timestamp() * 1000)
+        if isinstance(end, datetime):
+            end = int(end.timestamp() * 1000)
+
+        with self.__lock:
+            rows = self.__connection.execute("SELECT bucket, count, sum, min, max, last, open_ms FROM rollup WHERE resolution = ? AND master = ? AND device = ? AND metric = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+                (self.__resolutions[resolution], master, device, metric, start, end)).fetchall()
+
+        return [{
+            "bucket": datetime.fromtimestamp(bucket / 1000),
+            "count": count,
+            "min": minimum,
+            "max": maximum,
+            "mean": total / count,
+            "last": last,
+            "open_s": open_ms / 1000 if open_ms != None else None,
+        } for bucket, count, total, minimum, maximum, last, open_ms in rows]
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters (measurements and readings applied, late window readings, replayed measurements, buckets updated)
         """
-        read message from connection
-        returns: received string 
-        
-        this method can raise an error
 
-        returns:
-        answer as string
+        with self.__lock:
+            return dict(self.__stats)
+
+def Downsample_MinMax(timestamps, values, points:int) -> list:
+    """
+    Downsample points to minimum and maximum of equally long time buckets (peaks are kept, gaps stay empty)
+
+    params:
+    timestamps: ascending timestamps
+    values: values of timestamps
+    points: maximum number of points returned
+
+    returns:
+    list of indices of selected points (ascending)
+    """
+
+    if len(timestamps) <= points:
+        return list(range(len(timestamps)))
+
+    buckets = max(1, points // 2)
+    first = timestamps[0]
+    length = (timestamps[-1] - first) / buckets + 1e-9
+
+    selected = []
+    lo = 0
+    for bucket in range(buckets):
+        hi = bisect.bisect_left(timestamps, first + (bucket + 1) * length, lo) if bucket < buckets - 1 else len(timestamps)
+
+        if hi > lo:
+            bucketValues = values[lo:hi]
+            minimum = lo + bucketValues.index(min(bucketValues))
+            maximum = lo + bucketValues.index(max(bucketValues))
+            selected.extend(sorted({minimum, maximum}))
+
+        lo = hi
+
+    return selected
+
+def Downsample_Lttb(timestamps, values, points:int) -> list:
+    """
+    Downsample points with largest triangle three buckets (shape of curve is kept)
+
+    long ranges are preselected with Downsample_MinMax to 4 * points first (MinMaxLTTB)
+
+    params:
+    timestamps: ascending timestamps
+    values: values of timestamps
+    points: maximum number of points returned
+
+    returns:
+    list of indices of selected points (ascending)
+    """
+
+    if len(timestamps) <= points:
+        return list(range(len(timestamps)))
+
+    if points < 3: #first and last point
+        return [0, len(timestamps) - 1][:points]
+
+    #preselection
+    candidates = list(range(len(timestamps)))
+    if len(timestamps) > 8 * points:
+        candidates = sorted(set(Downsample_MinMax(timestamps, values, 4 * points)) | {0, len(timestamps) - 1}) #first and last point are always kept
+
+    first = timestamps[0]
+    xs = [timestamps[i] - first for i in candidates]
+    ys = [values[i] for i in candidates]
+    n = len(candidates)
+
+    if n <= points:
+        return candidates
+
+    every = (n - 2) / (points - 2)
+    selected = [candidates[0]]
+    a = 0
+
+    for bucket in range(points - 2):
+        #average of next bucket
+        nextStart = int((bucket + 1) * every) + 1
+        nextEnd = min(int((bucket + 2) * every) + 1, n)
+        averageX = sum(xs[nextStart:nextEnd]) / (nextEnd - nextStart)
+        averageY = sum(ys[nextStart:nextEnd]) / (nextEnd - nextStart)
+
+        #point of this bucket with largest triangle
+        ax = xs[a]
+        ay = ys[a]
+        largest = -1
+        for j in range(int(bucket * every) + 1, int((bucket + 1) * every) + 1):
+            area = abs((ax - averageX) * (ys[j] - ay) - (ax - xs[j]) * (averageY - ay))
+            if area > largest:
+                largest = area
+                a = j
+
+        selected.append(candidates[a])
+
+    selected.append(candidates[-1])
+
+    return selected
+
+#metric names accepted by query api (besides names sent by master)
+METRIC_ALIASES = {
+    "co2": "SCD_30_CO2",
+    "humidity": "SCD_30_HUM",
+    "temp": "SCD_30_TEMP",
+    "light": "LS_lightStrength",
+    "battery": "bat_voltage",
+    "window1": "MS_S1",
+    "window2": "MS_S2",
+    "window3": "MS_S3",
+    "window4": "MS_S4",
+    "window5": "MS_S5",
+}
+
+DOWNSAMPLERS = {
+    "lttb": Downsample_Lttb,
+    "minmax": Downsample_MinMax,
+}
+
+class QueryServer:
+    def __init__(self, store:TimeSeriesStore, host:str = "127.0.0.1", port:int = 8081, max_points:int = 100000, cache_size:int = 256, chunk_points:int = 1000) -> None:
         """
+        Init http query api of time-series store
 
-        message = "" #message stored here
-        while True:
-            data = conn.recv(buflen=1024) #read 1024 bytes
+        endpoints:
+        GET /series -> {"series": [[master, device, metric], ...]}
+        GET /series?master=b827eb000001&device=Device3&metric=co2&from=2022-04-04T08:00:00&to=2022-04-05&points=1000&method=lttb
+            -> {"master": ..., "device": ..., "metric": ..., "from": ..., "to": ..., "method": ..., "points": [[epoch milliseconds, value], ...]} (streamed)
+            master: identity of master (default "unknown" -> masters without identity), from/to: iso time (local) or epoch milliseconds (default: whole series), points: maximum number of points (default 1000), method: lttb or minmax
 
-            #if no data received
-            if data == b"":
-                raise Exception(f"No data received.\nAlready read data.\n{message}")
+        results are cached (as long as no new points of the range are stored)
+
+        params:
+        store: time-series store
+        host: host to listen on
+        port: port to listen on (0 -> free port)
+        max_points: maximum of points requested
+        cache_size: number of cached results
+        chunk_points: number of points per streamed chunk
+        """
+
+        self.__store = store
+        self.__max_points = max_points
+        self.__cache_size = cache_size
+        self.__chunk_points = chunk_points
+
+        self.__cache = OrderedDict() #query -> body
+        self.__cache_lock = threading.Lock()
+        self.__stats = {"queries": 0, "cache_hits": 0, "errors": 0}
 
-            #decode received bytes and store characters in message (check if endchar received)
-            for chr in bytes.decode(data):
-                #if endchar received -> return message
-                if chr == "\n":
-                    return message
+        self.__server = ThreadingHTTPServer((host, port), self.__create_handler())
+        self.__server.daemon_threads = True
 
-                else: #otherwise add char to message
-                    message += chr
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
 
-    def __handle_client(self, conn:ssl.SSLSocket):
+    def __create_handler(self):
         """
-        Handle a connected client (master)
+        This method creates the request handler class bound to this instance
         """
-        
-        try:
-            answer = "" #message stored here
 
-            try:
-                answer = self.__read_from_conn(conn) #read message from master
+        queryServer = self
 
-            except Exception as ex:
-                print(f"Error occured during reading data from master: {ex}")
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" #keep-alive
+            disable_nagle_algorithm = True
 
-                conn.sendall(str.encode("failed\n"))
+            def log_message(self, format, *args):
+                pass
 
-                return
-            
-            try:
+            def do_GET(self):
+                url = urlsplit(self.path)
 
-                splitted_msg = answer.split("~") #split message
-                
-            except:
-                conn.sendall(str.encode("failed\n"))
-                
-                return
+                if url.path.rstrip("/") != "/series":
+                    self.__answer(404, {"error": "unknown endpoint"})
+                    return
 
-            #check data structure
-            if splitted_msg[0] == "data":
+                self.headers_sent = False #set as soon as streamed answer started
 
-                #process received data successful
-                if self.__handle__jsons(splitted_msg[1]):
-                    conn.sendall(str.encode("confirmed\n")) #return a positive confirmation to master
+                try:
+                    queryServer._handle_series(self, dict(parse_qsl(url.query)))
 
-                else: #processing failed
-                    conn.sendall(str.encode("failed\n")) #return a negative confirmation to master
+                except Exception as ex:
+                    queryServer._count("errors")
 
-            else: #wrong structure
-                conn.sendall(str.encode("failed\n")) #return a negative confirmation to master
-                raise Exception("unknown command received: {answer}")
+                    if self.headers_sent: #error in the middle of body -> client sees incomplete chunked body
+                        print(f"Exception occured during streaming query result: {ex}")
+                        self.close_connection = True
+                        return
 
-        except Exception as ex:
-            print(f"Exception occured during handling client: {ex}")
+                    self.__answer(400, {"error": str(ex)})
+
+            def __answer(self, status:int, answer:dict):
+                body = str.encode(json.dumps(answer))
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
 
-    def __handle__jsons(self, stringified_jsons:str) -> bool:
+    def _count(self, name:str, number:int = 1):
+        with self.__cache_lock:
+            self.__stats[name] += number
+
+    def __parse_time(self, value:str, default:int) -> int:
         """
-        This method processes and stores the received measurements
+        This method parses time of query (iso time or epoch milliseconds)
         """
-        
-        try:
-            all_jsons = stringified_jsons.split(";") #separate all received measurements (jsons)
 
-            #decode json from strings
-            json_files = []
-            for str_json in all_jsons:
-                json_files.append(json.loads(str_json)) 
+        if value == None:
+            return default
 
-            return self.__store_jsons(json_files) #store jsons in list
+        if value.lstrip("-").isdigit():
+            return int(value)
 
-        except Exception as ex:
-            print(f"Exeption occured during handling jsons: {ex}")
-            return False
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
 
-    def __store_jsons(self, jsons_list:list) -> bool:
+    def _handle_series(self, handler, query:dict):
         """
-        This method extends all mesurements to list
+        This method answers a query (cached body or streamed result)
         """
-        
-        try:
-            self.__input_jsons.extend(jsons_list)
-            return True
 
-        except Exception as ex:
-            print(f"Execption occured during saving jsons: {ex}")
-            return False
+        self._count("queries")
+
+        if "device" not in query and "metric" not in query:
+            self.__send(handler, [str.encode(json.dumps({"series": self.__store.Get_Series()}))])
+            return
+
+        master = query.get("master", "unknown")
+        device = query["device"]
+        metric = METRIC_ALIASES.get(query["metric"], query["metric"])
+        start = self.__parse_time(query.get("from"), -2 ** 63)
+        end = self.__parse_time(query.get("to"), 2 ** 63 - 1)
+        points = int(query.get("points", 1000))
+        method = query.get("method", "lttb")
+
+        if method not in DOWNSAMPLERS:
+            raise Exception(f"unknown method: {method} (lttb or minmax)")
+        if not 1 <= points <= self.__max_points:
+            raise Exception(f"points has to be between 1 and {self.__max_points}")
+
+        info = self.__store.Get_Series_Info(master, device, metric)
+        if info == None:
+            raise Exception(f"unknown series: {master} {device} {metric}")
+
+        #result changes with late points or new points in range
+        key = (master, device, metric, start, end, points, method, info["late_points"], info["points"] if info["last"] == None or end > info["last"] else None)
 
-    def Get_jsonBuffer(self):
+        with self.__cache_lock:
+            body = self.__cache.get(key)
+            if body != None:
+                self.__cache.move_to_end(key)
+                self.__stats["cache_hits"] += 1
+
+        if body != None:
+            self.__send(handler, [body])
+            return
+
+        timestamps, values = self.__store.Scan(master, device, metric, start, end)
+        selected = DOWNSAMPLERS[method](timestamps, values, points)
+
+        self.__send(handler, self.__stream(key, master, device, metric, start, end, method, timestamps, values, selected))
+
+    def __stream(self, key:tuple, master:str, device:str, metric:str, start:int, end:int, method:str, timestamps, values, selected:list):
         """
-        This method gets all received measurements and deletes them afterwards
+        This method generates chunks of result (selected points are encoded chunk by chunk) and caches the result
         """
 
-        return [self.__input_jsons.pop(0) for item in list(self.__input_jsons)] #get all items from list and remove them at the same time
+        chunks = [str.encode(json.dumps({"master": master, "device": device, "metric": metric, "from": start, "to": end, "method": method})[:-1] + ', "points": [')]
+        yield chunks[-1]
 
-class Database:
-    def __init__(self, userName='SENSOR_DATALAKE2', password='smarTclassrooM2Da') -> None:
+        for chunk in range(0, len(selected), self.__chunk_points):
+            separator = "" if chunk == 0 else ","
+            chunks.append(str.encode(separator + ",".join(f"[{timestamps[i]},{values[i]:.7g}]" for i in selected[chunk:chunk + self.__chunk_points])))
+            yield chunks[-1]
+
+        chunks.append(b"]}")
+
+        #cached before end of response is sent (repeated query of client hits cache)
+        with self.__cache_lock:
+            self.__cache[key] = b"".join(chunks)
+            while len(self.__cache) > self.__cache_size:
+                self.__cache.popitem(last=False)
+
+        yield chunks[-1]
+
+    def __send(self, handler, chunks):
         """
-        Init database class
+        This method sends chunks of body (chunked transfer encoding)
         """
-        
-        self.__userName = userName
-        self.__password = password
 
-    def __post(self, 
-        timeStamp:datetime, 
-        device1humidity:float=None, device1co2:float=None, device1temp:float=None, device1light:float=None, device1battery:float=None,
-        device2humidity:float=None, device2co2:float=None, device2temp:float=None, device2light:float=None, device2battery:float=None,
-        device3humidity:float=None, device3co2:float=None, device3temp:float=None, device3light:float=None, device3battery:float=None,
-        device3window1a:bool=None, device3window2b:bool=None, device3window3a:bool=None, device3window4b:bool=None, device3window5a:bool=None,
-    )-> bool:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        handler.headers_sent = True
+
+        for chunk in chunks:
+            if len(chunk) > 0:
+                handler.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+
+        handler.wfile.write(b"0\r\n\r\n")
+
+    def Get_Url(self) -> str:
         """
-        This method send data to server backend 
-        
-        returns:
-        successful -> true
-        successful -> false
+        This method gets url of series endpoint
         """
-    
-        def convert_nullable_float(value): #converts nullable float to string
-            if value == None:
-                return None
-
-            return str(value)
-
-        def convert_nullable_bool(value): #converts nullable bool to string
-            if value == None:
-                return None
-
-            if (value == True):
-                return 1
-
-            elif(value == False):
-                return 0
-
-        data_dict = {
-            "inserttime": timeStamp.strftime("%d-%b-%Y %I:%M:%S %p"),
-            "device1humidity": convert_nullable_float(device1humidity),
-            "device1co2": convert_nullable_float(device1co2),
-            "device1temp": convert_nullable_float(device1temp),
-            "device2humidity": convert_nullable_float(device2humidity),
-            "device2co2": convert_nullable_float(device2co2),
-            "device2temp": convert_nullable_float(device2temp),
-            "device3humidity": convert_nullable_float(device3humidity),
-            "device3co2": convert_nullable_float(device3co2),
-            "device3temp": convert_nullable_float(device3temp),
-            "device3window1a": convert_nullable_bool(device3window1a),
-            "device3window2b": convert_nullable_bool(device3window2b),
-            "device3window3a": convert_nullable_bool(device3window3a),
-            "device3window4b": convert_nullable_bool(device3window4b),
-            "device3window5a": convert_nullable_bool(device3window5a),
-            "device1light": convert_nullable_float(device1light),
-            "device2light": convert_nullable_float(device2light),
-            "device3light": convert_nullable_float(device3light),
-            "device1battery": convert_nullable_float(device1battery),
-            "device2battery": convert_nullable_float(device2battery),
-            "device3battery": convert_nullable_float(device3battery),
+
+        return f"http://{self.__server.server_address[0]}:{self.__server.server_address[1]}/series"
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters (queries, cache hits, failed queries, cached results)
+        """
+
+        with self.__cache_lock:
+            return dict(self.__stats, cached=len(self.__cache))
+
+    def Close(self):
+        """
+        This method stops the query api
+        """
+
+        self.__server.shutdown()
+        self.__server.server_close()
+
+class FanOut:
+    def __init__(self, source, on_complete = None, batch_size:int = 100, poll_intervall_s:float = 0.2) -> None:
+        """
+        Init fan-out (every measurement is sent to all sinks, each sink with its own queue, uploader and retry state)
+
+        params:
+        source: function returning new measurements as list of (id, Measurement) (gets maximum number as argument)
+        on_complete: function called with (entries, persisted) as soon as all required sinks completed measurements
+                     persisted: true -> stored in all required sinks (or their retry queues)
+        batch_size: maximum number of measurements taken from source at once
+        poll_intervall_s: time waited if source is empty
+        """
+
+        self.__source = source
+        self.__on_complete = on_complete
+        self.__batch_size = batch_size
+        self.__poll_intervall_s = poll_intervall_s
+
+        self.__sinks = {} #name -> state of sink
+        self.__required = 0 #number of required sinks
+
+        #measurements not completed by all required sinks (as sequence -> [entry, remaining sinks, persisted])
+        self.__pending = {}
+        self.__pending_lock = threading.Lock()
+        self.__next_sequence = 0
+
+        self.__completed_lock = threading.Lock() #only one sink calls on_complete at once
+
+        self.__dispatcher_thread = None
+
+    def Add_Sink(self, name:str, sink, required:bool = True, max_queued:int = 100000, retry_queue:RetryQueue = None, workers:int = 1, max_in_flight:int = 2, batch_size:int = 100, retry_base_delay_s:float = 1.0, retry_max_delay_s:float = 300.0):
+        """
+        This method adds a sink (before Start)
+
+        params:
+        name: name of sink (in stats)
+        sink: sink (object with Send_measurements(measurements) -> success of every measurement)
+        required: true -> measurements are only completed (acknowledged) as soon as this sink persisted them
+                  false -> best effort (measurements are dropped if its queue is full)
+        max_queued: maximum number of measurements waiting for this sink (high-water mark)
+        retry_queue: retry queue of sink (required sinks spill into it while their queue is full)
+        workers, max_in_flight, batch_size, retry_base_delay_s, retry_max_delay_s: see Uploader
+        """
+
+        if self.__dispatcher_thread != None:
+            raise Exception("Sinks have to be added before fan-out is started")
+
+        queue = IngestQueue(max_queued)
+
+        state = {
+            "required": required,
+            "queue": queue,
+            "uploader": Uploader(sink, queue.Drain, lambda entries, persisted: self.__sink_completed(name, entries, persisted), retry_queue, workers=workers, max_in_flight=max_in_flight, batch_size=batch_size, retry_base_delay_s=retry_base_delay_s, retry_max_delay_s=retry_max_delay_s),
+            "dropped": 0, #best effort sink: measurements dropped because of full queue
+            "spilled": 0, #required sink: measurements moved to retry queue because of full queue
         }
 
-        r = requests.post('https://glusfqycvwrucp9-db202202211424.adb.eu-zurich-1.oraclecloudapps.com/ords/sensor_datalake2/sens/any_sensor_data_entry/',auth=(self.__userName, self.__password), data=json.loads(json.dumps(data_dict)))
+        self.__sinks[name] = state
+        if required:
+            self.__required += 1
 
-        if r.ok:
-            return True
+    def Start(self):
+        """
+        This method starts distributing measurements to sinks
+        """
 
-        return False
+        self.__dispatcher_thread = threading.Thread(target=self.__dispatcher, daemon=True)
+        self.__dispatcher_thread.start()
 
-    def Send_single_measurement(self, measurement:json):
+    def __dispatcher(self):
         """
-        This method tries to send a single measurement
+        Reads source and puts measurements into queues of all sinks
         """
 
-        try:
-            inserttime = None
-            device1humidity = None
-            device1co2 = None
-            device1temp = None
-            device2humidity = None
-            device2co2 = None
-            device2temp = None
-            device3humidity = None
-            device3co2 = None
-            device3temp = None
-            device3window1a = None
-            device3window2b = None
-            device3window3a = None
-            device3window4b = None
-            device3window5a = None
-            device1light = None
-            device2light = None
-            device3light = None
-            device1battery = None
-            device2battery = None
-            device3battery = None
-
-            measurement_json = json.loads(measurement)
-
-            data:json = measurement_json["data"]
-
-            inserttime = datetime.strptime(measurement_json["timeStamp"], "%d/%m/%Y %H:%M:%S") #get timestamp of measurement
-
-            #iterate over device
-            for deviceName in list(data.keys()):
-
-                deviceData = data[deviceName]
-
-                if deviceData != Error.BleFailure: #device has no ble error
-                    
-                    #iterate over sensor
-                    for sensorName in list(deviceData.keys()):
-
-                        sensorData = deviceData[sensorName]
-
-                        if sensorData != Error.PhysicalConnectionerror: #sensor has no physical connection error
-                            
-                            #iterate over sensor measurements
-                            for measurementName in list(sensorData.keys()):
-
-                                measurementData = sensorData[measurementName]
-
-                                if measurementData != Error.ReadFailure: #if no read failure occured
-
-                                    #assign data to variable
-                                    if deviceName == "Device1":
-                                        if sensorName == "scd_30_sensor":
-                                            if measurementName == "SCD_30_CO2":
-                                                device1co2 = float(measurementData)
-
-                                            elif measurementName == "SCD_30_HUM":
-                                                device1humidity = float(measurementData)
-
-                                            elif measurementName == "SCD_30_TEMP":
-                                                device1temp = float(measurementData)
-
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
-
-                                        elif sensorName == "light_sensor":
-                                            if measurementName == "LS_lightStrength":
-                                                device1light = float(measurementData)
-
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
-                                            
-                                        elif sensorName == "battery_voltage":
-                                            if measurementName == "bat_voltage":
-                                                device1battery = float(measurementData)
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
-                                        else:
-                                            print(f"Unknown sensorName name fom device: {deviceName} received: {sensorName}")
-
-                                    elif deviceName == "Device2":
-                                        if sensorName == "scd_30_sensor":
-                                            if measurementName == "SCD_30_CO2":
-                                                device2co2 = float(measurementData)
-
-                                            elif measurementName == "SCD_30_HUM":
-                                                device2humidity = float(measurementData)
-
-                                            elif measurementName == "SCD_30_TEMP":
-                                                device2temp = float(measurementData)
-
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
-
-                                        elif sensorName == "light_sensor":
-                                            if measurementName == "LS_lightStrength":
-                                                device2light = float(measurementData)
-
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
-
-                                        elif sensorName == "battery_voltage":
-                                            if measurementName == "bat_voltage":
-                                                device2battery = float(measurementData)
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")    
-                                        
-                                        else:
-                                            print(f"Unknown sensorName name fom device: {deviceName} received: {sensorName}")
-
-                                    elif deviceName == "Device3":
-                                        if sensorName == "scd_30_sensor":
-                                            if measurementName == "SCD_30_CO2":
-                                                device3co2 = float(measurementData)
+        while True:
+            try:
+                received = self.__source(self.__batch_size)
 
-                                            elif measurementName == "SCD_30_HUM":
-                                                device3humidity = float(measurementData)
+                if len(received) == 0:
+                    sleep(self.__poll_intervall_s)
+                    continue
 
-                                            elif measurementName == "SCD_30_TEMP":
-                                                device3temp = float(measurementData)
+                #register measurements before any sink can complete them
+                with self.__pending_lock:
+                    sequences = list(range(self.__next_sequence, self.__next_sequence + len(received)))
+                    self.__next_sequence += len(received)
 
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
+                    for sequence, entry in zip(sequences, received):
+                        self.__pending[sequence] = [entry, self.__required, True]
 
-                                        elif sensorName == "light_sensor":
-                                            if measurementName == "LS_lightStrength":
-                                                device3light = float(measurementData)
+                entries = [(sequence, measurement) for sequence, (id_, measurement) in zip(sequences, received)]
 
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
+                for name, state in self.__sinks.items():
+                    self.__enqueue(name, state, entries)
 
-                                        elif sensorName == "magnetic_sensors":
-                                            if measurementName == "MS_S1":
-                                                device3window1a = bool(measurementData)
-
-                                            elif measurementName == "MS_S2":
-                                                device3window2b = bool(measurementData)
+                if self.__required == 0: #nothing to wait for
+                    self.__complete(sequences)
 
-                                            elif measurementName == "MS_S3":
-                                                device3window3a = bool(measurementData)
+            except Exception as ex:
+                print(f"Exception occured in fan-out: {ex}")
+                sleep(self.__poll_intervall_s)
 
-                                            elif measurementName == "MS_S4":
-                                                device3window4b = bool(measurementData)
+    def __enqueue(self, name:str, state:dict, entries:list):
+        """
+        Puts measurements into queue of a sink (a full queue does not block other sinks)
+        """
 
-                                            elif measurementName == "MS_S5":
-                                                device3window5a = bool(measurementData)
-
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
-                                            
-                                        elif sensorName == "battery_voltage":
-                                            if measurementName == "bat_voltage":
-                                                device3battery = float(measurementData)
-                                            else:
-                                                print(f"Unknown measurementName name fom device: {deviceName} form sensor: {sensorName} received: {measurementName}")
+        if state["queue"].Put(entries):
+            return
 
-                                        else:
-                                            print(f"Unknown sensorName name fom device: {deviceName} received: {sensorName}")
-
-                                    else:
-                                        print(f"Unknown device name received: {deviceName}")
-
-            return self.__post(
-                                inserttime, 
-                                device1humidity, device1co2, device1temp, device1light, device1battery,
-                                device2humidity, device2co2, device2temp, device2light, device2battery,
-                                device3humidity, device3co2, device3temp, device3light, device3battery,
-                                device3window1a, device3window2b, device3window3a, device3window4b, device3window5a
-                            )
+        if not state["required"]:
+            state["dropped"] += len(entries)
+            return
 
-        except Exception as ex:
-            print(f"Exception occured during sensing data to database: {ex}")
-            return False
+        #required sink is behind -> measurements wait in its retry queue
+        state["spilled"] += len(entries)
+        persisted = state["uploader"].Defer([measurement for sequence, measurement in entries])
+
+        self.__sink_completed(name, entries, [persisted] * len(entries))
+
+    def __sink_completed(self, name:str, entries:list, persisted:list):
+        """
+        Called by uploader of a sink as soon as it completed measurements
+        """
+
+        if not self.__sinks[name]["required"]:
+            return
+
+        completed = []
+        with self.__pending_lock:
+            for (sequence, measurement), ok in zip(entries, persisted):
+                pending = self.__pending[sequence]
+                pending[1] -= 1
+                pending[2] = pending[2] and ok
+
+                if pending[1] == 0:
+                    completed.append(sequence)
+
+        if len(completed) > 0:
+            self.__complete(completed)
+
+    def __complete(self, sequences:list):
+        """
+        Passes measurements completed by all required sinks to on_complete
+        """
+
+        with self.__pending_lock:
+            pendings = [self.__pending.pop(sequence) for sequence in sequences]
+
+        if self.__on_complete == None:
+            return
+
+        with self.__completed_lock:
+            try:
+                self.__on_complete([entry for entry, remaining, persisted in pendings], [persisted for entry, remaining, persisted in pendings])
+
+            except Exception as ex:
+                print(f"Exception occured in on_complete of fan-out: {ex}")
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets counters of every sink (queue depth and high-water mark, dropped/spilled measurements, uploader)
+        """
+
+        stats = {}
+        for name, state in self.__sinks.items():
+            stats[name] = {
+                "required": state["required"],
+                "queue": state["queue"].Get_Stats(),
+                "dropped": state["dropped"],
+                "spilled": state["spilled"],
+                "uploader": state["uploader"].Get_Stats(),
+            }
+
+        with self.__pending_lock:
+            stats["pending"] = len(self.__pending)
+
+        return stats
 
 class Email:
     def __init__(self, userName:str, password:str, receipents:list) -> None:
@@ -504,17 +4377,31 @@ class Email:
         except Exception as ex:
             print (f'Something went wrong sending an Email: {ex}')
 
-    def Send_Status_email(self, traced_errors_list:list):
+    def Send_Status_email(self, errors:dict):
         """
-        Sends a status email with containing error messages 
+        Sends a status email with containing error messages (one line per error, see ErrorCheck.GetErrors)
         """
         
-        if len(traced_errors_list) > 0: #there are errors in list
+        if len(errors["errors"]) > 0 or errors["dropped"] > 0: #there are errors
+
+            message = f"Bei {errors['faulty']} von {errors['checked']} Messungen ist/sind folgende(r) Fehler aufgetreten:\n\n"
 
-            message = "Bei folgenden Messungen ist/sind folgende(r) Fehler aufgetreten:\n\n"
+            for error in errors["errors"]:
+                location = "/".join(name for name in (error["device"], error["sensor"], error["measurement"]) if name != None)
+                message += f"{location}: {error['error']} {error['count']}x (zuerst {error['first_seen'].strftime('%d/%m/%Y %H:%M:%S')}, zuletzt {error['last_seen'].strftime('%d/%m/%Y %H:%M:%S')})\n"
 
-            for traced_errors in traced_errors_list:
-                message += f"Zeitstempel: {traced_errors.pop('timestamp')}\n{yaml.dump(traced_errors)}\n\n"
+                if error["description"] != error["error"]:
+                    message += f"    letzte Meldung: {error['description']}\n"
+
+            if errors["dropped"] > 0:
+                message += f"\n{errors['dropped']} weitere Fehler wurden nicht gezählt (zu viele verschiedene Fehler)\n"
+
+            if len(errors["samples"]) > 0:
+                message += "\nBeispiele:\n\n"
+
+                for traced_errors in errors["samples"]:
+                    traced_errors = dict(traced_errors)
+                    message += f"Zeitstempel: {traced_errors.pop('timestamp')}\n{yaml.dump(traced_errors)}\n\n"
 
             self.Send_Email(self.__receipents, "Statusmeldung: Smart Classroom Error/Warning Report", message)
 
@@ -535,102 +4422,319 @@ class Email:
         
         self.Send_Email(self.__receipents, "Statusmeldung: Master Info", "Verbindung zum Master wurde wieder hergestellt")
 
+#rules of anomaly detection per measurement (missing rule -> only outliers), parameters see AnomalyDetector
+ANOMALY_RULES = {
+    "SCD_30_CO2": {"min": 250.0, "max": 10000.0, "max_rate_per_s": 20.0, "flat_line_count": 20, "min_std": 10.0, "drift_threshold": 3.0},
+    "SCD_30_TEMP": {"min": -10.0, "max": 50.0, "max_rate_per_s": 0.1, "flat_line_count": 20, "min_std": 0.1},
+    "SCD_30_HUM": {"min": 0.0, "max": 100.0, "max_rate_per_s": 1.0, "flat_line_count": 20, "min_std": 1.0},
+    "LS_lightStrength": {"min": 0.0, "min_std": 10.0, "drift_threshold": 2.0},
+    "bat_voltage": {"min": 2.5, "max": 4.5, "min_std": 0.02},
+}
+
+class AnomalyDetector:
+    __slots__ = ("min", "max", "max_rate_per_s", "flat_line_count", "z_threshold", "min_std", "alpha", "warmup", "drift_alpha", "drift_threshold", "drift_warmup",
+                 "last_time", "last_value", "flat", "count", "mean", "m2", "ewma", "ewma_var", "drift_ewma", "drifting")
+
+    def __init__(self, min:float = None, max:float = None, max_rate_per_s:float = None, flat_line_count:int = None, z_threshold:float = 8.0, min_std:float = 1e-6, alpha:float = 0.05, warmup:int = 60,
+                 drift_alpha:float = 1 / 2880, drift_threshold:float = None, drift_warmup:int = 2 * 2880) -> None:
+        """
+        Online anomaly detection of one metric (constant memory and time per reading, no history)
+
+        params:
+        min, max: physical range (None -> not checked)
+        max_rate_per_s: largest possible change per second (None -> not checked)
+        flat_line_count: identical readings in a row reported as stuck sensor (None -> not checked)
+        z_threshold: readings further from ewma mean (in ewma standard deviations) are outliers
+        min_std: lower limit of ewma standard deviation (resolution of sensor, e.g. light sensor at night)
+        alpha: weight of a reading in ewma mean and variance
+        warmup: readings before outliers are reported
+        drift_alpha: weight of a reading in slow ewma (about a day of 30 second readings)
+        drift_threshold: slow ewma further from baseline mean (in baseline standard deviations) is drift (None -> not checked)
+        drift_warmup: readings of baseline (mean and variance of first readings, welford)
+        """
+
+        self.min = min
+        self.max = max
+        self.max_rate_per_s = max_rate_per_s
+        self.flat_line_count = flat_line_count
+        self.z_threshold = z_threshold
+        self.min_std = min_std
+        self.alpha = alpha
+        self.warmup = warmup
+        self.drift_alpha = drift_alpha
+        self.drift_threshold = drift_threshold
+        self.drift_warmup = drift_warmup
+
+        self.last_time = None
+        self.last_value = None
+        self.flat = 0 #identical readings in a row
+        self.count = 0
+        self.mean = 0.0 #baseline mean and sum of squared differences (welford)
+        self.m2 = 0.0
+        self.ewma = 0.0
+        self.ewma_var = 0.0
+        self.drift_ewma = 0.0
+        self.drifting = False #drift is reported once
+
+    def Update(self, timeStamp:float, value:float) -> list:
+        """
+        This method checks a reading and adds it to statistics
+
+        params:
+        timeStamp: time of reading in seconds
+        value: reading
+
+        returns:
+        findings as list of (kind, description)
+        """
+
+        #late reading -> statistics stay unchanged
+        if self.last_time != None and timeStamp <= self.last_time:
+            return []
+
+        findings = []
+
+        if (self.min != None and value < self.min) or (self.max != None and value > self.max):
+            findings.append((Error.OutOfRange, f"{Error.OutOfRange} {value}"))
+
+        if self.last_time != None:
+            #rate of change
+            rate = abs(value - self.last_value) / (timeStamp - self.last_time)
+            if self.max_rate_per_s != None and rate > self.max_rate_per_s:
+                findings.append((Error.RateOfChange, f"{Error.RateOfChange} {rate:.3g}/s ({self.last_value} -> {value})"))
+
+            #stuck sensor
+            self.flat = self.flat + 1 if value == self.last_value else 0
+            if self.flat_line_count != None and self.flat + 1 == self.flat_line_count:
+                findings.append((Error.FlatLine, f"{Error.FlatLine} {self.flat_line_count} identical readings ({value})"))
+
+        #outlier (compared to ewma before reading is added)
+        if self.count >= self.warmup:
+            z = abs(value - self.ewma) / max(math.sqrt(self.ewma_var), self.min_std)
+            if z > self.z_threshold:
+                findings.append((Error.Outlier, f"{Error.Outlier} {value} (mean {self.ewma:.4g}, z {z:.1f})"))
+
+        #statistics
+        self.count += 1
+        if self.count <= self.drift_warmup:
+            difference = value - self.mean
+            self.mean += difference / self.count
+            self.m2 += difference * (value - self.mean)
+
+        if self.count == 1:
+            self.ewma = value
+            self.drift_ewma = value
+        else:
+            difference = value - self.ewma
+            increment = self.alpha * difference
+            self.ewma += increment
+            self.ewma_var = (1 - self.alpha) * (self.ewma_var + difference * increment)
+            self.drift_ewma += self.drift_alpha * (value - self.drift_ewma)
+
+        #drift (slow ewma leaves range of baseline)
+        if self.drift_threshold != None and self.count > self.drift_warmup:
+            deviation = abs(self.drift_ewma - self.mean) / max(math.sqrt(self.m2 / (self.drift_warmup - 1)), self.min_std)
+            if deviation > self.drift_threshold and not self.drifting:
+                findings.append((Error.Drift, f"{Error.Drift} recent mean {self.drift_ewma:.4g} (baseline {self.mean:.4g})"))
+            self.drifting = deviation > self.drift_threshold
+
+        self.last_time = timeStamp
+        self.last_value = value
+
+        return findings
+
 class ErrorCheck:
-    def __init__(self, bat_voltage_lowError_threshold:float = 3.5) -> None:
+    def __init__(self, bat_voltage_lowError_threshold:float = 3.5, anomaly_rules:dict = ANOMALY_RULES, max_errors:int = 1000, max_samples:int = 5) -> None:
         """
         Init error check class
+
+        errors are counted per device, sensor, measurement and type of error (memory and size of status email depend on number of different errors, not on number of measurements)
+
+        params:
+        bat_voltage_lowError_threshold: battery voltage threshold
+        anomaly_rules: rules of anomaly detection per measurement (see ANOMALY_RULES, None -> no anomaly detection)
+        max_errors: maximum number of different errors counted between two fetches (further errors are only counted as dropped)
+        max_samples: number of traces of faulty measurements kept as example (random sample)
         """
         
         self.__bat_voltage_lowError_threshold = bat_voltage_lowError_threshold #battery voltage threshold 
-        self.__error_traces = [] #errors that are collected are stored here
-
-    def __get_error_trace_back(self, json_stringified:json):
+        self.__max_errors = max_errors
+        self.__max_samples = max_samples
+        self.__random = random.Random()
+
+        #errors since last fetch
+        self.__errors = {} #(device, sensor, measurement, error) -> [count, first seen, last seen, latest description]
+        self.__samples = [] #traces of faulty measurements (reservoir sample)
+        self.__faulty = 0 #faulty measurements
+        self.__checked = 0 #checked measurements
+        self.__dropped = 0 #errors not counted (max_errors reached)
+        self.__errors_lock = threading.Lock() #errors are stored by uploader and fetched by main loop
+
+        self.__anomaly_rules = anomaly_rules
+        self.__detectors = {} #(master, device, measurement) -> AnomalyDetector (every classroom has its own baseline)
+        self.__anomalies = {} #kind of anomaly -> number found (since start)
+
+    def __get_error_trace_back(self, measurement:Measurement) -> tuple:
         """
-        This mehod searches for errors in a measurement and returns them as dictionary
+        This mehod searches for errors in a measurement
+
+        returns:
+        (errors as dictionary like the measurement, errors as list of (device, sensor, measurement, error, description))
         """
         
         device_errors = {}
-        
-        json_ = json.loads(json_stringified)
+        errors = []
+
+        for deviceName, sensorName, measurementName, error in measurement.errors:
+            if sensorName == None: #whole device failed
+                device_errors[deviceName] = Error.BleFailure
 
-        time = datetime.strptime(json_["timeStamp"], "%d/%m/%Y %H:%M:%S")
+            elif measurementName == None: #whole sensor failed
+                device_errors.setdefault(deviceName, {})[sensorName] = error
 
-        data:json = json_["data"]
+            else:
+                device_errors.setdefault(deviceName, {}).setdefault(sensorName, {})[measurementName] = error
 
-        for deviceName in list(data.keys()):
+            errors.append((deviceName, sensorName, measurementName, error, error))
 
-            deviceData = data[deviceName]
+        for deviceName, sensorName, measurementName, measurementData in measurement.readings:
+            findings = []
 
-            if deviceData != Error.BleFailure:
+            if measurementName == "bat_voltage" and float(measurementData) <= self.__bat_voltage_lowError_threshold:
+                findings.append((Error.BatLowVoltage, f"{Error.BatLowVoltage} only {float(measurementData)}V"))
 
-                for sensorName in list(deviceData.keys()):
-                    sensorData = deviceData[sensorName]
+            #window sensors (bool) are not checked
+            if self.__anomaly_rules != None and isinstance(measurementData, (int, float)) and not isinstance(measurementData, bool):
+                findings.extend(self.__detect_anomalies(measurement.master, deviceName, measurementName, measurement.timeStamp, float(measurementData)))
 
-                    if sensorData != Error.PhysicalConnectionerror:
+            if len(findings) > 0:
+                device_errors.setdefault(deviceName, {}).setdefault(sensorName, {})[measurementName] = ", ".join(description for kind, description in findings)
+                errors.extend((deviceName, sensorName, measurementName, kind, description) for kind, description in findings)
 
-                        for measurementName in list(sensorData.keys()):
-                            measurementData = sensorData[measurementName]
+        if len(device_errors) > 0:
+            device_errors["timestamp"] = measurement.timeStamp
 
-                            if measurementData == Error.ReadFailure:
-                                deviceName_ = device_errors.get(deviceName, {})
-                                sensorName_ = deviceName_.get(sensorName, {})
-                                sensorName_[measurementName] = Error.ReadFailure
+        return (device_errors, errors)
 
-                                deviceName_[sensorName] = sensorName_
-                                device_errors[deviceName] = deviceName_
-                                device_errors["timestamp"] = time
+    def __detect_anomalies(self, master:str, deviceName:str, measurementName:str, timeStamp:datetime, value:float) -> list:
+        """
+        This method passes a reading to anomaly detector of its metric (per master) and returns findings as list of (kind, description)
+        """
 
-                            elif measurementName == "bat_voltage":
-                                if float(measurementData) <= self.__bat_voltage_lowError_threshold:
-                                    deviceName_ = device_errors.get(deviceName, {})
-                                    sensorName_ = deviceName_.get(sensorName, {})
-                                    sensorName_[measurementName] = f"{Error.BatLowVoltage} only {float(measurementData)}V"
+        detector = self.__detectors.get((master, deviceName, measurementName))
+        if detector == None:
+            detector = AnomalyDetector(**self.__anomaly_rules.get(measurementName, {}))
+            self.__detectors[(master, deviceName, measurementName)] = detector
 
-                                    deviceName_[sensorName] = sensorName_
-                                    device_errors[deviceName] = deviceName_
-                                    device_errors["timestamp"] = time
+        findings = detector.Update(timeStamp.timestamp(), value)
 
-                    else:
-                        deviceName_ = device_errors.get(deviceName, {})
-                        deviceName_[sensorName] = Error.PhysicalConnectionerror
+        for kind, description in findings:
+            self.__anomalies[kind] = self.__anomalies.get(kind, 0) + 1
 
-                        device_errors[deviceName] = deviceName_
-                        device_errors["timestamp"] = time
+        return findings
 
-            else:
-                device_errors[deviceName] = Error.BleFailure
-                device_errors["timestamp"] = time
+    def __count_errors(self, timeStamp:datetime, error_trace_dict:dict, errors:list):
+        """
+        This method adds errors of a measurement to counters and sample of traces
+        """
+
+        for deviceName, sensorName, measurementName, error, description in errors:
+            counter = self.__errors.get((deviceName, sensorName, measurementName, error))
+
+            if counter == None:
+                if len(self.__errors) >= self.__max_errors:
+                    self.__dropped += 1
+                    continue
+
+                self.__errors[(deviceName, sensorName, measurementName, error)] = [1, timeStamp, timeStamp, description]
+                continue
 
-        return device_errors
+            counter[0] += 1
+            counter[1] = min(counter[1], timeStamp) #late measurements
+            if timeStamp >= counter[2]:
+                counter[2] = timeStamp
+                counter[3] = description
+
+        #every faulty measurement has the same chance to be a sample
+        self.__faulty += 1
+        if len(self.__samples) < self.__max_samples:
+            self.__samples.append(error_trace_dict)
+        else:
+            position = self.__random.randrange(self.__faulty)
+            if position < self.__max_samples:
+                self.__samples[position] = error_trace_dict
 
     def CheckJsons_StoreErrors(self, jsons:list):
         """
-        This method checks all measurements in json format for errors
+        This method checks all measurements (Measurement or json format) for errors
         """
         
-        #check all measurements for errors and store errors in list
+        #check all measurements for errors and count them
         for json_ in jsons:
-            error_trace_dict = self.__get_error_trace_back(json_)
+            measurement = Measurement.Parse(json_)
+
+            with self.__errors_lock:
+                error_trace_dict, errors = self.__get_error_trace_back(measurement)
 
-            if len(list(error_trace_dict.keys())) > 0:
-                self.__error_traces.append(error_trace_dict)
+                self.__checked += 1
+                if len(errors) > 0:
+                    self.__count_errors(measurement.timeStamp, error_trace_dict, errors)
 
-    def GetErrors(self):
+    def GetErrors(self) -> dict:
         """
-        This method gets all errors collected during last error fetch
+        This method gets all errors collected since last error fetch (counters are reset)
+
+        returns:
+        {
+            "errors": list of {"device", "sensor", "measurement", "error", "count", "first_seen", "last_seen", "description"} (sensor and measurement None if whole device/sensor failed),
+            "samples": traces of some faulty measurements (as dictionary like the measurement),
+            "faulty": number of faulty measurements, "checked": number of checked measurements, "dropped": number of errors not counted
+        }
         """
 
-        #get errors and delete list
-        error_traces_copy = self.__error_traces.copy()
-        self.__error_traces.clear(); #clear all
+        #get errors and reset counters
+        with self.__errors_lock:
+            errors = {
+                "errors": [{
+                    "device": deviceName,
+                    "sensor": sensorName,
+                    "measurement": measurementName,
+                    "error": error,
+                    "count": count,
+                    "first_seen": first_seen,
+                    "last_seen": last_seen,
+                    "description": description,
+                } for (deviceName, sensorName, measurementName, error), (count, first_seen, last_seen, description) in self.__errors.items()],
+                "samples": self.__samples,
+                "faulty": self.__faulty,
+                "checked": self.__checked,
+                "dropped": self.__dropped,
+            }
+
+            self.__errors = {}
+            self.__samples = []
+            self.__faulty = 0
+            self.__checked = 0
+            self.__dropped = 0
+
+        errors["errors"].sort(key=lambda error: (error["device"], error["sensor"] or "", error["measurement"] or "", error["error"]))
+
+        return errors
+
+    def Get_Stats(self) -> dict:
+        """
+        This method gets number of anomalies found per kind (since start), number of checked metrics and number of different errors since last fetch
+        """
 
-        return error_traces_copy
+        with self.__errors_lock:
+            return {"anomalies": dict(self.__anomalies), "metrics": len(self.__detectors), "errors": len(self.__errors), "faulty": self.__faulty}
 
 if __name__ == '__main__':    
     #instances
-    server = SSL()
+    server = AsyncSSL(idle_timeout_s=120, wal_directory=os.path.dirname(__file__) + "/wal") #masters keep their connection open between measurements (idle connections do not occupy a thread)
     checkError = ErrorCheck()
     db = Database()
+    deduplicator = Deduplicator()
     
     #read username and password of gmail account
     with open(os.path.dirname(__file__) + "/creditals", "r") as fd:
@@ -644,47 +4748,82 @@ if __name__ == '__main__':
     #variables
     time_last_jsons_received = monotonic()
     master_timeout_recognized = False
-    measurements_database_failed = [] #failed measurements stored here
-    
-    print("Start mainLoop")
-    old_status_mail_time = monotonic()
-    while True:
-        try:
-            #if measurements failed to send to database
-            if len(measurements_database_failed) > 0:
-                measurement = measurements_database_failed.pop()
 
-                print(f"{len(measurements_database_failed)} jsons buffered and not stored in database")
+    def receive_new_measurements(max_items:int) -> list:
+        """
+        Source of fan-out: gets measurements received from master that are not stored yet (as (wal id, json))
+        """
+
+        global time_last_jsons_received
+
+        received = server.Get_jsonBuffer_With_Ids(max_items) #get jsons received from master
+
+        #as soon as jsons received
+        if len(received) > 0:
+            time_last_jsons_received = monotonic() #update time
+
+            print(f"receive buffer: {server.Get_BufferStats()}")
+            print(f"write-ahead log: {server.Get_WalStats()}")
+
+        new_received = [] #measurements not received before
+        for id_, measurement in received:
+            #retransmitted measurement -> already stored (or waiting for retry)
+            if deduplicator.Is_Duplicate(measurement):
+                server.Acknowledge_Stored([id_])
+                continue
+
+            new_received.append((id_, measurement))
 
-                #try update database (otherwise store again)
-                if not db.Send_single_measurement(measurement):
-                    measurements_database_failed.append(measurement)
-                
-            jsons = server.Get_jsonBuffer() #get jsons received from master
+        return new_received
 
-            #as soon as jsons received
-            if(len(jsons) > 0):
-                time_last_jsons_received = monotonic() #update time
+    def measurements_completed(entries:list, persisted:list):
+        """
+        Called by fan-out as soon as measurements are stored in all required sinks (or their retry queues)
+        """
+
+        server.Acknowledge_Stored([id_ for (id_, measurement), ok in zip(entries, persisted) if ok])
+
+        if not all(persisted):
+            print(f"sinks: {fanout.Get_Stats()}")
 
-                print(jsons)
+        checkError.CheckJsons_StoreErrors([measurement for id_, measurement in entries]) #check for errors and store it when error occured
 
-                #master timeout triggered
-                if master_timeout_recognized:
-                    master_timeout_recognized = False #reset flag
-                    email.Send_MasterReconnect_email()
-                
-                #try store measurements in database
-                for measurement in jsons:
-                    #try update database (otherwise store again)
-                    if not db.Send_single_measurement(measurement):
-                        measurements_database_failed.append(measurement)
+    #every measurement is sent to all sinks (failed measurements survive restarts in retry queue of sink)
+    fanout = FanOut(receive_new_measurements, measurements_completed)
+    fanout.Add_Sink("ords", db, retry_queue=RetryQueue(os.path.dirname(__file__) + "/retry.sqlite"), workers=4, max_in_flight=8)
+    fanout.Add_Sink("archive", FileArchiveSink(os.path.dirname(__file__) + "/archive"), retry_queue=RetryQueue(os.path.dirname(__file__) + "/retry_archive.sqlite"))
+    fanout.Add_Sink("stdout", StdoutSink(), required=False, max_queued=1000) #dropped while console is slow
+    timeseries = TimeSeriesStore(os.path.dirname(__file__) + "/timeseries")
+    fanout.Add_Sink("timeseries", timeseries, retry_queue=RetryQueue(os.path.dirname(__file__) + "/retry_timeseries.sqlite")) #local store for range queries
+    fanout.Add_Sink("rollups", RollupEngine(os.path.dirname(__file__) + "/rollups.sqlite"), retry_queue=RetryQueue(os.path.dirname(__file__) + "/retry_rollups.sqlite")) #aggregates for dashboards and reports
+    if pyarrow != None: #columnar archive for analysis (buffered -> best effort, json archive is complete)
+        fanout.Add_Sink("parquet", ParquetArchiveSink(os.path.dirname(__file__) + "/parquet"), required=False)
+    fanout.Start()
 
-                checkError.CheckJsons_StoreErrors(jsons) #check for errors and store it when error occured
+    queryServer = QueryServer(timeseries) #range queries of local store (only local, remote clients via ssh tunnel)
+    
+    print("Start mainLoop")
+    old_status_mail_time = monotonic()
+    while True:
+        try:
+            #master timeout triggered and measurements received again
+            if master_timeout_recognized and monotonic() < time_last_jsons_received + (master_timeout_min * 60):
+                master_timeout_recognized = False #reset flag
+                email.Send_MasterReconnect_email()
 
             #as soon as intervall reached
             if monotonic() >= old_status_mail_time + (status_mail_intervall_min * 60):
                 old_status_mail_time = monotonic()
 
+                print(f"duplicates: {deduplicator.Get_Stats()}")
+                print(f"sinks: {fanout.Get_Stats()}")
+                print(f"database: {db.Get_Metrics()}")
+                print(f"query api: {queryServer.Get_Stats()}")
+                print(f"error check: {checkError.Get_Stats()}")
+                print(f"timeseries: {timeseries.Get_Stats()}")
+
+                timeseries.Flush() #move backlog points into their series (scans stay fast)
+
                 email.Send_Status_email(checkError.GetErrors())
 
             #if master timeout occures
@@ -696,8 +4835,3 @@ if __name__ == '__main__':
 
         except Exception as ex:
             print(f"Exception occured in mainLoop: {ex}")
-
-    
-
-
-
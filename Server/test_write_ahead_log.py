@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from time import sleep
+
+import server
+
+def wait_committed():
+    """
+    Wait until acknowledgements are written (committer writes them with the next commit)
+    """
+
+    sleep(0.2)
+
+class WriteAheadLogRestartTest(unittest.TestCase):
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.directory = self.__directory.name
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def test_restart_on_empty_log_keeps_appended_records(self):
+        #two runs without any record leave empty segments behind
+        server.WriteAheadLog(self.directory, commit_window_s=0)
+        server.WriteAheadLog(self.directory, commit_window_s=0)
+
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0)
+        ids = wal.Append(["measurement"])
+        self.assertTrue(wal.Wait_Durable(ids[-1]))
+        wait_committed()
+
+        self.assertEqual(server.WriteAheadLog(self.directory, commit_window_s=0).Get_Replayed(), [(ids[0], "measurement")])
+
+    def test_restart_after_acknowledgements_only(self):
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0)
+        ids = wal.Append(["first", "second"])
+        self.assertTrue(wal.Wait_Durable(ids[-1]))
+
+        #last segment of this run only contains acknowledgements
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0)
+        self.assertEqual([record for id_, record in wal.Get_Replayed()], ["first", "second"])
+        wal.Acknowledge(ids)
+        wait_committed()
+
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0)
+        self.assertEqual(wal.Get_Replayed(), [])
+
+        new_ids = wal.Append(["third"])
+        self.assertTrue(wal.Wait_Durable(new_ids[-1]))
+        wait_committed()
+
+        #ids of acknowledged records are not reused
+        self.assertTrue(new_ids[0] > ids[-1])
+        self.assertEqual(server.WriteAheadLog(self.directory, commit_window_s=0).Get_Replayed(), [(new_ids[0], "third")])
+
+    def test_acknowledged_segments_are_deleted(self):
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0, max_segment_bytes=1)
+        ids = wal.Append(["first"])
+        self.assertTrue(wal.Wait_Durable(ids[-1]))
+        wal.Acknowledge(ids)
+        wait_committed()
+
+        ids = wal.Append(["second"]) #commit deletes segments of acknowledged records
+        self.assertTrue(wal.Wait_Durable(ids[-1]))
+        wait_committed()
+
+        self.assertEqual([record for id_, record in server.WriteAheadLog(self.directory, commit_window_s=0).Get_Replayed()], ["second"])
+
+        for fileName in os.listdir(self.directory):
+            with open(os.path.join(self.directory, fileName), "rb") as fd:
+                self.assertNotIn(b"first", fd.read())
+
+    def test_unacknowledged_records_expire(self):
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0, max_segment_bytes=1, unacknowledged_timeout_s=0.1)
+        ids = wal.Append(["lost"]) #never acknowledged (e.g. retry queue full)
+        self.assertTrue(wal.Wait_Durable(ids[-1]))
+        sleep(0.2)
+
+        for record in ["first", "second"]: #commits expire old record and delete its segment
+            ids = wal.Append([record])
+            self.assertTrue(wal.Wait_Durable(ids[-1]))
+            wal.Acknowledge(ids)
+            wait_committed()
+
+        stats = wal.Get_Stats()
+        self.assertEqual(stats["expired"], 1)
+        self.assertEqual(stats["unacknowledged"], 0)
+        self.assertEqual(server.WriteAheadLog(self.directory, commit_window_s=0).Get_Replayed(), [])
+
+    def test_acknowledged_twice_is_not_kept(self):
+        wal = server.WriteAheadLog(self.directory, commit_window_s=0, max_segment_bytes=1)
+
+        for record in ["first", "second"]:
+            ids = wal.Append([record])
+            self.assertTrue(wal.Wait_Durable(ids[-1]))
+            wal.Acknowledge(ids)
+            wait_committed()
+            wal.Acknowledge(ids) #after its id was removed from heap
+
+        self.assertEqual(wal.Get_Stats()["unacknowledged"], 0)
+
+if __name__ == '__main__':
+    unittest.main()